@@ -0,0 +1,548 @@
+from typing import List
+import asyncio
+import functools
+import Utility.AsyncDBConnector as AsyncConnector
+import Utility.DBConnector as Connector
+import Utility.Bookkeeping as Bookkeeping
+import Solution
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Business.Match import Match
+from Business.Player import Player
+from Business.Stadium import Stadium
+
+
+# asyncio counterpart of the Solution API: the same functions, statements and ReturnValues, awaited instead of
+# blocking the event loop (e.g. await addPlayer(...), await mostGoalsForTeam(...)). the connections come from the
+# pool of Utility/AsyncDBConnector. the schema is managed with Solution.createTables/clearTables/dropTables and the
+# caches, materialized views settings and write bookkeeping are shared with Solution (see Utility/Bookkeeping.py)
+
+
+# the statements registered by Solution (when it is imported), looked up by name
+_ADD_TEAM = Connector.getPrepared("add_team")
+_DELETE_TEAM = Connector.getPrepared("delete_team")
+_ADD_MATCH = Connector.getPrepared("add_match")
+_GET_MATCH_PROFILE = Connector.getPrepared("get_match_profile")
+_DELETE_MATCH = Connector.getPrepared("delete_match")
+_ADD_PLAYER = Connector.getPrepared("add_player")
+_GET_PLAYER_PROFILE = Connector.getPrepared("get_player_profile")
+_DELETE_PLAYER = Connector.getPrepared("delete_player")
+_ADD_STADIUM = Connector.getPrepared("add_stadium")
+_GET_STADIUM_PROFILE = Connector.getPrepared("get_stadium_profile")
+_DELETE_STADIUM = Connector.getPrepared("delete_stadium")
+_PLAYER_SCORED = Connector.getPrepared("player_scored")
+_PLAYER_DIDNT_SCORE = Connector.getPrepared("player_didnt_score")
+_MATCH_IN_STADIUM = Connector.getPrepared("match_in_stadium")
+_MATCH_NOT_IN_STADIUM = Connector.getPrepared("match_not_in_stadium")
+_AVERAGE_ATTENDANCE = Connector.getPrepared("average_attendance")
+_STADIUM_TOTAL_GOALS = Connector.getPrepared("stadium_total_goals")
+_PLAYER_IS_WINNER = Connector.getPrepared("player_is_winner")
+_ACTIVE_TALL_TEAMS = Connector.getPrepared("active_tall_teams")
+_ACTIVE_TALL_TEAMS_MATERIALIZED = Connector.getPrepared("active_tall_teams_materialized")
+_ACTIVE_TALL_RICH_TEAMS = Connector.getPrepared("active_tall_rich_teams")
+_ACTIVE_TALL_RICH_TEAMS_MATERIALIZED = Connector.getPrepared("active_tall_rich_teams_materialized")
+_POPULAR_TEAMS = Connector.getPrepared("popular_teams")
+_POPULAR_TEAMS_MATERIALIZED = Connector.getPrepared("popular_teams_materialized")
+_MOST_GOALS_FOR_TEAM = Connector.getPrepared("most_goals_for_team")
+_CLOSE_PLAYERS = Connector.getPrepared("close_players")
+
+
+# like Solution._cachedRead, the entries are shared with the Solution function of the same name
+def _cachedRead(tables: List[str], onError):
+    def decorator(read):
+        @functools.wraps(read)
+        async def cached(*args):
+            key = (read.__name__, args, Bookkeeping.tableGenerations.snapshot(tables))
+            hit, result = Bookkeeping.resultCache.get(key)
+            if hit:
+                return list(result)
+            try:
+                result = await read(*args)
+            except Exception as e:
+                return list(onError)
+            Bookkeeping.resultCache.put(key, tuple(result))
+            return result
+        return cached
+    return decorator
+
+
+# Bookkeeping.scorersChanged on a worker thread, the leaderboards re-read the totals with a blocking query
+async def _scorersChanged(playerIDs: List[int] = None):
+    if Bookkeeping.leaderboard() is not None:
+        await asyncio.get_running_loop().run_in_executor(None, Bookkeeping.scorersChanged, playerIDs)
+
+
+# like Solution._cachedProfile
+def _cachedProfile(kind: str, build, bad):
+    def decorator(read):
+        @functools.wraps(read)
+        async def cached(profileID):
+            key = (kind, profileID)
+            hit, row = Bookkeeping.profileCache.get(key)
+            if not hit:
+                token = Bookkeeping.profileCache.token()
+                try:
+                    row = await read(profileID)
+                except Exception as e:
+                    return bad()
+                Bookkeeping.cacheProfile(key, row, token)
+            return bad() if row is None else build(*row)
+        return cached
+    return decorator
+
+
+async def addTeam(teamID: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_ADD_TEAM, (teamID,))
+        Bookkeeping.tableWritten("teams")
+        return ReturnValue.OK
+    except DatabaseException.ConnectionInvalid as e:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION as e:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def deleteTeam(teamID: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_DELETE_TEAM, (teamID,))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("teams", "players", "stadiums", "matches", "goals", "spectators")
+            Bookkeeping.teamProfilesDeleted(teamID)
+            await _scorersChanged()
+            return ReturnValue.OK
+
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def addMatch(match: Match) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_ADD_MATCH, (match.getMatchID(),
+                                                                               match.getCompetition(),
+                                                                               match.getHomeTeamID(),
+                                                                               match.getAwayTeamID()))
+        Bookkeeping.tableWritten("matches")
+        Bookkeeping.profileCache.invalidate(("match", match.getMatchID()))
+        return ReturnValue.OK
+
+    except DatabaseException.ConnectionInvalid as e:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.FOREIGN_KEY_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION as e:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+@_cachedProfile("match", Match, Match.badMatch)
+async def getMatchProfile(matchID: int) -> Match:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_GET_MATCH_PROFILE, (matchID,))
+        if len(_selected_rows.rows) == 0:
+            return None
+        return _selected_rows.rows[0]
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def deleteMatch(match: Match) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_DELETE_MATCH, (match.getMatchID(),))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("matches", "goals", "spectators")
+            Bookkeeping.profileCache.invalidate(("match", match.getMatchID()))
+            await _scorersChanged()
+            return ReturnValue.OK
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def addPlayer(player: Player) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_ADD_PLAYER, (player.getPlayerID(),
+                                                                                player.getTeamID(),
+                                                                                player.getAge(), player.getHeight(),
+                                                                                player.getFoot()))
+        Bookkeeping.tableWritten("players")
+        Bookkeeping.profileCache.invalidate(("player", player.getPlayerID()))
+        await _scorersChanged([player.getPlayerID()])
+        return ReturnValue.OK
+    except DatabaseException.ConnectionInvalid as e:
+        return ReturnValue.ERROR
+    except DatabaseException.UNIQUE_VIOLATION as e:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.NOT_NULL_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.FOREIGN_KEY_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+@_cachedProfile("player", Player, Player.badPlayer)
+async def getPlayerProfile(playerID: int) -> Player:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_GET_PLAYER_PROFILE, (playerID,))
+        if len(_selected_rows.rows) == 0:
+            return None
+        return _selected_rows.rows[0]
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def deletePlayer(player: Player) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_DELETE_PLAYER, (player.getPlayerID(),))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("players")
+            Bookkeeping.profileCache.invalidate(("player", player.getPlayerID()))
+            await _scorersChanged([player.getPlayerID()])
+            return ReturnValue.OK
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def addStadium(stadium: Stadium) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_ADD_STADIUM, (stadium.getStadiumID(),
+                                                                                 stadium.getCapacity(),
+                                                                                 stadium.getBelongsTo()))
+        Bookkeeping.tableWritten("stadiums")
+        Bookkeeping.profileCache.invalidate(("stadium", stadium.getStadiumID()))
+        return ReturnValue.OK
+
+    except DatabaseException.ConnectionInvalid as e:
+        return ReturnValue.ERROR
+    except DatabaseException.UNIQUE_VIOLATION as e:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.NOT_NULL_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+@_cachedProfile("stadium", Stadium, Stadium.badStadium)
+async def getStadiumProfile(stadiumID: int) -> Stadium:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_GET_STADIUM_PROFILE, (stadiumID,))
+        if len(_selected_rows.rows) == 0:
+            return None
+        return _selected_rows.rows[0]
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def deleteStadium(stadium: Stadium) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_DELETE_STADIUM, (stadium.getStadiumID(),))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("stadiums")
+            Bookkeeping.profileCache.invalidate(("stadium", stadium.getStadiumID()))
+            return ReturnValue.OK
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# Basic API
+
+async def playerScoredInMatch(match: Match, player: Player, amount: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        await conn.executePrepared(_PLAYER_SCORED, (amount, player.getPlayerID(), match.getMatchID()))
+        Bookkeeping.tableWritten("goals")
+        await _scorersChanged([player.getPlayerID()])
+        return ReturnValue.OK
+
+    except DatabaseException.CHECK_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.FOREIGN_KEY_VIOLATION as e:
+        return ReturnValue.NOT_EXISTS
+    except DatabaseException.UNIQUE_VIOLATION as e:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def playerDidntScoreInMatch(match: Match, player: Player) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_affected, _ = await conn.executePrepared(_PLAYER_DIDNT_SCORE, (player.getPlayerID(),
+                                                                           match.getMatchID()))
+        if rows_affected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("goals")
+            await _scorersChanged([player.getPlayerID()])
+            return ReturnValue.OK
+
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def matchInStadium(match: Match, stadium: Stadium, attendance: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        await conn.executePrepared(_MATCH_IN_STADIUM, (attendance, match.getMatchID(), stadium.getStadiumID()))
+        Bookkeeping.tableWritten("spectators")
+        return ReturnValue.OK
+
+    except DatabaseException.CHECK_VIOLATION as e:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.FOREIGN_KEY_VIOLATION as e:
+        return ReturnValue.NOT_EXISTS
+    except DatabaseException.UNIQUE_VIOLATION as e:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def matchNotInStadium(match: Match, stadium: Stadium) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_affected, _ = await conn.executePrepared(_MATCH_NOT_IN_STADIUM, (match.getMatchID(),
+                                                                             stadium.getStadiumID()))
+        if rows_affected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("spectators")
+            return ReturnValue.OK
+
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def averageAttendanceInStadium(stadiumID: int) -> float:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_affected, output = await conn.executePrepared(_AVERAGE_ATTENDANCE, (stadiumID,))
+        if rows_affected == 0:
+            return 0
+        else:
+            return output.rows[0][0]
+
+    except Exception as e:
+        return -1
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def stadiumTotalGoals(stadiumID: int) -> int:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_STADIUM_TOTAL_GOALS, (stadiumID,))
+        if len(_selected_rows.rows) == 0:
+            return 0
+        else:
+            return _selected_rows.rows[0][0]
+
+    except Exception as e:
+        return -1
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def playerIsWinner(playerID: int, matchID: int) -> bool:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_PLAYER_IS_WINNER, (playerID, matchID))
+        if len(_selected_rows.rows) == 0:
+            return False
+        else:
+            return bool(_selected_rows.rows[0][0])
+
+    except Exception as e:
+        return False
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def getActiveTallTeams() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        statement = _ACTIVE_TALL_TEAMS_MATERIALIZED if Bookkeeping.teamViews.enabled else _ACTIVE_TALL_TEAMS
+        rows_effected, _selected_rows = await conn.executePrepared(statement)
+        return [row[0] for row in _selected_rows.rows]
+
+    except Exception as e:
+        return []
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def getActiveTallRichTeams() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        statement = _ACTIVE_TALL_RICH_TEAMS_MATERIALIZED if Bookkeeping.teamViews.enabled else _ACTIVE_TALL_RICH_TEAMS
+        rows_effected, _selected_rows = await conn.executePrepared(statement)
+        return [row[0] for row in _selected_rows.rows]
+
+    except Exception as e:
+        return []
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def popularTeams() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        statement = _POPULAR_TEAMS_MATERIALIZED if Bookkeeping.teamViews.enabled else _POPULAR_TEAMS
+        rows_effected, _selected_rows = await conn.executePrepared(statement)
+        return [row[0] for row in _selected_rows.rows]
+
+    except Exception as e:
+        return []
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# Advanced API
+
+@_cachedRead(["goals", "spectators", "matches"], onError=[])
+async def getMostAttractiveStadiums() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        # asynchronous connections have no server-side cursors, the stadiums are fetched at once
+        rows_effected, _selected_rows = await conn.execute("SELECT NULLIF(stadium_id, 0) " +
+                                                           "FROM stadium_goals " +
+                                                           "ORDER BY total_goals desc, NULLIF(stadium_id, 0) asc ")
+        return [row[0] for row in _selected_rows.rows]
+
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+async def mostGoalsForTeam(teamID: int) -> List[int]:
+    top = Bookkeeping.leaderboardTop(teamID)
+    return await _mostGoalsForTeam(teamID) if top is None else top
+
+
+@_cachedRead(["goals", "players"], onError=[])
+async def _mostGoalsForTeam(teamID: int) -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_MOST_GOALS_FOR_TEAM, (teamID,))
+        return [row[0] for row in _selected_rows.rows]
+
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+@_cachedRead(["goals", "players"], onError=[])
+async def getClosePlayers(playerID: int) -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.connect()
+        rows_effected, _selected_rows = await conn.executePrepared(_CLOSE_PLAYERS, (playerID,))
+        return [row[0] for row in _selected_rows.rows]
+
+    finally:
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,57 @@
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import Utility.DBConnector as Connector
+import Utility.AsyncDBConnector as AsyncConnector
+import Solution
+import AsyncSolution
+from Solution import *
+
+# Thousands of concurrent calls from one event loop: Solution calls handed to a thread pool (the usual way to call
+# blocking code from asyncio) against AsyncSolution calls, both over `pool size` connections. the read caches are
+# off so every call is a round trip.
+# Run from the repository root: python -m Benchmarks.asyncBenchmark [in-flight calls] [pool size]
+
+
+def call(module, i: int):
+    return module.getPlayerProfile(i % 100 + 1) if i % 2 == 0 else module.mostGoalsForTeam(i % 10 + 1)
+
+
+async def threaded(calls: int, threads: int):
+    loop = asyncio.get_event_loop()
+    with ThreadPoolExecutor(threads) as executor:
+        await asyncio.gather(*[loop.run_in_executor(executor, call, Solution, i) for i in range(calls)])
+
+
+async def concurrent(calls: int):
+    await asyncio.gather(*[call(AsyncSolution, i) for i in range(calls)])
+
+
+def callsPerSecond(calls: int, coroutine) -> float:
+    started = time.perf_counter()
+    asyncio.run(coroutine)
+    return calls / (time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    poolSize = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    dropTables()
+    createTables()
+    addTeams(list(range(1, 11)))
+    addPlayers([Player(p, p % 10 + 1, 25, 180, "Left") for p in range(1, 101)])
+    configureProfileCache(0)
+    configureResultCache(0)
+    Connector.configurePool(minSize=1, maxSize=poolSize)
+    AsyncConnector.configurePool(maxSize=poolSize)
+
+    before = callsPerSecond(calls, threaded(calls, poolSize))
+    print(f"Solution in {poolSize} threads:    {before:10.1f} calls/sec")
+    after = callsPerSecond(calls, concurrent(calls))
+    print(f"AsyncSolution, {calls} in flight: {after:10.1f} calls/sec (x{after / before:.2f})")
+
+    AsyncConnector.closePool()
+    dropTables()
+    Connector.closePool()
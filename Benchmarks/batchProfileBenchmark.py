@@ -0,0 +1,37 @@
+import sys
+import time
+from Solution import *
+
+# One getPlayerProfiles call against a loop of getPlayerProfile calls for a squad page, profile cache disabled.
+# Run from the repository root: python -m Benchmarks.batchProfileBenchmark [squad size] [pages]
+
+
+def timed(fn, pages: int) -> float:
+    started = time.perf_counter()
+    for page in range(pages):
+        fn(page)
+    return (time.perf_counter() - started) / pages * 1000
+
+
+if __name__ == '__main__':
+    squad = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    teams = 20
+
+    dropTables()
+    createTables()
+    addTeams(list(range(1, teams + 1)))
+    addPlayers([Player(pID, (pID - 1) // squad + 1, 25, 180, "Right") for pID in range(1, teams * squad + 1)])
+    configureProfileCache(0)
+
+    def squadIDs(page: int) -> list:
+        first = (page % teams) * squad + 1
+        return list(range(first, first + squad))
+
+    loop = timed(lambda page: [getPlayerProfile(pID) for pID in squadIDs(page)], pages)
+    batch = timed(lambda page: getPlayerProfiles(squadIDs(page)), pages)
+    print(f"loop of getPlayerProfile: {loop:.3f} ms per squad of {squad}")
+    print(f"getPlayerProfiles:        {batch:.3f} ms per squad of {squad} (x{loop / batch:.1f})")
+
+    configureProfileCache()
+    dropTables()
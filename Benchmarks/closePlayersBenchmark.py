@@ -0,0 +1,33 @@
+import sys
+import time
+import Utility.DBConnector as Connector
+import Utility.CoScoring  # keep the numpy/scipy import out of the timing
+from Solution import *
+from Benchmarks.league import buildLeague
+
+# Close players of every player of a league: a getClosePlayers call per player against one getAllClosePlayers.
+# Run from the repository root: python -m Benchmarks.closePlayersBenchmark [teams]
+
+if __name__ == '__main__':
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+
+    dropTables()
+    createTables()
+    league = buildLeague(teams)
+    print(f"league: {league}")
+    configureResultCache(0)
+
+    started = time.perf_counter()
+    looped = {playerID: getClosePlayers(playerID) for playerID in range(1, league["players"] + 1)}
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bulk = getAllClosePlayers()
+    bulk_time = time.perf_counter() - started
+
+    print(f"getClosePlayers per player: {loop_time:.3f}s")
+    print(f"getAllClosePlayers:         {bulk_time:.3f}s (x{loop_time / bulk_time:.1f})")
+    print(f"same result: {looped == bulk}")
+
+    dropTables()
+    Connector.closePool()
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import tempfile
+import Utility.DBConnector as Connector
+from Utility.Dataset import Dataset, generate
+from Solution import *
+from Benchmarks.league import buildLeague
+
+# Setting up a league of the same size three ways: through the Solution API and INSERTs (buildLeague), by COPYing
+# a generated dataset (loadDataset), and by restoring that dataset from its snapshot file.
+# Run from the repository root: python -m Benchmarks.datasetBenchmark [teams]
+
+if __name__ == '__main__':
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    dropTables()
+    createTables()
+
+    started = time.perf_counter()
+    league = buildLeague(teams, matchesPerTeam=38, scorersPerMatch=3)
+    build_time = time.perf_counter() - started
+    print(f"buildLeague:              {build_time:8.2f}s  {league}")
+    clearTables()
+
+    started = time.perf_counter()
+    dataset = generate(teams=teams, seed=0)
+    generate_time = time.perf_counter() - started
+    started = time.perf_counter()
+    loadDataset(dataset)
+    load_time = time.perf_counter() - started
+    print(f"generate + loadDataset:   {generate_time + load_time:8.2f}s  {dataset} "
+          f"(generate {generate_time:.2f}s, load {load_time:.2f}s, x{build_time / (generate_time + load_time):.1f})")
+
+    path = os.path.join(tempfile.mkdtemp(), "league.dataset")
+    started = time.perf_counter()
+    dumpDataset().save(path)
+    save_time = time.perf_counter() - started
+    clearTables()
+    started = time.perf_counter()
+    loadDataset(Dataset.load(path))
+    restore_time = time.perf_counter() - started
+    print(f"dumpDataset + save:       {save_time:8.2f}s  {os.path.getsize(path) / 2 ** 20:.1f} MB")
+    print(f"restore from file:        {restore_time:8.2f}s  (x{build_time / restore_time:.1f})")
+
+    os.remove(path)
+    dropTables()
+    Connector.closePool()
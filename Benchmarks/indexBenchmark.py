@@ -0,0 +1,83 @@
+import re
+import sys
+import json
+import Utility.DBConnector as Connector
+import Solution
+from Solution import *
+from Benchmarks.league import buildLeague
+
+# Builds a league at scale and records the EXPLAIN (ANALYZE, BUFFERS) plans of the Solution queries without and
+# with the secondary indexes createTables makes.
+# Run from the repository root: python -m Benchmarks.indexBenchmark [teams] [output.json]
+
+PLACEHOLDER = re.compile(r"\$(\d+)")
+
+# prepared statement name -> parameters to explain it with
+EXPLAINED = {
+    "get_player_profile": lambda league: (league["players"] // 2,),
+    "average_attendance": lambda league: (league["teams"] // 2,),
+    "stadium_total_goals": lambda league: (league["teams"] // 2,),
+    "player_is_winner": lambda league: (league["players"] // 2, league["matches"] // 2),
+    "most_goals_for_team": lambda league: (league["teams"] // 2,),
+    "close_players": lambda league: (league["players"] // 2,),
+    "active_tall_teams": lambda league: (),
+    "active_tall_rich_teams": lambda league: (),
+    "popular_teams": lambda league: (),
+}
+
+
+def explain(conn: Connector.DBConnector, name: str, params: tuple) -> dict:
+    statement = Connector.getPrepared(name).statement
+    query = PLACEHOLDER.sub(lambda m: "%(p" + m.group(1) + ")s", statement)
+    bound = {"p" + str(i + 1): value for i, value in enumerate(params)}
+    _, plan = conn.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params=bound)
+    lines = [row[0] for row in plan.rows]
+    execution = [line for line in lines if line.startswith("Execution Time")]
+    return {"plan": lines, "execution_ms": float(execution[0].split()[2]) if execution else None}
+
+
+def explainAll(league: dict) -> dict:
+    conn = Connector.DBConnector()
+    try:
+        conn.execute("ANALYZE")
+        return {name: explain(conn, name, params(league)) for name, params in EXPLAINED.items()}
+    finally:
+        conn.close()
+
+
+def setIndexes(create: bool):
+    conn = Connector.DBConnector()
+    try:
+        for index_name, index_definition in Solution._SECONDARY_INDEXES:
+            if create:
+                conn.execute(index_definition)
+            else:
+                conn.execute("DROP INDEX IF EXISTS " + index_name)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    output = sys.argv[2] if len(sys.argv) > 2 else "index_plans.json"
+
+    dropTables()
+    createTables()
+    league = buildLeague(teams)
+    print(f"league: {league}")
+
+    setIndexes(False)
+    before = explainAll(league)
+    setIndexes(True)
+    after = explainAll(league)
+
+    report = {"league": league, "queries": {}}
+    for name in EXPLAINED:
+        report["queries"][name] = {"before": before[name], "after": after[name]}
+        print(f"{name:<25} {before[name]['execution_ms']:10.3f} ms -> {after[name]['execution_ms']:10.3f} ms")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"plans written to {output}")
+
+    dropTables()
+    Connector.closePool()
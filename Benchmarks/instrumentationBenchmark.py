@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import timeit
+import tempfile
+import Utility.DBConnector as Connector
+from Utility import Instrumentation
+from Solution import *
+
+# Cost of the query instrumentation: the same getPlayerProfile loop with no sink installed, with a StatsSink, and
+# with a StatsSink plus a JSON-lines file. the uninstrumented baseline runs the query on the bare cursor, the
+# difference to "no sinks" is what the hooks cost while disabled.
+# Run from the repository root: python -m Benchmarks.instrumentationBenchmark [calls]
+
+_GET_PLAYER_PROFILE = Connector.getPrepared("get_player_profile")
+
+
+def bareLoop(calls: int) -> float:
+    conn = Connector.DBConnector()
+    try:
+        started = time.perf_counter()
+        for i in range(calls):
+            conn.cursor.execute(_GET_PLAYER_PROFILE.executeQuery(), (i % 100 + 1,))
+            conn.cursor.fetchall()
+            conn.commit()
+        return time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def connectorLoop(calls: int) -> float:
+    conn = Connector.DBConnector()
+    try:
+        conn.executePrepared(_GET_PLAYER_PROFILE, (1,))  # PREPAREd outside of the timing
+        started = time.perf_counter()
+        for i in range(calls):
+            conn.executePrepared(_GET_PLAYER_PROFILE, (i % 100 + 1,))
+        return time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+# the best round of each loop in microseconds per call, the rounds of the loops alternate so that the noise of
+# the machine hits all of them alike
+def best(loops: list, calls: int, rounds: int = 7) -> list:
+    timings = [[] for _ in loops]
+    for _ in range(rounds):
+        for loop, samples in zip(loops, timings):
+            samples.append(loop(calls))
+    return [min(samples) / calls * 10 ** 6 for samples in timings]
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    dropTables()
+    createTables()
+    addTeam(1)
+    addPlayers([Player(p, 1, 25, 180, "Left") for p in range(1, 101)])
+    connectorLoop(10)
+
+    bare, disabled = best([bareLoop, connectorLoop], calls)
+    check = timeit.timeit("if Instrumentation.sinks: pass", globals=globals(), number=10 ** 6)  # us per check
+    stats = Instrumentation.addSink(Instrumentation.StatsSink())
+    withStats, = best([connectorLoop], calls)
+    path = os.path.join(tempfile.mkdtemp(), "queries.jsonl")
+    jsonLines = Instrumentation.addSink(Instrumentation.JsonLinesSink(path))
+    withJson, = best([connectorLoop], calls)
+    Instrumentation.clearSinks()
+    jsonLines.close()
+
+    print(f"bare cursor:             {bare:8.1f} us/call")
+    print(f"execute, no sinks:       {disabled:8.1f} us/call (the disabled hook itself: {check * 1000:.0f} ns)")
+    print(f"execute, StatsSink:      {withStats:8.1f} us/call ({(withStats - disabled) / disabled * 100:+.1f}%)")
+    print(f"execute, + JSON lines:   {withJson:8.1f} us/call ({(withJson - disabled) / disabled * 100:+.1f}%)")
+    print(stats.report(5))
+
+    os.remove(path)
+    dropTables()
+    Connector.closePool()
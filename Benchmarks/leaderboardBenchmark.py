@@ -0,0 +1,62 @@
+import sys
+import time
+import random
+import Utility.DBConnector as Connector
+from Utility.Dataset import generate
+from Solution import *
+
+# Live scorer leaderboards (useLeaderboards) on a generated league: a client polling mostGoalsForTeam of every team
+# after each goal, answered by a query (result cache off, every goal invalidates it anyway) and by the in-process
+# leaderboards, then what keeping the leaderboards current adds to playerScoredInMatch, and how many changes of a
+# top 5 the goals pushed to a subscriber
+# Run from the repository root: python -m Benchmarks.leaderboardBenchmark [teams] [goals]
+
+
+# (microseconds per goal, microseconds per poll of every team) of `goals` goals each followed by a poll
+def scoreAndPoll(dataset, goals: int, first: int) -> (float, float):
+    rnd = random.Random(first)
+    players = dataset.rows("players")
+    matches = dataset.rows("matches")
+    teams = sorted({row[1] for row in players})
+    scoring = polling = 0.0
+    for i in range(goals):
+        match = Match(first + i, "Domestic", matches[0][2], matches[0][3])
+        assert addMatch(match) == ReturnValue.OK
+        playerID, teamID = rnd.choice(players)[:2]
+        started = time.perf_counter()
+        assert playerScoredInMatch(match, Player(playerID, teamID, 0, 0, ""), rnd.randint(1, 3)) == ReturnValue.OK
+        scoring += time.perf_counter() - started
+        started = time.perf_counter()
+        for teamID in teams:
+            mostGoalsForTeam(teamID)
+        polling += time.perf_counter() - started
+    return scoring / goals * 10 ** 6, polling / goals * 10 ** 6
+
+
+if __name__ == '__main__':
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    goals = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    dataset = generate(teams=teams)
+    dropTables()
+    createTables()
+    loadDataset(dataset)
+    configureResultCache(0)
+    print(f"{teams} teams, {dataset.rowCount('players')} players, {dataset.rowCount('goals')} goals")
+
+    scoring, polling = scoreAndPoll(dataset, goals, 10 ** 7)
+    print(f"queries:       goal {scoring:8.1f} us, poll of {teams} teams {polling:10.1f} us")
+
+    started = time.perf_counter()
+    board = useLeaderboards()
+    print(f"leaderboards seeded in {(time.perf_counter() - started) * 1000:.1f} ms")
+    pushed = []
+    board.subscribe(lambda teamID, standings: pushed.append(teamID))
+    boardScoring, boardPolling = scoreAndPoll(dataset, goals, 2 * 10 ** 7)
+    print(f"leaderboards:  goal {boardScoring:8.1f} us, poll of {teams} teams {boardPolling:10.1f} us "
+          f"(poll x{polling / boardPolling:.1f}, goal +{boardScoring - scoring:.1f} us)")
+    print(f"{len(pushed)} of {goals} goals changed a top 5 and were pushed")
+
+    useLeaderboards(False)
+    configureResultCache()
+    dropTables()
+    Connector.closePool()
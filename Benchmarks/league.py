@@ -0,0 +1,56 @@
+import random
+import Utility.DBConnector as Connector
+import Utility.Bookkeeping as Bookkeeping
+from Solution import *
+
+# Synthetic leagues for the benchmarks, the fixtures of main.py at any scale: teams 1..n each with a stadium and
+# playersPerTeam players, matches between random pairs of teams, scorersPerMatch distinct scorers of 1..maxGoals
+# goals per match and the attendance of spectatorRate of the matches.
+# the teams, stadiums, players and matches go through the bulk Solution API, the goals and spectators are sent as
+# multi-row INSERTs (the summary triggers still run)
+
+# attendance distribution name -> rnd -> attendance
+ATTENDANCES = {
+    "uniform": lambda rnd: rnd.randint(5000, 80000),
+    "normal": lambda rnd: max(0, int(rnd.gauss(40000, 15000))),
+    # most matches draw a small crowd, a few are sold out
+    "skewed": lambda rnd: min(90000, int(rnd.paretovariate(1.5) * 4000)),
+}
+
+
+def buildLeague(teams: int, playersPerTeam: int = 25, matchesPerTeam: int = 40, scorersPerMatch: int = 3,
+                seed: int = 0, maxGoals: int = 3, attendance: str = "uniform", spectatorRate: float = 1.0,
+                pageSize: int = 5000) -> dict:
+    rnd = random.Random(seed)
+    addTeams(list(range(1, teams + 1)))
+    addStadiums([Stadium(t, rnd.randint(20000, 90000), t) for t in range(1, teams + 1)])
+    players = teams * playersPerTeam
+    addPlayers([Player(p, (p - 1) // playersPerTeam + 1, rnd.randint(18, 38), rnd.randint(170, 205),
+                       rnd.choice(["Left", "Right"])) for p in range(1, players + 1)])
+    matches = teams * matchesPerTeam // 2
+    match_list = []
+    for m in range(1, matches + 1):
+        home, away = rnd.sample(range(1, teams + 1), 2)
+        match_list.append(Match(m, rnd.choice(["Domestic", "International"]), home, away))
+    for start in range(0, matches, pageSize * 10):
+        addMatches(match_list[start:start + pageSize * 10])
+
+    goals = []
+    for m in match_list:
+        squads = [(m.getHomeTeamID() - 1) * playersPerTeam, (m.getAwayTeamID() - 1) * playersPerTeam]
+        candidates = [squad + p for squad in squads for p in range(1, playersPerTeam + 1)]
+        for player in rnd.sample(candidates, min(scorersPerMatch, len(candidates))):
+            goals.append((rnd.randint(1, maxGoals), player, m.getMatchID()))
+    pick = ATTENDANCES[attendance]
+    spectators = [(pick(rnd), m.getMatchID(), m.getHomeTeamID()) for m in match_list if rnd.random() < spectatorRate]
+
+    conn = Connector.DBConnector()
+    try:
+        # goals first, a spectators row then sums its match's goals once instead of every goal updating a stadium
+        conn.executeValues("INSERT INTO goals VALUES %s", goals, pageSize=pageSize)
+        conn.executeValues("INSERT INTO spectators VALUES %s", spectators, pageSize=pageSize)
+    finally:
+        conn.close()
+    Bookkeeping.tableWritten("goals", "spectators", count=len(goals) + len(spectators))
+    return {"teams": teams, "players": players, "matches": matches, "goal_events": len(goals),
+            "spectators": len(spectators)}
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from collections import Counter
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Solution import *
+from Benchmarks.league import buildLeague
+from Utility.Dataset import Dataset, generate
+
+# Drives a weighted mix of Solution calls from N threads in each of P processes for a fixed time, then reports
+# the calls/sec, latency percentiles and the ReturnValue (or exception) breakdown of every function.
+# Run from the repository root, e.g.
+#   python -m Benchmarks.loadGenerator --threads 8 --processes 2 --seconds 20 \
+#       --mix addMatch=5,playerScoredInMatch=20,matchInStadium=5,getPlayerProfile=55,getClosePlayers=15
+
+DEFAULT_MIX = "addMatch=5,playerScoredInMatch=20,matchInStadium=5,getPlayerProfile=50,mostGoalsForTeam=10," \
+              "getClosePlayers=10"
+NEW_MATCHES_PER_WORKER = 10 ** 6  # the match IDs a worker adds start at the league's last match + worker * this
+
+
+# one call of an operation: (rnd, worker state) -> the Solution result
+def _addMatch(rnd: random.Random, state: dict):
+    state["next_match"] += 1
+    home, away = rnd.sample(range(1, state["teams"] + 1), 2)
+    result = addMatch(Match(state["next_match"], rnd.choice(["Domestic", "International"]), home, away))
+    if result == ReturnValue.OK:
+        state["added"].append(state["next_match"])
+    return result
+
+
+def _playerScoredInMatch(rnd: random.Random, state: dict):
+    return playerScoredInMatch(Match(rnd.randint(1, state["matches"])), Player(rnd.randint(1, state["players"])),
+                               rnd.randint(1, 3))
+
+
+# the league's matches already have their spectators, prefer a match this worker added
+def _matchInStadium(rnd: random.Random, state: dict):
+    matchID = state["added"].pop() if state["added"] else rnd.randint(1, state["matches"])
+    return matchInStadium(Match(matchID), Stadium(rnd.randint(1, state["teams"])), rnd.randint(5000, 80000))
+
+
+OPERATIONS = {
+    # writes, contending on the goals and spectators rows (and their summary rows)
+    "addMatch": _addMatch,
+    "playerScoredInMatch": _playerScoredInMatch,
+    "playerDidntScoreInMatch": lambda rnd, state: playerDidntScoreInMatch(Match(rnd.randint(1, state["matches"])),
+                                                                          Player(rnd.randint(1, state["players"]))),
+    "matchInStadium": _matchInStadium,
+    # point reads
+    "getPlayerProfile": lambda rnd, state: getPlayerProfile(rnd.randint(1, state["players"])),
+    "getMatchProfile": lambda rnd, state: getMatchProfile(rnd.randint(1, state["matches"])),
+    "stadiumTotalGoals": lambda rnd, state: stadiumTotalGoals(rnd.randint(1, state["teams"])),
+    "playerIsWinner": lambda rnd, state: playerIsWinner(rnd.randint(1, state["players"]),
+                                                        rnd.randint(1, state["matches"])),
+    # analytics
+    "mostGoalsForTeam": lambda rnd, state: mostGoalsForTeam(rnd.randint(1, state["teams"])),
+    "getClosePlayers": lambda rnd, state: getClosePlayers(rnd.randint(1, state["players"])),
+    "getMostAttractiveStadiums": lambda rnd, state: getMostAttractiveStadiums(),
+    "getActiveTallTeams": lambda rnd, state: getActiveTallTeams(),
+    "popularTeams": lambda rnd, state: popularTeams(),
+}
+
+
+def parseMix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError("Unknown operation " + name + ", one of " + ", ".join(OPERATIONS))
+        weights[name] = float(weight or 1)
+    return weights
+
+
+PROFILE_IDS = {Player: Player.getPlayerID, Match: Match.getMatchID, Stadium: Stadium.getStadiumID}
+
+
+# what a call returned, for the breakdown
+def outcome(result) -> str:
+    if isinstance(result, ReturnValue):
+        return result.name
+    for profile, getID in PROFILE_IDS.items():
+        if isinstance(result, profile):
+            return "OK" if getID(result) is not None else "NOT_EXISTS"  # the bad profile
+    return "OK"
+
+
+def worker(index: int, league: dict, weights: dict, startAt: float, deadline: float, seed: int, results: list):
+    rnd = random.Random(seed * 1000 + index)
+    state = dict(league, next_match=league["last_match"] + index * NEW_MATCHES_PER_WORKER, added=[])
+    names, chances = list(weights), list(weights.values())
+    latencies = {name: [] for name in names}
+    outcomes = {name: Counter() for name in names}
+    time.sleep(max(0.0, startAt - time.time()))
+    while time.time() < deadline:
+        name = rnd.choices(names, chances)[0]
+        started = time.perf_counter()
+        try:
+            result = outcome(OPERATIONS[name](rnd, state))
+        except Exception as e:
+            result = type(e).__name__
+        latencies[name].append(time.perf_counter() - started)
+        outcomes[name][result] += 1
+    results.append((latencies, outcomes))
+
+
+# the threads of one process, returns {name: (latencies, outcomes)}
+def runProcess(process: int, threads: int, league: dict, weights: dict, startAt: float, deadline: float,
+               seed: int, poolSize: int, caches: bool) -> dict:
+    Connector.configurePool(maxSize=poolSize)
+    if not caches:
+        configureProfileCache(0)
+        configureResultCache(0)
+    results = []
+    workers = [threading.Thread(target=worker, args=(process * threads + i, league, weights, startAt, deadline, seed,
+                                                     results)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    Connector.closePool()
+
+    merged = {name: ([], Counter()) for name in weights}
+    for latencies, outcomes in results:
+        for name in weights:
+            merged[name][0].extend(latencies[name])
+            merged[name][1].update(outcomes[name])
+    return merged
+
+
+def percentile(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else 0.0
+
+
+def report(merged: dict, seconds: float) -> dict:
+    summary = {}
+    for name, (latencies, outcomes) in merged.items():
+        ordered = sorted(latencies)
+        summary[name] = {"calls": len(ordered), "calls_per_sec": len(ordered) / seconds,
+                         "p50_ms": percentile(ordered, 0.50), "p90_ms": percentile(ordered, 0.90),
+                         "p99_ms": percentile(ordered, 0.99), "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+                         "outcomes": dict(outcomes)}
+    total = sum(entry["calls"] for entry in summary.values())
+    return {"calls": total, "calls_per_sec": total / seconds, "operations": summary}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent load on the Solution API")
+    parser.add_argument("--threads", type=int, default=4, help="threads per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight,... of " + ", ".join(OPERATIONS))
+    parser.add_argument("--pool", type=int, default=None, help="connections per process (default: threads)")
+    parser.add_argument("--teams", type=int, default=50, help="size of the league built before the run")
+    parser.add_argument("--dataset", help="set up from this dataset file instead, generated (--teams) and saved "
+                                          "on the first run")
+    parser.add_argument("--no-setup", action="store_true", help="run on the tables as they are")
+    parser.add_argument("--no-cache", action="store_true", help="turn the profile and result caches off")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    weights = parseMix(args.mix)
+
+    if args.no_setup:
+        conn = Connector.DBConnector()
+        try:
+            # the league's own matches are numbered 1..n, the ones earlier runs added come after a gap
+            _, counts = conn.execute("SELECT (SELECT COUNT(*) FROM teams), (SELECT COUNT(*) FROM players), " +
+                                     "(SELECT MAX(match_id) FROM matches WHERE match_id <= " +
+                                     "(SELECT COUNT(*) FROM matches)), (SELECT MAX(match_id) FROM matches)")
+        finally:
+            conn.close()
+        league = {"teams": counts[0][0], "players": counts[0][1], "matches": counts[0][2] or 0,
+                  "last_match": counts[0][3] or 0}
+    elif args.dataset:
+        dropTables()
+        createTables()
+        if os.path.exists(args.dataset):
+            dataset = Dataset.load(args.dataset)
+        else:
+            dataset = generate(teams=args.teams, seed=args.seed)
+            dataset.save(args.dataset)
+        if loadDataset(dataset) != ReturnValue.OK:
+            raise RuntimeError("Could not load " + args.dataset)
+        counts = dataset.counts()
+        league = {"teams": counts["teams"], "players": counts["players"], "matches": counts["matches"],
+                  "last_match": counts["matches"]}
+    else:
+        dropTables()
+        createTables()
+        league = buildLeague(args.teams, seed=args.seed)
+        league["last_match"] = league["matches"]
+    Connector.closePool()
+    print(f"league: {league}")
+
+    startAt = time.time() + (2 if args.processes > 1 else 0)  # all the spawned processes are up by then
+    deadline = startAt + args.seconds
+    processArgs = [(p, args.threads, league, weights, startAt, deadline, args.seed, args.pool or args.threads,
+                    not args.no_cache) for p in range(args.processes)]
+    if args.processes == 1:
+        parts = [runProcess(*processArgs[0])]
+    else:
+        # spawned, a forked child would share the parent's pooled sockets
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            parts = pool.starmap(runProcess, processArgs)
+    seconds = args.seconds
+
+    merged = {name: ([], Counter()) for name in weights}
+    for part in parts:
+        for name, (latencies, outcomes) in part.items():
+            merged[name][0].extend(latencies)
+            merged[name][1].update(outcomes)
+    result = report(merged, seconds)
+    result.update({"league": league, "threads": args.threads, "processes": args.processes, "mix": weights,
+                   "seconds": seconds, "caches": not args.no_cache})
+
+    print(f"{args.processes} process(es) x {args.threads} thread(s), {seconds:.1f}s: "
+          f"{result['calls']} calls, {result['calls_per_sec']:.1f} calls/sec")
+    for name, entry in result["operations"].items():
+        outcomes = ", ".join(f"{key}={value}" for key, value in sorted(entry["outcomes"].items()))
+        print(f"{name:<26} {entry['calls_per_sec']:9.1f}/s  p50 {entry['p50_ms']:7.2f}ms  "
+              f"p90 {entry['p90_ms']:7.2f}ms  p99 {entry['p99_ms']:7.2f}ms  max {entry['max_ms']:8.2f}ms  {outcomes}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"report written to {args.json}")
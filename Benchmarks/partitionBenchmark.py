@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import random
+import Utility.DBConnector as Connector
+from Utility.Dataset import generate
+from Solution import *
+
+# The plain and the partitioned layout (createTables(partitions=n)) on the same generated league: the partitions of
+# goals/spectators the plans of the match-scoped calls touch (partition pruning), and their time per call.
+# matchNotInStadium is timed together with the matchInStadium that puts the attendance back.
+# the prepared statements of the partitioned tables are planned for every call by default (their generic plan is
+# estimated to cost more than planning with the actual IDs), the last run forces the generic plan, which prunes
+# the partitions at run time instead
+# Run from the repository root: python -m Benchmarks.partitionBenchmark [teams] [partitions]
+
+_PLAYER_IS_WINNER = Connector.getPrepared("player_is_winner")
+_MATCH_NOT_IN_STADIUM = Connector.getPrepared("match_not_in_stadium")
+
+
+# the partitions a plan reads, and the ones pruned at run time ("Subplans Removed")
+def scannedPartitions(node: dict) -> (list, int):
+    relation = node.get("Relation Name", "")
+    scanned = [relation] if relation.startswith(("goals_p", "spectators_p")) else []
+    removed = node.get("Subplans Removed", 0)
+    for child in node.get("Plans", []):
+        childScanned, childRemoved = scannedPartitions(child)
+        scanned += childScanned
+        removed += childRemoved
+    return scanned, removed
+
+
+def describe(statement, params) -> str:
+    conn = Connector.DBConnector()
+    try:
+        for _ in range(6):  # past the custom plans, to the generic plan the calls run with
+            conn.explain(statement.executeQuery(), params)
+        plan = conn.explain(statement.executeQuery(), params)
+    finally:
+        conn.close()
+    scanned, removed = scannedPartitions(plan["Plan"])
+    return f"{', '.join(sorted(set(scanned))) or 'no partitions'} ({removed} pruned at run time)"
+
+
+def timeCalls(dataset, calls: int) -> (float, float):
+    rnd = random.Random(0)
+    goals = dataset.rows("goals")
+    spectators = [row for row in dataset.rows("spectators") if row[2] is not None]
+    configureResultCache(0)
+    started = time.perf_counter()
+    for _ in range(calls):
+        _, player, match = rnd.choice(goals)
+        playerIsWinner(player, match)
+    winner = (time.perf_counter() - started) / calls * 10 ** 6
+    started = time.perf_counter()
+    for _ in range(calls):
+        attendance, match, stadium = rnd.choice(spectators)
+        assert matchNotInStadium(Match(match, "", 0, 0), Stadium(stadium, 0, 0)) == ReturnValue.OK
+        assert matchInStadium(Match(match, "", 0, 0), Stadium(stadium, 0, 0), attendance) == ReturnValue.OK
+    moved = (time.perf_counter() - started) / calls * 10 ** 6
+    return winner, moved
+
+
+if __name__ == '__main__':
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    partitions = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    dataset = generate(teams=teams)
+    print(f"{dataset.rowCount('goals')} goals, {dataset.rowCount('spectators')} spectators rows")
+    _, player, match = dataset.rows("goals")[0]
+    attendance, spectated, stadium = next(row for row in dataset.rows("spectators") if row[2] is not None)
+
+    for layout, planCacheMode in ((0, "auto"), (partitions, "auto"), (partitions, "force_generic_plan")):
+        os.environ["PGOPTIONS"] = "-c plan_cache_mode=" + planCacheMode  # for the connections opened from now on
+        Connector.closePool()
+        dropTables()
+        createTables(partitions=layout)
+        loadDataset(dataset)
+        print(f"\n{'not partitioned' if layout == 0 else str(layout) + ' hash partitions'}, "
+              f"plan_cache_mode={planCacheMode}:")
+        print(f"  playerIsWinner reads       {describe(_PLAYER_IS_WINNER, (player, match))}")
+        print(f"  matchNotInStadium reads    {describe(_MATCH_NOT_IN_STADIUM, (spectated, stadium))}")
+        winner, moved = timeCalls(dataset, 2000)
+        print(f"  playerIsWinner             {winner:8.1f} us/call")
+        print(f"  matchNotInStadium + back   {moved:8.1f} us/call")
+
+    dropTables()
+    Connector.closePool()
@@ -0,0 +1,54 @@
+import sys
+import time
+import threading
+import Utility.DBConnector as Connector
+from Solution import *
+
+# Compares Solution calls/sec with a new connection per call against pooled connections.
+# Run from the repository root: python -m Benchmarks.poolBenchmark [seconds] [threads]
+
+
+def callsPerSecond(seconds: float, threads: int) -> float:
+    calls = [0] * threads
+    stop_at = time.perf_counter() + seconds
+
+    def worker(index: int):
+        player_id = index % 10 + 1
+        while time.perf_counter() < stop_at:
+            getPlayerProfile(player_id)
+            mostGoalsForTeam(1)
+            calls[index] += 2
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(calls) / (time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    dropTables()
+    createTables()
+    addTeam(1)
+    for pID in range(1, 11):
+        addPlayer(Player(pID, 1, 25, 180 + pID, "Left"))
+    # measure the round trips, not the read caches
+    configureProfileCache(0)
+    configureResultCache(0)
+
+    Connector.configurePool(enabled=False)
+    before = callsPerSecond(seconds, threads)
+    print(f"connect per call: {before:.1f} calls/sec")
+
+    Connector.configurePool(enabled=True, minSize=threads, maxSize=threads)
+    after = callsPerSecond(seconds, threads)
+    print(f"pooled ({threads} connections): {after:.1f} calls/sec")
+    print(f"speedup: x{after / before:.2f}")
+
+    dropTables()
+    Connector.closePool()
@@ -0,0 +1,69 @@
+import re
+import sys
+import time
+import Utility.DBConnector as Connector
+from Solution import *
+from psycopg2 import sql
+
+# Point lookups with inlined literals (the SQL Solution used to compose) against the prepared statements
+# Solution executes now. Reports calls/sec and the server side planning time of both.
+# Run from the repository root: python -m Benchmarks.preparedBenchmark [lookups]
+
+PLANNING_TIME = re.compile(r"Planning Time: ([0-9.]+) ms")
+
+
+def literalLookup(conn: Connector.DBConnector, playerID: int):
+    query = sql.SQL("SELECT * " +
+                    "FROM players " +
+                    "WHERE player_id = {playerID}").format(playerID=sql.Literal(playerID))
+    return conn.execute(query)
+
+
+def preparedLookup(conn: Connector.DBConnector, playerID: int):
+    return conn.executePrepared(Connector.getPrepared("get_player_profile"), (playerID,))
+
+
+def timeLookups(conn: Connector.DBConnector, lookup, lookups: int, players: int) -> float:
+    started = time.perf_counter()
+    for i in range(lookups):
+        lookup(conn, i % players + 1)
+    return lookups / (time.perf_counter() - started)
+
+
+def planningTime(conn: Connector.DBConnector, explained: str, params: tuple, runs: int) -> float:
+    total = 0.0
+    for _ in range(runs):
+        _, plan = conn.execute("EXPLAIN (ANALYZE, SUMMARY) " + explained, params=params)
+        for row in plan.rows:
+            match = PLANNING_TIME.search(row[0])
+            if match:
+                total += float(match.group(1))
+    return total / runs
+
+
+if __name__ == '__main__':
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    players = 1000
+
+    dropTables()
+    createTables()
+    addTeams([1, 2])
+    addPlayers([Player(pID, pID % 2 + 1, 25, 170 + pID % 30, "Right") for pID in range(1, players + 1)])
+
+    conn = Connector.DBConnector()
+    try:
+        preparedLookup(conn, 1)  # PREPARE on this connection outside of the timing
+        literal = timeLookups(conn, literalLookup, lookups, players)
+        prepared = timeLookups(conn, preparedLookup, lookups, players)
+        print(f"literal SQL:        {literal:10.1f} lookups/sec")
+        print(f"prepared statement: {prepared:10.1f} lookups/sec (x{prepared / literal:.2f})")
+
+        literal_plan = planningTime(conn, "SELECT * FROM players WHERE player_id = %s", (7,), 50)
+        prepared_plan = planningTime(conn, "EXECUTE get_player_profile(%s)", (7,), 50)
+        print(f"planning time, literal SQL:        {literal_plan:.4f} ms")
+        print(f"planning time, prepared statement: {prepared_plan:.4f} ms (generic plan is reused)")
+    finally:
+        conn.close()
+
+    dropTables()
+    Connector.closePool()
@@ -0,0 +1,54 @@
+import sys
+import time
+import random
+from Solution import *
+
+# Latency percentiles of getPlayerProfile for hot keys (a few players asked over and over) and cold keys
+# (every player asked once, cache emptied first), with and without the profile cache.
+# Run from the repository root: python -m Benchmarks.profileCacheBenchmark [players] [lookups]
+
+
+def percentiles(latencies: list) -> str:
+    ordered = sorted(latencies)
+
+    def at(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return f"p50={at(0.50):.3f}ms p90={at(0.90):.3f}ms p99={at(0.99):.3f}ms max={ordered[-1] * 1000:.3f}ms"
+
+
+def measure(ids: list) -> list:
+    latencies = []
+    for playerID in ids:
+        started = time.perf_counter()
+        getPlayerProfile(playerID)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+if __name__ == '__main__':
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rnd = random.Random(0)
+
+    dropTables()
+    createTables()
+    addTeams(list(range(1, 11)))
+    addPlayers([Player(pID, pID % 10 + 1, 25, 180, "Left") for pID in range(1, players + 1)])
+
+    hot = [rnd.randint(1, 20) for _ in range(lookups)]
+    cold = list(range(1, players + 1))
+    missing = [players + i for i in range(1, 1001)] * 5  # misses, answered from the cached "bad" profiles
+
+    for enabled in (False, True):
+        configureProfileCache(10000 if enabled else 0)
+        clearProfileCache()
+        label = "cache on " if enabled else "cache off"
+        print(f"{label} hot keys:     {percentiles(measure(hot))}")
+        clearProfileCache()
+        print(f"{label} cold keys:    {percentiles(measure(cold))}")
+        clearProfileCache()
+        print(f"{label} missing keys: {percentiles(measure(missing))}")
+
+    print(profileCacheStats())
+    dropTables()
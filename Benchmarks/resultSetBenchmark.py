@@ -0,0 +1,66 @@
+import sys
+import time
+from collections import namedtuple
+from Utility.DBConnector import ResultSet, ResultSetDict
+
+# Micro-benchmark of ResultSet row access, no database needed.
+# a ResultSetRow is a Python object with a Python __getitem__, so even without a per-row dict a row access stays
+# about 10x the cost of indexing the raw tuple (rs.rows) - code that walks large results should use rs.rows.
+# Run from the repository root: python -m Benchmarks.resultSetBenchmark [rows]
+
+Column = namedtuple("Column", ["name"])
+
+
+def timed(label: str, fn, rows: int, baseline: float = None) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    ratio = "" if baseline is None else f" (x{elapsed / baseline:.2f} of raw tuples)"
+    print(f"{label:<40} {elapsed:8.3f}s  {rows / elapsed / 1e6:6.2f}M rows/sec{ratio}")
+    return elapsed
+
+
+# the row access ResultSet used to do: a new dict per row and a lowercase per lookup
+def dictRow(values: tuple, header: list) -> ResultSetDict:
+    row = ResultSetDict()
+    for val, col in zip(values, header):
+        row[col] = val
+    return row
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    description = [Column("player_id"), Column("team_id"), Column("age"), Column("height"), Column("prefered_foot")]
+    rows = [(i, i % 20 + 1, 20 + i % 15, 170 + i % 30, "Left") for i in range(1, count + 1)]
+    rs = ResultSet(description, rows)
+
+    def raw():
+        total = 0
+        for values in rs.rows:
+            total += values[3]
+
+    def viewsByName():
+        total = 0
+        for row in rs:
+            total += row["height"]
+
+    def viewsByIndex():
+        total = 0
+        for row in rs:
+            total += row[3]
+
+    def indexed():
+        total = 0
+        for i in range(rs.size()):
+            total += rs[i]["height"]
+
+    def dicts():
+        total = 0
+        for values in rs.rows:
+            total += dictRow(values, rs.cols_header)["height"]
+
+    base = timed("raw tuples", raw, count)
+    timed("ResultSet iteration, by name", viewsByName, count, base)
+    timed("ResultSet iteration, by index", viewsByIndex, count, base)
+    timed("rs[i][name]", indexed, count, base)
+    timed("dict per row (previous ResultSet rows)", dicts, count, base)
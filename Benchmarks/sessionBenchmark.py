@@ -0,0 +1,78 @@
+import sys
+import time
+import random
+import Utility.DBConnector as Connector
+from Solution import *
+
+# Match ingestion throughput: every match is addMatch + matchInStadium + 3 playerScoredInMatch, ingested with a
+# commit per Solution call, in a session per match, and in sessions of 50 matches. then the read-only fast path:
+# the same profile read on a connector in a transaction (BEGIN + query + COMMIT) and on a read-only one (autocommit)
+# Run from the repository root: python -m Benchmarks.sessionBenchmark [matches]
+
+_GET_PLAYER_PROFILE = Connector.getPrepared("get_player_profile")
+TEAMS = 20
+PLAYERS_PER_TEAM = 25
+
+
+def matchCalls(matchID: int, rnd: random.Random) -> list:
+    home, away = rnd.sample(range(1, TEAMS + 1), 2)
+    match = Match(matchID, "Domestic", home, away)
+    calls = [lambda: addMatch(match),
+             lambda: matchInStadium(match, Stadium(home, 0, home), rnd.randint(5000, 60000))]
+    squads = [(home - 1) * PLAYERS_PER_TEAM, (away - 1) * PLAYERS_PER_TEAM]
+    for scorer in rnd.sample(range(2 * PLAYERS_PER_TEAM), 3):
+        player = Player(squads[scorer // PLAYERS_PER_TEAM] + scorer % PLAYERS_PER_TEAM + 1, 0, 0, 0, "")
+        calls.append(lambda player=player: playerScoredInMatch(match, player, 1))
+    return calls
+
+
+# matches/sec ingesting matchIDs first..first+matches-1, perSession matches per session (0 - no sessions)
+def ingest(first: int, matches: int, perSession: int) -> float:
+    rnd = random.Random(first)
+    batches = [[matchCalls(m, rnd) for m in range(start, min(start + max(perSession, 1), first + matches))]
+               for start in range(first, first + matches, max(perSession, 1))]
+    started = time.perf_counter()
+    for batch in batches:
+        if perSession:
+            with session():
+                results = [call() for calls in batch for call in calls]
+        else:
+            results = [call() for calls in batch for call in calls]
+        assert set(results) == {ReturnValue.OK}, results
+    return matches / (time.perf_counter() - started)
+
+
+def readLoop(calls: int, readOnly: bool) -> float:
+    conn = Connector.DBConnector(readOnly=readOnly)
+    try:
+        conn.executePrepared(_GET_PLAYER_PROFILE, (1,))
+        started = time.perf_counter()
+        for i in range(calls):
+            conn.executePrepared(_GET_PLAYER_PROFILE, (i % 100 + 1,))
+        return (time.perf_counter() - started) / calls * 10 ** 6
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    matches = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    dropTables()
+    createTables()
+    addTeams(list(range(1, TEAMS + 1)))
+    addStadiums([Stadium(t, 90000, t) for t in range(1, TEAMS + 1)])
+    addPlayers([Player(p, (p - 1) // PLAYERS_PER_TEAM + 1, 25, 180, "Left")
+                for p in range(1, TEAMS * PLAYERS_PER_TEAM + 1)])
+
+    baseline = ingest(1, matches, 0)
+    print(f"commit per call:         {baseline:8.1f} matches/sec")
+    for perSession in (1, 50):
+        rate = ingest(perSession * 10 ** 6, matches, perSession)
+        print(f"session of {perSession:>3} matches:  {rate:8.1f} matches/sec (x{rate / baseline:.2f})")
+
+    transaction = min(readLoop(2000, False) for _ in range(5))
+    autocommit = min(readLoop(2000, True) for _ in range(5))
+    print(f"profile read, transaction: {transaction:8.1f} us/call")
+    print(f"profile read, read-only:   {autocommit:8.1f} us/call (x{transaction / autocommit:.2f})")
+
+    dropTables()
+    Connector.closePool()
@@ -0,0 +1,47 @@
+import sys
+import argparse
+import Utility.DBConnector as Connector
+from Utility.Dataset import generate
+from Utility.PlanCapture import loadOffenders, formatReport
+from Solution import *
+
+# The worst offenders of a plan capture (Solution.captureSlowPlans(path=...)) and their plans, e.g.
+#   python -m Benchmarks.slowPlans plans.jsonl --top 5
+# or, without a file, capture the plans of the advanced API over a generated league and report them
+#   python -m Benchmarks.slowPlans --teams 400 --threshold 5
+
+
+def demo(teams: int, thresholdMs: float, seed: int) -> str:
+    dropTables()
+    createTables()
+    loadDataset(generate(teams=teams, seed=seed))
+    configureResultCache(0)
+    capture = captureSlowPlans(thresholdMs, background=False)
+    try:
+        for teamID in range(1, 21):
+            mostGoalsForTeam(teamID)
+            getClosePlayers(teamID * 7)
+            stadiumTotalGoals(teamID)
+        popularTeams()
+        getActiveTallRichTeams()
+        getMostAttractiveStadiums()
+    finally:
+        captureSlowPlans(None)
+        dropTables()
+        Connector.closePool()
+    return capture.report(10)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report the slow queries captured with their plans")
+    parser.add_argument("path", nargs="?", help="JSON-lines file of a plan capture")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--teams", type=int, default=400, help="league size of the demo run (no path)")
+    parser.add_argument("--threshold", type=float, default=5.0, help="slow call threshold (ms) of the demo run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.path is None:
+        print(demo(args.teams, args.threshold, args.seed))
+        sys.exit(0)
+    print(formatReport(loadOffenders(args.path)[:args.top]))
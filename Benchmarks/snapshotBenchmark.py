@@ -0,0 +1,59 @@
+import sys
+import time
+import Utility.DBConnector as Connector
+import Solution
+from Utility.Snapshot import ColumnarSnapshot
+from Solution import *
+from Benchmarks.league import buildLeague
+
+# The advanced API answered by the SQL versions against the in-memory columnar snapshot, per call.
+# Run from the repository root: python -m Benchmarks.snapshotBenchmark [teams] [rounds]
+
+
+def timed(calls: dict, rounds: int) -> dict:
+    timings = {}
+    for name, call in calls.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            call()
+        timings[name] = (time.perf_counter() - started) / rounds
+    return timings
+
+
+def apiCalls(api, league: dict) -> dict:
+    return {
+        "getMostAttractiveStadiums": api.getMostAttractiveStadiums,
+        "mostGoalsForTeam": lambda: api.mostGoalsForTeam(league["teams"] // 2),
+        "getActiveTallTeams": api.getActiveTallTeams,
+        "getActiveTallRichTeams": api.getActiveTallRichTeams,
+        "popularTeams": api.popularTeams,
+        "stadiumTotalGoals": lambda: api.stadiumTotalGoals(league["teams"] // 2),
+        "averageAttendanceInStadium": lambda: api.averageAttendanceInStadium(league["teams"] // 2),
+    }
+
+
+if __name__ == '__main__':
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    dropTables()
+    createTables()
+    league = buildLeague(teams)
+    print(f"league: {league}")
+    configureResultCache(0)
+
+    snapshot = ColumnarSnapshot()
+    started = time.perf_counter()
+    snapshot.refresh()
+    print(f"snapshot load: {time.perf_counter() - started:.3f}s, {len(snapshot)} rows")
+
+    database = timed(apiCalls(Solution, league), rounds)
+    # the first call of each fills the snapshot's group-bys, time the second pass too
+    first = timed(apiCalls(snapshot, league), 1)
+    memory = timed(apiCalls(snapshot, league), rounds)
+    for name in database:
+        print(f"{name:<28} sql {database[name] * 1000:8.3f} ms   snapshot {first[name] * 1000:8.3f} ms first, "
+              f"{memory[name] * 1000:8.3f} ms after (x{database[name] / memory[name]:.1f})")
+
+    dropTables()
+    Connector.closePool()
@@ -0,0 +1,212 @@
+import json
+import math
+import time
+import random
+import argparse
+import statistics
+import subprocess
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Solution import *
+from Benchmarks.league import buildLeague, ATTENDANCES
+
+# Times every public Solution function on leagues of growing size (up to 10^6 goals) and scans every view, so the
+# first function/view to stop scaling shows up. the results are written as JSON to compare commits.
+# Run from the repository root, e.g.
+#   python -m Benchmarks.suite --goals 1000,10000,100000,1000000 --output suite.json
+
+FRESH = 10 ** 8  # IDs of the rows the write benchmarks add (and remove again)
+BATCH = 100  # rows per call of the bulk/batch functions
+
+VIEWS = ["goals_stadium_view", "attractive_stadiums_view", "top_players_view", "total_goals_view",
+         "active_teams_view", "active_tall_teams_view", "rich_teams_view", "popular_matches_view",
+         "not_popular_mathces_view"]
+
+
+def fresh(i: int, k: int = 0) -> int:
+    return FRESH + i * BATCH + k
+
+
+# name -> (setup, call, cleanup) of the i-th call, only call is timed. the writes leave the league as
+# they found it
+def functions(league: dict) -> dict:
+    rnd = random.Random(1)
+    pick = lambda key: rnd.randint(1, league[key])
+    goal = lambda: rnd.choice(league["goal_pairs"])
+    newPlayer = lambda i: addPlayer(Player(fresh(i), 1, 25, 180, "Left"))
+    newMatch = lambda i: addMatch(Match(fresh(i), "Domestic", 1, 2))
+    return {
+        "addTeam": (None, lambda i: addTeam(fresh(i)), lambda i: deleteTeam(fresh(i))),
+        "deleteTeam": (lambda i: addTeam(fresh(i)), lambda i: deleteTeam(fresh(i)), None),
+        "addMatch": (None, newMatch, lambda i: deleteMatch(Match(fresh(i)))),
+        "getMatchProfile": (None, lambda i: getMatchProfile(pick("matches")), None),
+        "deleteMatch": (newMatch, lambda i: deleteMatch(Match(fresh(i))), None),
+        "addPlayer": (None, newPlayer, lambda i: deletePlayer(Player(fresh(i)))),
+        "getPlayerProfile": (None, lambda i: getPlayerProfile(pick("players")), None),
+        "deletePlayer": (newPlayer, lambda i: deletePlayer(Player(fresh(i))), None),
+        "addStadium": (None, lambda i: addStadium(Stadium(fresh(i), 50000)),
+                       lambda i: deleteStadium(Stadium(fresh(i)))),
+        "getStadiumProfile": (None, lambda i: getStadiumProfile(pick("teams")), None),
+        "deleteStadium": (lambda i: addStadium(Stadium(fresh(i), 50000)),
+                          lambda i: deleteStadium(Stadium(fresh(i))), None),
+        "addTeams": (None, lambda i: addTeams([fresh(i, k) for k in range(BATCH)]),
+                     lambda i: [deleteTeam(fresh(i, k)) for k in range(BATCH)]),
+        "addMatches": (None, lambda i: addMatches([Match(fresh(i, k), "Domestic", 1, 2) for k in range(BATCH)]),
+                       lambda i: [deleteMatch(Match(fresh(i, k))) for k in range(BATCH)]),
+        "addPlayers": (None, lambda i: addPlayers([Player(fresh(i, k), 1, 25, 180, "Left") for k in range(BATCH)]),
+                       lambda i: [deletePlayer(Player(fresh(i, k))) for k in range(BATCH)]),
+        "addStadiums": (None, lambda i: addStadiums([Stadium(fresh(i, k), 50000) for k in range(BATCH)]),
+                        lambda i: [deleteStadium(Stadium(fresh(i, k))) for k in range(BATCH)]),
+        "getPlayerProfiles": (None, lambda i: getPlayerProfiles([pick("players") for _ in range(BATCH)]), None),
+        "getMatchProfiles": (None, lambda i: getMatchProfiles([pick("matches") for _ in range(BATCH)]), None),
+        "getStadiumProfiles": (None, lambda i: getStadiumProfiles([pick("teams") for _ in range(BATCH)]), None),
+        "playerScoredInMatch": (newPlayer, lambda i: playerScoredInMatch(Match(1), Player(fresh(i)), 1),
+                                lambda i: (playerDidntScoreInMatch(Match(1), Player(fresh(i))),
+                                           deletePlayer(Player(fresh(i))))),
+        # 0 more goals for goals rows that exist, the batch path without changing the totals
+        "playersScoredInMatches": (None, lambda i: playersScoredInMatches(
+            [(Match(m), Player(p), 0) for p, m in [goal() for _ in range(BATCH)]]), None),
+        "playerDidntScoreInMatch": (lambda i: (newPlayer(i), playerScoredInMatch(Match(1), Player(fresh(i)), 1)),
+                                    lambda i: playerDidntScoreInMatch(Match(1), Player(fresh(i))),
+                                    lambda i: deletePlayer(Player(fresh(i)))),
+        "matchInStadium": (newMatch, lambda i: matchInStadium(Match(fresh(i)), Stadium(1), 30000),
+                           lambda i: deleteMatch(Match(fresh(i)))),
+        "matchNotInStadium": (lambda i: (newMatch(i), matchInStadium(Match(fresh(i)), Stadium(1), 30000)),
+                              lambda i: matchNotInStadium(Match(fresh(i)), Stadium(1)),
+                              lambda i: deleteMatch(Match(fresh(i)))),
+        "averageAttendanceInStadium": (None, lambda i: averageAttendanceInStadium(pick("teams")), None),
+        "stadiumTotalGoals": (None, lambda i: stadiumTotalGoals(pick("teams")), None),
+        "playerIsWinner": (None, lambda i: playerIsWinner(*goal()), None),
+        "getActiveTallTeams": (None, lambda i: getActiveTallTeams(), None),
+        "getActiveTallRichTeams": (None, lambda i: getActiveTallRichTeams(), None),
+        "popularTeams": (None, lambda i: popularTeams(), None),
+        "getMostAttractiveStadiums": (None, lambda i: getMostAttractiveStadiums(), None),
+        "mostGoalsForTeam": (None, lambda i: mostGoalsForTeam(pick("teams")), None),
+        "getClosePlayers": (None, lambda i: getClosePlayers(pick("players")), None),
+        "getAllClosePlayers": (None, lambda i: getAllClosePlayers(), None),
+    }
+
+
+# up to `rounds` calls, fewer once `budget` seconds were spent (but at least 3)
+def timeCalls(setup, call, cleanup, rounds: int, budget: float) -> dict:
+    timings = []
+    failed = 0  # calls that returned a ReturnValue other than OK
+    spent = 0.0
+    for i in range(rounds):
+        if i >= 3 and spent > budget:
+            break
+        if setup is not None:
+            setup(i)
+        started = time.perf_counter()
+        result = call(i)
+        timings.append(time.perf_counter() - started)
+        spent += timings[-1]
+        if isinstance(result, ReturnValue) and result != ReturnValue.OK:
+            failed += 1
+        if cleanup is not None:
+            cleanup(i)
+    return {"calls": len(timings), "failed": failed, "median_ms": statistics.median(timings) * 1000,
+            "mean_ms": statistics.mean(timings) * 1000, "min_ms": min(timings) * 1000,
+            "max_ms": max(timings) * 1000}
+
+
+def timeViews(rounds: int = 3) -> dict:
+    timings = {}
+    conn = Connector.DBConnector()
+    try:
+        for view in VIEWS:
+            samples = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                conn.execute("SELECT COUNT(*) FROM " + view)
+                samples.append(time.perf_counter() - started)
+            timings[view] = {"median_ms": statistics.median(samples) * 1000}
+    finally:
+        conn.close()
+    return timings
+
+
+def goalPairs(limit: int = 10000) -> list:
+    conn = Connector.DBConnector()
+    try:
+        _, rows = conn.execute("SELECT player_id, match_id FROM goals ORDER BY random() LIMIT " + str(limit))
+        return [tuple(row) for row in rows.rows]
+    finally:
+        conn.close()
+
+
+def scalePoint(goals: int, args) -> dict:
+    matches = max(1, goals // args.scorers)
+    teams = max(4, math.ceil(2 * matches / args.matches_per_team))
+    dropTables()
+    createTables()
+    started = time.perf_counter()
+    league = buildLeague(teams, playersPerTeam=args.players_per_team, matchesPerTeam=args.matches_per_team,
+                         scorersPerMatch=args.scorers, seed=args.seed, maxGoals=args.max_goals,
+                         attendance=args.attendance, spectatorRate=args.spectator_rate)
+    build = time.perf_counter() - started
+    conn = Connector.DBConnector()
+    try:
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    print(f"league: {league} built in {build:.1f}s")
+
+    league["goal_pairs"] = goalPairs()
+    results = {}
+    for name, (setup, call, cleanup) in functions(league).items():
+        results[name] = timeCalls(setup, call, cleanup, args.rounds, args.budget)
+        print(f"  {name:<28} {results[name]['median_ms']:10.3f} ms median of {results[name]['calls']}" +
+              (f", {results[name]['failed']} not OK" if results[name]["failed"] else ""))
+    views = timeViews()
+    for view, timing in views.items():
+        print(f"  {view:<28} {timing['median_ms']:10.3f} ms full scan")
+    del league["goal_pairs"]
+    return {"goals": goals, "league": league, "build_seconds": build, "functions": results, "views": views}
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except Exception:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Every Solution function at growing league sizes")
+    parser.add_argument("--goals", default="1000,10000,100000", help="scale points, goals rows of each league")
+    parser.add_argument("--players-per-team", type=int, default=25)
+    parser.add_argument("--matches-per-team", type=int, default=40)
+    parser.add_argument("--scorers", type=int, default=5, help="distinct scorers per match (goal density)")
+    parser.add_argument("--max-goals", type=int, default=3, help="goals of a scorer in a match, 1..max")
+    parser.add_argument("--attendance", default="uniform", choices=sorted(ATTENDANCES))
+    parser.add_argument("--spectator-rate", type=float, default=0.9, help="share of matches with spectators")
+    parser.add_argument("--rounds", type=int, default=20, help="calls per function")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds per function before stopping early")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="suite.json")
+    args = parser.parse_args()
+
+    configureProfileCache(0)
+    configureResultCache(0)
+    scales = [int(goals) for goals in args.goals.split(",")]
+    report = {"commit": commit(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "settings": {key: value for key, value in vars(args).items() if key != "output"},
+              "scales": [scalePoint(goals, args) for goals in scales]}
+    dropTables()
+    Connector.closePool()
+
+    # growth from the smallest to the largest league, the first to stop scaling come first
+    first, last = report["scales"][0], report["scales"][-1]
+    growth = {name: last["functions"][name]["median_ms"] / max(first["functions"][name]["median_ms"], 1e-6)
+              for name in first["functions"]}
+    growth.update({view: last["views"][view]["median_ms"] / max(first["views"][view]["median_ms"], 1e-6)
+                   for view in VIEWS})
+    report["growth"] = growth
+    print(f"slowdown from {scales[0]} to {scales[-1]} goals:")
+    for name, factor in sorted(growth.items(), key=lambda item: -item[1]):
+        print(f"  {name:<28} x{factor:.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
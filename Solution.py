@@ -1,173 +1,558 @@
-from typing import List
+from typing import Dict, List, Tuple
+import io
+import re
+import functools
 import Utility.DBConnector as Connector
 from Utility.ReturnValue import ReturnValue
 from Utility.Exceptions import DatabaseException
+from Utility.MaterializedViews import RefreshPolicy
+import Utility.Bookkeeping as Bookkeeping
 from Business.Match import Match
 from Business.Player import Player
 from Business.Stadium import Stadium
 from psycopg2 import sql
 
 
+# (index name, definition) - the primary keys and UNIQUEs already index player_id/match_id lookups,
+# these cover the other join and filter columns
+_SECONDARY_INDEXES = [
+    # total_goals_view groups goals by match and getClosePlayers self-joins goals on match_id,
+    # INCLUDE lets both be answered from the index alone
+    ("goals_match_idx",
+     "CREATE INDEX goals_match_idx ON goals (match_id) INCLUDE (player_id, num_goals)"),
+    # averageAttendanceInStadium and the per-stadium goal views
+    ("spectators_stadium_idx",
+     "CREATE INDEX spectators_stadium_idx ON spectators (stadium_id) INCLUDE (num_attendances, match_id)"),
+    # top_players_view / mostGoalsForTeam filter a single team
+    ("players_team_idx",
+     "CREATE INDEX players_team_idx ON players (team_id)"),
+    # active_tall_teams_view only looks at players of 190cm and above
+    ("players_tall_team_idx",
+     "CREATE INDEX players_tall_team_idx ON players (team_id) WHERE height >= 190"),
+    # active_teams_view and popularTeams look teams up by their home/away matches (and team deletes cascade on them)
+    ("matches_home_team_idx",
+     "CREATE INDEX matches_home_team_idx ON matches (home_team_id)"),
+    ("matches_away_team_idx",
+     "CREATE INDEX matches_away_team_idx ON matches (away_team_id)"),
+]
+
+
+# caches the results of a read function that depends on the given tables. the generations are taken before the
+# read, so a result read before a write committed is never returned once the write bumped them. the function
+# raises on errors, those return onError and are not cached
+def _cachedRead(tables: List[str], onError):
+    def decorator(read):
+        @functools.wraps(read)
+        def cached(*args):
+            if Connector.currentSession() is not None:  # may see the session's uncommitted writes, never cached
+                try:
+                    return read(*args)
+                except Exception as e:
+                    return list(onError)
+            key = (read.__name__, args, Bookkeeping.tableGenerations.snapshot(tables))
+            hit, result = Bookkeeping.resultCache.get(key)
+            if hit:
+                return list(result)
+            try:
+                result = read(*args)
+            except Exception as e:
+                return list(onError)
+            Bookkeeping.resultCache.put(key, tuple(result))
+            return result
+        return cached
+    return decorator
+
+
+# wraps a profile getter that returns the row tuple or None, and raises on errors. a fresh object is built on
+# every call so callers can't modify what is cached
+def _cachedProfile(kind: str, build, bad):
+    def decorator(read):
+        @functools.wraps(read)
+        def cached(profileID):
+            key = (kind, profileID)
+            if Connector.currentSession() is not None:  # see _cachedRead
+                try:
+                    row = read(profileID)
+                except Exception as e:
+                    return bad()
+                return bad() if row is None else build(*row)
+            hit, row = Bookkeeping.profileCache.get(key)
+            if not hit:
+                token = Bookkeeping.profileCache.token()
+                try:
+                    row = read(profileID)
+                except Exception as e:
+                    return bad()
+                Bookkeeping.cacheProfile(key, row, token)
+            return bad() if row is None else build(*row)
+        return cached
+    return decorator
+
+
+def configureProfileCache(maxSize: int = 10000, badProfileTTL: float = 1.0):
+    Bookkeeping.configureProfileCache(maxSize, badProfileTTL)
+
+
+def clearProfileCache():
+    Bookkeeping.profileCache.clear()
+
+
+# {"hits", "misses", "size", "maxSize"}
+def profileCacheStats() -> dict:
+    return Bookkeeping.profileCache.stats()
+
+
+# the summary tables recomputed from the base tables in one pass each, what the triggers would have left
+_REBUILD_SUMMARIES = [
+    "DELETE FROM match_goals",
+    "DELETE FROM player_goals",
+    "DELETE FROM stadium_goals",
+    """
+    INSERT INTO match_goals
+        SELECT m.match_id, COUNT(g.match_id), COUNT(g.num_goals), COALESCE(SUM(g.num_goals), 0)
+        FROM matches m LEFT OUTER JOIN goals g USING (match_id)
+        GROUP BY m.match_id
+    """,
+    """
+    INSERT INTO player_goals
+        SELECT p.player_id, p.team_id, COALESCE(SUM(g.num_goals), 0)
+        FROM players p LEFT OUTER JOIN goals g USING (player_id)
+        GROUP BY p.player_id, p.team_id
+    """,
+    """
+    INSERT INTO stadium_goals
+        SELECT COALESCE(s.stadium_id, 0), COUNT(*), SUM(mg.sum_goals)
+        FROM spectators s INNER JOIN match_goals mg USING (match_id)
+        GROUP BY COALESCE(s.stadium_id, 0)
+    """,
+]
+
+
 # Leaving the CRUD part for the end when the dependence between the tables will be much clearer, to know in which order
 # it's preferred to create them
 # BASIC DESIGN IS PROVIDED IN THE DB SCHEMA THAT I CREATED
-def createTables():
-    try:
-        conn = Connector.DBConnector()
-
-        query = sql.SQL("""
-                        CREATE TABLE teams (
-                            team_id INTEGER CHECK(team_id>0),
-                            PRIMARY KEY(team_id)
-                        )
-                        """)
-        conn.execute(query)
-        
-        query = sql.SQL("""
-                        CREATE TABLE players (
-                            player_id INTEGER CHECK(player_id>0),
-                            team_id INTEGER NOT NULL,
-                            age INTEGER NOT NULL,
-                            CHECK(age>0),
-                            height DECIMAL NOT NULL,
-                            CHECK(height>0), 
-                            prefered_foot TEXT NOT NULL,
-                            CHECK(UPPER(prefered_foot)='LEFT' OR UPPER(prefered_foot)='RIGHT'), 
-                            PRIMARY KEY(player_id),
-                            FOREIGN KEY(team_id) REFERENCES teams (team_id) ON DELETE CASCADE
-                        )
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE TABLE stadiums (
-                            stadium_id INTEGER CHECK(stadium_id>0),
-                            capacity INTEGER CHECK(capacity>0),
-                            belongs_to_team INTEGER, 
-                            PRIMARY KEY(stadium_id),
-                            UNIQUE (belongs_to_team),
-                            FOREIGN KEY(belongs_to_team) REFERENCES teams (team_id) ON DELETE CASCADE
-                        )
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE TABLE matches (
-                            match_id INTEGER CHECK(match_id>0),
-                            competition TEXT NOT NULL,
-                            CHECK(UPPER(competition)='INTERNATIONAL' OR UPPER(competition)='DOMESTIC'),
-                            home_team_id INTEGER NOT NULL,
-                            away_team_id INTEGER NOT NULL,
-                            CHECK(away_team_id != home_team_id),
-                            PRIMARY KEY(match_id),
-                            FOREIGN KEY(home_team_id) REFERENCES teams (team_id) ON DELETE CASCADE,
-                            FOREIGN KEY(away_team_id) REFERENCES teams (team_id) ON DELETE CASCADE
-                        )
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE TABLE goals (
-                            num_goals INTEGER check(num_goals >= 0),
-                            player_id INTEGER NOT NULL,
-                            match_id INTEGER NOT NULL,
-                            PRIMARY KEY (player_id,match_id), --redundent to add the stadium match_id is unique enought here
-                            FOREIGN KEY(player_id) REFERENCES players (player_id),
-                            FOREIGN KEY(match_id) REFERENCES matches (match_id)
-                            ON DELETE CASCADE
-                        )
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE TABLE spectators (
-                            num_attendances INTEGER check(num_attendances >= 0),
-                            match_id INTEGER NOT NULL,
-                            stadium_id INTEGER,
-                            UNIQUE(match_id),
-                            FOREIGN KEY(stadium_id) REFERENCES stadiums (stadium_id),
-                            FOREIGN KEY(match_id) REFERENCES matches (match_id)
-                            ON DELETE CASCADE
-                        )
-                        """)
-        conn.execute(query)
-
-
+# the schema migrations, _MIGRATIONS[v] takes the schema from version v to v + 1. createTables runs the missing ones
+# in one transaction and records the version reached in schema_version. a schema change is a new migration, a
+# released one is never edited. the partitioned layout is applied on top of them, see _layoutStatements
+_MIGRATIONS = [
+    # 0 -> 1: the tables and views, as createTables made them before the schema was versioned
+    [
+        """
+            CREATE TABLE teams (
+                team_id INTEGER CHECK(team_id>0),
+                PRIMARY KEY(team_id)
+            )
+            """,
+
+        """
+            CREATE TABLE players (
+                player_id INTEGER CHECK(player_id>0),
+                team_id INTEGER NOT NULL,
+                age INTEGER NOT NULL,
+                CHECK(age>0),
+                height DECIMAL NOT NULL,
+                CHECK(height>0), 
+                prefered_foot TEXT NOT NULL,
+                CHECK(UPPER(prefered_foot)='LEFT' OR UPPER(prefered_foot)='RIGHT'), 
+                PRIMARY KEY(player_id),
+                FOREIGN KEY(team_id) REFERENCES teams (team_id) ON DELETE CASCADE
+            )
+            """,
+
+        """
+            CREATE TABLE stadiums (
+                stadium_id INTEGER CHECK(stadium_id>0),
+                capacity INTEGER CHECK(capacity>0),
+                belongs_to_team INTEGER, 
+                PRIMARY KEY(stadium_id),
+                UNIQUE (belongs_to_team),
+                FOREIGN KEY(belongs_to_team) REFERENCES teams (team_id) ON DELETE CASCADE
+            )
+            """,
+
+        """
+            CREATE TABLE matches (
+                match_id INTEGER CHECK(match_id>0),
+                competition TEXT NOT NULL,
+                CHECK(UPPER(competition)='INTERNATIONAL' OR UPPER(competition)='DOMESTIC'),
+                home_team_id INTEGER NOT NULL,
+                away_team_id INTEGER NOT NULL,
+                CHECK(away_team_id != home_team_id),
+                PRIMARY KEY(match_id),
+                FOREIGN KEY(home_team_id) REFERENCES teams (team_id) ON DELETE CASCADE,
+                FOREIGN KEY(away_team_id) REFERENCES teams (team_id) ON DELETE CASCADE
+            )
+            """,
+
+        """
+            CREATE TABLE goals (
+                num_goals INTEGER check(num_goals >= 0),
+                player_id INTEGER NOT NULL,
+                match_id INTEGER NOT NULL,
+                PRIMARY KEY (player_id,match_id), --redundent to add the stadium match_id is unique enought here
+                FOREIGN KEY(player_id) REFERENCES players (player_id),
+                FOREIGN KEY(match_id) REFERENCES matches (match_id)
+                ON DELETE CASCADE
+            )
+            """,
+
+        """
+            CREATE TABLE spectators (
+                num_attendances INTEGER check(num_attendances >= 0),
+                match_id INTEGER NOT NULL,
+                stadium_id INTEGER,
+                UNIQUE(match_id),
+                FOREIGN KEY(stadium_id) REFERENCES stadiums (stadium_id),
+                FOREIGN KEY(match_id) REFERENCES matches (match_id)
+                ON DELETE CASCADE
+            )
+            """,
 
         # create all views
 
-        query = sql.SQL("""
-                        CREATE VIEW goals_stadium_view AS
-                            SELECT g.*, s.stadium_id
-                            FROM goals g RIGHT OUTER JOIN spectators s USING (match_id)
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW attractive_stadiums_view AS 
-                            SELECT COALESCE(sum(num_goals),0) as attractiveness, stadium_id
-                            FROM goals_stadium_view
-                            GROUP BY stadium_id
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW top_players_view AS 
-                            SELECT COALESCE (SUM(g.num_goals),0) as num_goals, p.player_id, p.team_id
-                            FROM players p LEFT OUTER JOIN goals g USING (player_id)
-                            GROUP BY p.team_id, p.player_id;
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW total_goals_view AS 
-                            SELECT SUM(num_goals) sum_goals, match_id
-                            FROM goals
-                            GROUP BY match_id
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW active_teams_view AS
-                            SELECT t.team_id AS active_team_id
-                            FROM teams t
-                            WHERE t.team_id IN (SELECT away_team_id FROM matches) OR t.team_id IN (SELECT home_team_id FROM matches)
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW active_tall_teams_view AS 
-                            SELECT p.team_id as team_id
-                            FROM active_teams_view a INNER JOIN players p ON (a.active_team_id = p.team_id)
-                            WHERE p.height >= 190
-                            GROUP BY p.team_id 
-                            HAVING COUNT(p.player_id) >= 2
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW rich_teams_view AS
-                            SELECT t.team_id as team_id
-                            FROM teams t INNER JOIN stadiums s ON (t.team_id = s.belongs_to_team)
-                            WHERE s.capacity > 55000
-                        """)
-        conn.execute(query)
-
-        query = sql.SQL("""
-                        CREATE VIEW popular_matches_view AS
-                            SELECT m.home_team_id 
-                            FROM spectators s INNER JOIN matches m USING (match_id)
-                            WHERE s.num_attendances > 40000 and s.stadium_id IS NOT NULL
-                        """)
-        conn.execute(query)
+        """
+            CREATE VIEW goals_stadium_view AS
+                SELECT g.*, s.stadium_id
+                FROM goals g RIGHT OUTER JOIN spectators s USING (match_id)
+            """,
+
+        """
+            CREATE VIEW attractive_stadiums_view AS 
+                SELECT COALESCE(sum(num_goals),0) as attractiveness, stadium_id
+                FROM goals_stadium_view
+                GROUP BY stadium_id
+            """,
+
+        """
+            CREATE VIEW top_players_view AS 
+                SELECT COALESCE (SUM(g.num_goals),0) as num_goals, p.player_id, p.team_id
+                FROM players p LEFT OUTER JOIN goals g USING (player_id)
+                GROUP BY p.team_id, p.player_id;
+            """,
+
+        """
+            CREATE VIEW total_goals_view AS 
+                SELECT SUM(num_goals) sum_goals, match_id
+                FROM goals
+                GROUP BY match_id
+            """,
+
+        """
+            CREATE VIEW active_teams_view AS
+                SELECT t.team_id AS active_team_id
+                FROM teams t
+                WHERE t.team_id IN (SELECT away_team_id FROM matches) OR t.team_id IN (SELECT home_team_id FROM matches)
+            """,
+
+        """
+            CREATE VIEW active_tall_teams_view AS 
+                SELECT p.team_id as team_id
+                FROM active_teams_view a INNER JOIN players p ON (a.active_team_id = p.team_id)
+                WHERE p.height >= 190
+                GROUP BY p.team_id 
+                HAVING COUNT(p.player_id) >= 2
+            """,
+
+        """
+            CREATE VIEW rich_teams_view AS
+                SELECT t.team_id as team_id
+                FROM teams t INNER JOIN stadiums s ON (t.team_id = s.belongs_to_team)
+                WHERE s.capacity > 55000
+            """,
+
+        """
+            CREATE VIEW popular_matches_view AS
+                SELECT m.home_team_id 
+                FROM spectators s INNER JOIN matches m USING (match_id)
+                WHERE s.num_attendances > 40000 and s.stadium_id IS NOT NULL
+            """,
+
+        """
+            CREATE VIEW not_popular_mathces_view AS 
+                SELECT m.home_team_id 
+                FROM spectators s INNER JOIN matches m USING (match_id)
+                WHERE s.num_attendances <= 40000 or s.stadium_id IS NULL
+            """,
+    ],
+
+    # 1 -> 2: the secondary indexes, the summary tables with their triggers (filled from the existing goals) and
+    # the materialized team views
+    [
+        # secondary indexes for the join/filter columns of the views and queries
+        *[index_definition for index_name, index_definition in _SECONDARY_INDEXES],
+
+        # summary tables - the aggregates of the goals/spectators views kept current by triggers, so the reads
+        # cost O(result) instead of re-aggregating every goal ever scored
+
+        # one row per match (total_goals_view), scored_rows counts the non NULL num_goals
+        """
+            CREATE TABLE match_goals (
+                match_id INTEGER NOT NULL,
+                goal_rows INTEGER NOT NULL,
+                scored_rows INTEGER NOT NULL,
+                sum_goals BIGINT NOT NULL,
+                PRIMARY KEY(match_id),
+                FOREIGN KEY(match_id) REFERENCES matches (match_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+            )
+            """,
+
+        # one row per player (top_players_view)
+        """
+            CREATE TABLE player_goals (
+                player_id INTEGER NOT NULL,
+                team_id INTEGER NOT NULL,
+                num_goals BIGINT NOT NULL,
+                PRIMARY KEY(player_id),
+                FOREIGN KEY(player_id) REFERENCES players (player_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+            )
+            """,
+
+        """
+            CREATE INDEX player_goals_team_idx ON player_goals (team_id, num_goals DESC, player_id DESC)
+            """,
+
+        # one row per stadium that hosted a match (attractive_stadiums_view), stadium_id 0 stands for the matches
+        # recorded in spectators without a stadium
+        """
+            CREATE TABLE stadium_goals (
+                stadium_id INTEGER NOT NULL,
+                num_matches INTEGER NOT NULL,
+                total_goals BIGINT NOT NULL,
+                PRIMARY KEY(stadium_id)
+            )
+            """,
+
+        """
+            CREATE FUNCTION matches_summary_trigger() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO match_goals VALUES (NEW.match_id, 0, 0, 0);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+
+        """
+            CREATE FUNCTION players_summary_trigger() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO player_goals VALUES (NEW.player_id, NEW.team_id, 0);
+                ELSE
+                    UPDATE player_goals SET team_id = NEW.team_id WHERE player_id = NEW.player_id;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+
+        # adds (sign=1) or removes (sign=-1) one goals row from the match, player and stadium totals.
+        # match_goals is always updated first, it is the row lock that orders goals and spectators changes of a match
+        """
+            CREATE FUNCTION apply_goals_row(p_player INTEGER, p_match INTEGER, p_goals INTEGER,
+                                            p_sign INTEGER) RETURNS void AS $$
+            DECLARE
+                delta BIGINT := p_sign * COALESCE(p_goals, 0);
+            BEGIN
+                UPDATE match_goals
+                SET goal_rows = goal_rows + p_sign,
+                    scored_rows = scored_rows + CASE WHEN p_goals IS NULL THEN 0 ELSE p_sign END,
+                    sum_goals = sum_goals + delta
+                WHERE match_id = p_match;
+                IF delta != 0 THEN
+                    UPDATE player_goals SET num_goals = num_goals + delta WHERE player_id = p_player;
+                    UPDATE stadium_goals SET total_goals = total_goals + delta
+                    WHERE stadium_id = (SELECT COALESCE(stadium_id, 0) FROM spectators
+                                        WHERE match_id = p_match);
+                END IF;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+
+        """
+            CREATE FUNCTION goals_summary_trigger() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    PERFORM apply_goals_row(OLD.player_id, OLD.match_id, OLD.num_goals, -1);
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    PERFORM apply_goals_row(NEW.player_id, NEW.match_id, NEW.num_goals, 1);
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+
+        # a match moving in/out of a stadium moves all of its goals, they are summed from goals itself
+        """
+            CREATE FUNCTION spectators_summary_trigger() RETURNS trigger AS $$
+            DECLARE
+                match_total BIGINT;
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    PERFORM 1 FROM match_goals WHERE match_id = OLD.match_id FOR UPDATE;
+                    SELECT COALESCE(SUM(num_goals), 0) INTO match_total
+                    FROM goals WHERE match_id = OLD.match_id;
+                    UPDATE stadium_goals
+                    SET num_matches = num_matches - 1, total_goals = total_goals - match_total
+                    WHERE stadium_id = COALESCE(OLD.stadium_id, 0);
+                    DELETE FROM stadium_goals
+                    WHERE stadium_id = COALESCE(OLD.stadium_id, 0) AND num_matches <= 0;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    PERFORM 1 FROM match_goals WHERE match_id = NEW.match_id FOR UPDATE;
+                    SELECT COALESCE(SUM(num_goals), 0) INTO match_total
+                    FROM goals WHERE match_id = NEW.match_id;
+                    INSERT INTO stadium_goals VALUES (COALESCE(NEW.stadium_id, 0), 1, match_total)
+                    ON CONFLICT (stadium_id) DO UPDATE
+                    SET num_matches = stadium_goals.num_matches + 1,
+                        total_goals = stadium_goals.total_goals + EXCLUDED.total_goals;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+
+        # the triggers of the goals and spectators rows a match delete cascades to fire only after both are gone,
+        # too late to find the stadium of the goals. the spectators row is deleted first, while the goals are there
+        """
+            CREATE FUNCTION matches_delete_trigger() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM spectators WHERE match_id = OLD.match_id;
+                RETURN OLD;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+
+        """
+            CREATE TRIGGER matches_summary AFTER INSERT ON matches
+                FOR EACH ROW EXECUTE PROCEDURE matches_summary_trigger();
+            CREATE TRIGGER matches_delete BEFORE DELETE ON matches
+                FOR EACH ROW EXECUTE PROCEDURE matches_delete_trigger();
+            CREATE TRIGGER players_summary AFTER INSERT OR UPDATE OF team_id ON players
+                FOR EACH ROW EXECUTE PROCEDURE players_summary_trigger();
+            CREATE TRIGGER goals_summary AFTER INSERT OR UPDATE OR DELETE ON goals
+                FOR EACH ROW EXECUTE PROCEDURE goals_summary_trigger();
+            CREATE TRIGGER spectators_summary AFTER INSERT OR UPDATE OR DELETE ON spectators
+                FOR EACH ROW EXECUTE PROCEDURE spectators_summary_trigger();
+            """,
+
+        # the triggers lock out the writes to the base tables until the migration commits, the summaries are
+        # filled from rows that can't change underneath
+        *_REBUILD_SUMMARIES,
+
+        # materialized team classifications, the unique indexes allow REFRESH ... CONCURRENTLY
+        """
+            CREATE MATERIALIZED VIEW active_tall_teams_mview AS
+                SELECT team_id FROM active_tall_teams_view;
+            CREATE UNIQUE INDEX active_tall_teams_mview_idx ON active_tall_teams_mview (team_id)
+            """,
+
+        """
+            CREATE MATERIALIZED VIEW active_tall_rich_teams_mview AS
+                SELECT DISTINCT a.team_id
+                FROM active_tall_teams_view a INNER JOIN rich_teams_view r USING (team_id);
+            CREATE UNIQUE INDEX active_tall_rich_teams_mview_idx ON active_tall_rich_teams_mview (team_id)
+            """,
+
+        # one row per home match of a popular team, exactly the rows popularTeams selects
+        """
+            CREATE MATERIALIZED VIEW popular_teams_mview AS
+                SELECT m.match_id, m.home_team_id
+                FROM matches m
+                WHERE m.home_team_id IN (SELECT home_team_id FROM popular_matches_view) AND
+                m.home_team_id NOT IN (SELECT home_team_id FROM not_popular_mathces_view);
+            CREATE UNIQUE INDEX popular_teams_mview_idx ON popular_teams_mview (match_id);
+            CREATE INDEX popular_teams_mview_team_idx ON popular_teams_mview (home_team_id)
+            """,
+    ],
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+
+# one DO block that takes the schema to SCHEMA_VERSION: under an advisory lock (concurrent startups wait for the
+# first one) it reads the version marker and runs the missing migrations. a database created before the marker
+# existed has the layout of version 1. the SELECT after it returns the version it started from
+_BOOTSTRAP = """
+             DO $bootstrap$
+             DECLARE
+                 current INTEGER;
+             BEGIN
+                 PERFORM pg_advisory_xact_lock(hashtext('football schema bootstrap'));
+                 IF to_regclass('schema_version') IS NOT NULL THEN
+                     SELECT version INTO current FROM schema_version;
+                 ELSIF to_regclass('teams') IS NOT NULL THEN
+                     current := 1;
+                 ELSE
+                     current := 0;
+                 END IF;
+                 IF current > {version} THEN
+                     RAISE EXCEPTION 'schema version % is newer than this code (%)', current, {version};
+                 END IF;
+                 PERFORM set_config('football.schema_version_before', current::text, true);
+                 IF current = {version} THEN
+                     RETURN;
+                 END IF;
+                 {migrations}
+                 CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL);
+                 DELETE FROM schema_version;
+                 INSERT INTO schema_version VALUES ({version});
+             END
+             $bootstrap$;
+             SELECT current_setting('football.schema_version_before')::integer
+             """
+
+
+# the optional partitioned layout, for leagues of many seasons: goals and spectators hash partitioned by match_id.
+# whatever concerns a single match (playerIsWinner, the goal/attendance writes, the cascades of deleteMatch) reads
+# one partition only, and the indexes of the partitioned tables are made per partition. the primary/unique keys
+# already include match_id, the Solution API is the same on both layouts
+_PARTITIONED_TABLES = ["goals", "spectators"]
+_CREATE_TABLE = re.compile(r"\s*CREATE TABLE (\w+) \(")
+
+
+# the statements of a migration for the layout with the given number of partitions (0 - not partitioned). the
+# migrations themselves describe the plain layout, the partitioned one is the 0 -> 1 migration with goals and
+# spectators created PARTITION BY HASH, followed by their partitions
+def _layoutStatements(version: int, partitions: int) -> List[str]:
+    statements = list(_MIGRATIONS[version])
+    if version == 0 and partitions > 0:
+        for index, statement in enumerate(statements):
+            created = _CREATE_TABLE.match(statement)
+            if created is not None and created.group(1) in _PARTITIONED_TABLES:
+                statements[index] = statement.rstrip() + " PARTITION BY HASH (match_id)"
+        for table in _PARTITIONED_TABLES:
+            statements += ["CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+                           "FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})".format(
+                               table=table, modulus=partitions, remainder=remainder)
+                           for remainder in range(partitions)]
+    return statements
+
+
+def _bootstrapQuery(partitions: int) -> sql.Composed:
+    migrations = [sql.SQL("IF current < {version} THEN {statements} END IF;").format(
+        version=sql.Literal(version + 1),
+        statements=sql.SQL(" ").join(sql.SQL("EXECUTE {};").format(sql.Literal(statement))
+                                     for statement in _layoutStatements(version, partitions)))
+        for version in range(len(_MIGRATIONS))]
+    return sql.SQL(_BOOTSTRAP).format(version=sql.Literal(SCHEMA_VERSION), migrations=sql.SQL("\n").join(migrations))
+
+
+# creates the schema, or migrates it to SCHEMA_VERSION, in one transaction and one round trip. a no-op when the
+# schema is current, so it is safe (and cheap) to call on every start.
+# partitions > 0 creates goals and spectators with that many hash partitions (see _PARTITIONED_TABLES), an existing
+# schema keeps the layout it was created with
+def createTables(partitions: int = 0):
+    try:
+        conn = Connector.DBConnector()
 
-        query = sql.SQL("""
-                        CREATE VIEW not_popular_mathces_view AS 
-                            SELECT m.home_team_id 
-                            FROM spectators s INNER JOIN matches m USING (match_id)
-                            WHERE s.num_attendances <= 40000 or s.stadium_id IS NULL
-                        """)
-        conn.execute(query)
+        rows_effected, _selected_rows = conn.executeScript(_bootstrapQuery(partitions))
+        if _selected_rows.rows[0][0] != SCHEMA_VERSION:
+            Bookkeeping.teamViews.reset()
+            Bookkeeping.tableGenerations.bumpAll()
+            Bookkeeping.profileCache.clear()
+            Bookkeeping.scorersChanged()
 
     finally:
         conn.close()
@@ -178,10 +563,14 @@ def clearTables():
         conn = Connector.DBConnector()
 
         query = sql.SQL("""
-                        TRUNCATE matches, players, stadiums, teams, goals, spectators CASCADE
+                        TRUNCATE matches, players, stadiums, teams, goals, spectators,
+                                 match_goals, player_goals, stadium_goals CASCADE
                         """)
         conn.execute(query)
-        
+        Bookkeeping.tableWritten("teams", "players", "matches", "stadiums", "spectators", "goals")
+        Bookkeeping.profileCache.clear()
+        Bookkeeping.scorersChanged()
+
     finally:
         conn.close()
 
@@ -198,18 +587,114 @@ def dropTables():
                         CREATE SCHEMA public;
                         """)
         conn.execute(query)
-        
+        Connector.invalidatePrepared()  # the prepared statements refer to the dropped tables
+        Bookkeeping.tableGenerations.bumpAll()
+        Bookkeeping.profileCache.clear()
+        Bookkeeping.scorersChanged()
+
     finally:
         conn.close()
 
 
+_SUMMARY_TRIGGER_TABLES = ["matches", "players", "goals", "spectators"]
+_FOREIGN_KEYS = """
+                SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE contype = 'f' AND connamespace = 'public'::regnamespace AND conparentid = 0
+                """
+
+
+# replaces the content of all the tables with a Utility.Dataset in one transaction. like a restore of pg_dump the
+# rows are COPYed without the foreign keys, secondary indexes and summary triggers, then the keys are validated
+# and the indexes and summary tables built once each - a row at a time all of these cost more than the COPY itself
+def loadDataset(dataset) -> ReturnValue:
+    conn = None
+    try:
+        from Utility.Dataset import TABLES, COLUMNS
+        conn = Connector.DBConnector()
+        conn.execute("""
+                     TRUNCATE matches, players, stadiums, teams, goals, spectators,
+                              match_goals, player_goals, stadium_goals CASCADE
+                     """, commit=False)
+        _, foreignKeys = conn.execute(_FOREIGN_KEYS, commit=False)
+        for table, name, definition in foreignKeys.rows:
+            conn.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.Identifier(table),
+                                                                            sql.Identifier(name)), commit=False)
+        for indexName, indexDefinition in _SECONDARY_INDEXES:
+            conn.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(indexName)), commit=False)
+        for table in _SUMMARY_TRIGGER_TABLES:
+            conn.execute(sql.SQL("ALTER TABLE {} DISABLE TRIGGER USER").format(sql.Identifier(table)), commit=False)
+
+        for table in TABLES:
+            query = sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+                table=sql.Identifier(table), columns=sql.SQL(", ").join(map(sql.Identifier, COLUMNS[table])))
+            conn.copyIn(query, io.StringIO(dataset.tables[table]), commit=False)
+
+        for query in _REBUILD_SUMMARIES:
+            conn.execute(query, commit=False)
+        for table, name, definition in foreignKeys.rows:
+            conn.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} " + definition).format(
+                sql.Identifier(table), sql.Identifier(name)), commit=False)
+        for indexName, indexDefinition in _SECONDARY_INDEXES:
+            conn.execute(sql.SQL(indexDefinition), commit=False)
+        for table in _SUMMARY_TRIGGER_TABLES:
+            conn.execute(sql.SQL("ALTER TABLE {} ENABLE TRIGGER USER").format(sql.Identifier(table)), commit=False)
+        for view in Bookkeeping.teamViews.views:
+            conn.execute(sql.SQL("REFRESH MATERIALIZED VIEW {}").format(sql.Identifier(view)), commit=False)
+        conn.commit()
+        conn.execute("ANALYZE")
+    except (DatabaseException.NOT_NULL_VIOLATION, DatabaseException.CHECK_VIOLATION,
+            DatabaseException.FOREIGN_KEY_VIOLATION, DatabaseException.UNIQUE_VIOLATION) as e:
+        conn.rollback()
+        return ReturnValue.BAD_PARAMS
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+    Bookkeeping.teamViews.reset()
+    Bookkeeping.tableGenerations.bumpAll()
+    Bookkeeping.profileCache.clear()
+    Bookkeeping.scorersChanged()
+    return ReturnValue.OK
+
+
+# the current content of the tables as a Utility.Dataset (to save() as a snapshot file), None on errors
+def dumpDataset():
+    conn = None
+    try:
+        from Utility.Dataset import Dataset, TABLES, COLUMNS, KEYS
+        conn = Connector.DBConnector()
+        conn.repeatableRead(readOnly=True)  # all the tables at one moment
+        tables = {}
+        for table in TABLES:
+            text = io.StringIO()
+            query = sql.SQL("COPY (SELECT {columns} FROM {table} ORDER BY {key}) TO STDOUT WITH (FORMAT csv)").format(
+                columns=sql.SQL(", ").join(map(sql.Identifier, COLUMNS[table])), table=sql.Identifier(table),
+                key=sql.SQL(KEYS[table]))
+            conn.copyOut(query, text, commit=False)
+            tables[table] = text.getvalue()
+        conn.commit()
+        return Dataset(tables)
+    except Exception as e:
+        return None
+    finally:
+        if conn is not None:
+            conn.close()
+
+
 # ####### ----------------------------------------------------------------------------
+_ADD_TEAM = Connector.prepared("add_team", ["integer"], "INSERT INTO teams(team_id) VALUES($1)")
+
+
 def addTeam(teamID: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO teams(team_id) VALUES({teamID})").format(teamID=sql.Literal(teamID))
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_ADD_TEAM, (teamID,))
+        Bookkeeping.tableWritten("teams")
         return ReturnValue.OK
     except DatabaseException.ConnectionInvalid as e:
         return ReturnValue.ERROR
@@ -227,17 +712,44 @@ def addTeam(teamID: int) -> ReturnValue:
         conn.close()
 
 
+_DELETE_TEAM = Connector.prepared("delete_team", ["integer"], "DELETE FROM teams WHERE team_id = $1")
+
+
+# deletes the team together with its players, stadium and matches (ON DELETE CASCADE)
+def deleteTeam(teamID: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, _selected_rows = conn.executePrepared(_DELETE_TEAM, (teamID,))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+        else:
+            Bookkeeping.tableWritten("teams", "players", "stadiums", "matches", "goals", "spectators")
+            Bookkeeping.teamProfilesDeleted(teamID)
+            Bookkeeping.scorersChanged()
+            return ReturnValue.OK
+
+    except DatabaseException.ConnectionInvalid as e:
+        return ReturnValue.ERROR
+    except Exception as e:
+        return ReturnValue.ERROR
+    finally:
+        conn.close()
+
+
+_ADD_MATCH = Connector.prepared("add_match", ["integer", "text", "integer", "integer"],
+                                "INSERT INTO matches VALUES($1, $2, $3, $4)")
+
+
 def addMatch(match: Match) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO matches " +
-                        "VALUES({matchID},{competition},{homeTeamID},{awayTeamID})").format(
-            matchID=sql.Literal(match.getMatchID()),
-            competition=sql.Literal(match.getCompetition()),
-            homeTeamID=sql.Literal(match.getHomeTeamID()),
-            awayTeamID=sql.Literal(match.getAwayTeamID()))
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_ADD_MATCH, (match.getMatchID(), match.getCompetition(),
+                                                                         match.getHomeTeamID(),
+                                                                         match.getAwayTeamID()))
+        Bookkeeping.tableWritten("matches")
+        Bookkeeping.profileCache.invalidate(("match", match.getMatchID()))
         return ReturnValue.OK
 
     except DatabaseException.ConnectionInvalid as e:
@@ -256,33 +768,38 @@ def addMatch(match: Match) -> ReturnValue:
         conn.close()
 
 
+_GET_MATCH_PROFILE = Connector.prepared("get_match_profile", ["integer"],
+                                        "SELECT * FROM matches WHERE match_id = $1")
+
+
+@_cachedProfile("match", Match, Match.badMatch)
 def getMatchProfile(matchID: int) -> Match:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * " +
-                        "FROM matches " +
-                        "WHERE match_id = {matchID}").format(matchID=sql.Literal(matchID))
-        rows_effected, _selected_rows = conn.execute(query)
-        return Match(*_selected_rows.rows[0])  # unpack of the tuple (should be only one)
-    except Exception as e:
-        return Match.badMatch()
+        conn = Connector.DBConnector(readOnly=True)
+        rows_effected, _selected_rows = conn.executePrepared(_GET_MATCH_PROFILE, (matchID,))
+        if len(_selected_rows.rows) == 0:
+            return None
+        return _selected_rows.rows[0]  # the tuple to unpack (should be only one)
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
 
 # confirmed it's ok to use IF on rows_effected based on:
 # todo: https://piazza.com/class/kqz4dh15z2p1m1?cid=74
+_DELETE_MATCH = Connector.prepared("delete_match", ["integer"], "DELETE FROM matches WHERE match_id = $1")
 
 def deleteMatch(match: Match) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM matches " +
-                        "WHERE match_id = {matchID}").format(matchID=sql.Literal(match.getMatchID()))
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_DELETE_MATCH, (match.getMatchID(),))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
         else:
+            Bookkeeping.tableWritten("matches", "goals", "spectators")
+            Bookkeeping.profileCache.invalidate(("match", match.getMatchID()))
+            Bookkeeping.scorersChanged()
             return ReturnValue.OK
     except DatabaseException.ConnectionInvalid as e:
         return ReturnValue.ERROR
@@ -292,19 +809,21 @@ def deleteMatch(match: Match) -> ReturnValue:
         conn.close()
 
 
+_ADD_PLAYER = Connector.prepared("add_player", ["integer", "integer", "integer", "decimal", "text"],
+                                 "INSERT INTO players VALUES($1, $2, $3, $4, $5)")
+
+
 def addPlayer(player: Player) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO players " +
-                        "VALUES({playerID},{teamId},{age},{height},{foot})").format(
-            playerID=sql.Literal(player.getPlayerID()),
-            teamId=sql.Literal(player.getTeamID()),
-            age=sql.Literal(player.getAge()),
-            height=sql.Literal(player.getHeight()),
-            foot=sql.Literal(player.getFoot()))
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_ADD_PLAYER, (player.getPlayerID(), player.getTeamID(),
+                                                                          player.getAge(), player.getHeight(),
+                                                                          player.getFoot()))
 
+        Bookkeeping.tableWritten("players")
+        Bookkeeping.profileCache.invalidate(("player", player.getPlayerID()))
+        Bookkeeping.scorersChanged([player.getPlayerID()])
         return ReturnValue.OK
     except DatabaseException.ConnectionInvalid as e:
         return ReturnValue.ERROR
@@ -322,36 +841,41 @@ def addPlayer(player: Player) -> ReturnValue:
         conn.close()
 
 
+_GET_PLAYER_PROFILE = Connector.prepared("get_player_profile", ["integer"],
+                                         "SELECT * FROM players WHERE player_id = $1")
+
+
+@_cachedProfile("player", Player, Player.badPlayer)
 def getPlayerProfile(playerID: int) -> Player:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * " +
-                        "FROM players " +
-                        "WHERE player_id = {playerID}").format(playerID=sql.Literal(playerID))
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        rows_effected, _selected_rows = conn.executePrepared(_GET_PLAYER_PROFILE, (playerID,))
 
         if len(_selected_rows.rows) == 0:  # No rows were fetched for that player.
-            return Player.badPlayer()
+            return None
         else:
-            return Player(*_selected_rows.rows[0])  # unpack of the tuple (should be only one)
+            return _selected_rows.rows[0]  # the tuple to unpack (should be only one)
 
-    except Exception as e:
-        return Player.badPlayer()
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+
+_DELETE_PLAYER = Connector.prepared("delete_player", ["integer"], "DELETE FROM players WHERE player_id = $1")
 
 
 def deletePlayer(player: Player) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM players " +
-                        "WHERE player_id = {playerID}").format(playerID=sql.Literal(player.getPlayerID()))
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_DELETE_PLAYER, (player.getPlayerID(),))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
         else:
+            Bookkeeping.tableWritten("players")
+            Bookkeeping.profileCache.invalidate(("player", player.getPlayerID()))
+            Bookkeeping.scorersChanged([player.getPlayerID()])
             return ReturnValue.OK
 
     except DatabaseException.ConnectionInvalid as e:
@@ -362,17 +886,19 @@ def deletePlayer(player: Player) -> ReturnValue:
         conn.close()
 
 
+_ADD_STADIUM = Connector.prepared("add_stadium", ["integer", "integer", "integer"],
+                                  "INSERT INTO stadiums VALUES($1, $2, $3)")
+
+
 def addStadium(stadium: Stadium) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO stadiums " +
-                        "VALUES({stadiumID},{capacity},{belongsTo})").format(
-            stadiumID=sql.Literal(stadium.getStadiumID()),
-            capacity=sql.Literal(stadium.getCapacity()),
-            belongsTo=sql.Literal(stadium.getBelongsTo())
-        )
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_ADD_STADIUM, (stadium.getStadiumID(),
+                                                                           stadium.getCapacity(),
+                                                                           stadium.getBelongsTo()))
+        Bookkeeping.tableWritten("stadiums")
+        Bookkeeping.profileCache.invalidate(("stadium", stadium.getStadiumID()))
         return ReturnValue.OK
 
     except DatabaseException.ConnectionInvalid as e:
@@ -391,36 +917,40 @@ def addStadium(stadium: Stadium) -> ReturnValue:
         conn.close()
 
 
+_GET_STADIUM_PROFILE = Connector.prepared("get_stadium_profile", ["integer"],
+                                          "SELECT * FROM stadiums WHERE stadium_id = $1")
+
+
+@_cachedProfile("stadium", Stadium, Stadium.badStadium)
 def getStadiumProfile(stadiumID: int) -> Stadium:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * " +
-                        "FROM stadiums " +
-                        "WHERE stadium_id = {stadiumID}").format(stadiumID=sql.Literal(stadiumID))
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        rows_effected, _selected_rows = conn.executePrepared(_GET_STADIUM_PROFILE, (stadiumID,))
 
         if len(_selected_rows.rows) == 0: # in case the stadium doesn't exist
-            return Stadium.badStadium()
+            return None
         else:
-            return Stadium(*_selected_rows.rows[0])  # unpack of the tuple (should be only one - id is pk)
+            return _selected_rows.rows[0]  # the tuple to unpack (should be only one - id is pk)
 
-    except Exception as e:
-        return Stadium.badStadium()
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+
+_DELETE_STADIUM = Connector.prepared("delete_stadium", ["integer"], "DELETE FROM stadiums WHERE stadium_id = $1")
 
 
 def deleteStadium(stadium: Stadium) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM stadiums " +
-                        "WHERE stadium_id = {stadiumID}").format(stadiumID=sql.Literal(stadium.getStadiumID()))
-        rows_effected, _selected_rows = conn.execute(query)
+        rows_effected, _selected_rows = conn.executePrepared(_DELETE_STADIUM, (stadium.getStadiumID(),))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
         else:
+            Bookkeeping.tableWritten("stadiums")
+            Bookkeeping.profileCache.invalidate(("stadium", stadium.getStadiumID()))
             return ReturnValue.OK
 
     except DatabaseException.ConnectionInvalid as e:
@@ -430,19 +960,161 @@ def deleteStadium(stadium: Stadium) -> ReturnValue:
     finally:
         conn.close()
 
+# Bulk CRUD - one connection and one transaction for the whole list, the ReturnValue of every row is the same
+# one the single row function would have returned had the rows been added one after the other
+_BULK_PAGE_SIZE = 1000  # rows per INSERT statement
+
+
+def _insertErrorToReturnValue(e: Exception) -> ReturnValue:
+    if isinstance(e, (DatabaseException.NOT_NULL_VIOLATION, DatabaseException.CHECK_VIOLATION,
+                      DatabaseException.FOREIGN_KEY_VIOLATION)):
+        return ReturnValue.BAD_PARAMS
+    if isinstance(e, DatabaseException.UNIQUE_VIOLATION):
+        return ReturnValue.ALREADY_EXISTS
+    return ReturnValue.ERROR
+
+
+# inserts rows[lo:hi] as multi-row INSERTs under a savepoint, a failing range is rolled back and split in two
+# until the failing rows are isolated, so clean data costs a single pass and every bad row a few extra statements
+def _insertRange(conn: Connector.DBConnector, query: sql.Composed, rows: list, lo: int, hi: int,
+                 results: List[ReturnValue]):
+    conn.execute("SAVEPOINT bulk_insert", commit=False)
+    try:
+        conn.executeValues(query, rows[lo:hi], pageSize=_BULK_PAGE_SIZE, commit=False)
+        conn.execute("RELEASE SAVEPOINT bulk_insert", commit=False)
+        return
+    except DatabaseException.ConnectionInvalid:
+        raise
+    except Exception as e:
+        conn.execute("ROLLBACK TO SAVEPOINT bulk_insert", commit=False)
+        conn.execute("RELEASE SAVEPOINT bulk_insert", commit=False)
+        if hi - lo == 1:
+            results[lo] = _insertErrorToReturnValue(e)
+            return
+    middle = (lo + hi) // 2
+    _insertRange(conn, query, rows, lo, middle, results)  # left half first, duplicates keep their order
+    _insertRange(conn, query, rows, middle, hi, results)
+
+
+def _insertMany(table: str, rows: list) -> List[ReturnValue]:
+    if len(rows) == 0:
+        return []
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        results = [ReturnValue.OK] * len(rows)
+        query = sql.SQL("INSERT INTO {table} VALUES %s").format(table=sql.Identifier(table))
+        _insertRange(conn, query, rows, 0, len(rows), results)
+        conn.commit()
+        Bookkeeping.tableWritten(table, count=results.count(ReturnValue.OK))
+        kind = Bookkeeping.PROFILE_KINDS.get(table)
+        if kind is not None:
+            for row, result in zip(rows, results):
+                if result == ReturnValue.OK:
+                    Bookkeeping.profileCache.invalidate((kind, row[0]))  # a cached "bad" profile
+        return results
+    except Exception as e:
+        return [ReturnValue.ERROR] * len(rows)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def addTeams(teamIDs: List[int]) -> List[ReturnValue]:
+    return _insertMany("teams", [(teamID,) for teamID in teamIDs])
+
+
+def addMatches(matches: List[Match]) -> List[ReturnValue]:
+    return _insertMany("matches", [(match.getMatchID(), match.getCompetition(), match.getHomeTeamID(),
+                                    match.getAwayTeamID()) for match in matches])
+
+
+def addPlayers(players: List[Player]) -> List[ReturnValue]:
+    results = _insertMany("players", [(player.getPlayerID(), player.getTeamID(), player.getAge(), player.getHeight(),
+                                       player.getFoot()) for player in players])
+    added = [player.getPlayerID() for player, result in zip(players, results) if result == ReturnValue.OK]
+    if added:
+        Bookkeeping.scorersChanged(added)
+    return results
+
+
+def addStadiums(stadiums: List[Stadium]) -> List[ReturnValue]:
+    return _insertMany("stadiums", [(stadium.getStadiumID(), stadium.getCapacity(), stadium.getBelongsTo())
+                                    for stadium in stadiums])
+
+
+# Batch profile lookups - a single "= ANY(array)" query for all the IDs that are not in the profile cache,
+# returns {ID: profile} with the bad profile for the IDs that don't exist
+def _getProfiles(kind: str, statement: Connector.PreparedStatement, ids: List[int], build, bad) -> dict:
+    rows = {}
+    missing = []
+    cached = Connector.currentSession() is None  # see _cachedRead
+    for profileID in ids:
+        if profileID is None:
+            rows[profileID] = None
+            continue
+        hit, row = Bookkeeping.profileCache.get((kind, profileID)) if cached else (False, None)
+        if hit:
+            rows[profileID] = row
+        elif profileID not in rows:
+            rows[profileID] = None
+            missing.append(profileID)
+
+    if len(missing) > 0:
+        conn = None
+        try:
+            token = Bookkeeping.profileCache.token()
+            conn = Connector.DBConnector(readOnly=True)
+            rows_effected, _selected_rows = conn.executePrepared(statement, (missing,))
+            for row in _selected_rows.rows:
+                rows[row[0]] = row
+            for profileID in missing if cached else ():
+                row = rows[profileID]
+                Bookkeeping.cacheProfile((kind, profileID), row, token)
+        except Exception as e:
+            return {profileID: bad() for profileID in ids}
+        finally:
+            if conn is not None:
+                conn.close()
+
+    return {profileID: bad() if row is None else build(*row) for profileID, row in rows.items()}
+
+
+_GET_PLAYER_PROFILES = Connector.prepared("get_player_profiles", ["integer[]"],
+                                          "SELECT * FROM players WHERE player_id = ANY($1)")
+_GET_MATCH_PROFILES = Connector.prepared("get_match_profiles", ["integer[]"],
+                                         "SELECT * FROM matches WHERE match_id = ANY($1)")
+_GET_STADIUM_PROFILES = Connector.prepared("get_stadium_profiles", ["integer[]"],
+                                           "SELECT * FROM stadiums WHERE stadium_id = ANY($1)")
+
+
+def getPlayerProfiles(playerIDs: List[int]) -> Dict[int, Player]:
+    return _getProfiles("player", _GET_PLAYER_PROFILES, playerIDs, Player, Player.badPlayer)
+
+
+def getMatchProfiles(matchIDs: List[int]) -> Dict[int, Match]:
+    return _getProfiles("match", _GET_MATCH_PROFILES, matchIDs, Match, Match.badMatch)
+
+
+def getStadiumProfiles(stadiumIDs: List[int]) -> Dict[int, Stadium]:
+    return _getProfiles("stadium", _GET_STADIUM_PROFILES, stadiumIDs, Stadium, Stadium.badStadium)
+
+
 # Part 3.3 Implementation - Basic API:
 #todo: How & Where to keep this data - which tables
 
+_PLAYER_SCORED = Connector.prepared("player_scored", ["integer", "integer", "integer"],
+                                    "INSERT INTO Goals VALUES($1, $2, $3)")
+
+
 def playerScoredInMatch(match: Match, player: Player, amount: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("""
-                        INSERT INTO Goals
-                        VALUES({amount}, {player}, {match})
-                        """).format(player=sql.Literal(player.getPlayerID()), match=sql.Literal(match.getMatchID()), amount=sql.Literal(amount))
-        conn.execute(query)
+        conn.executePrepared(_PLAYER_SCORED, (amount, player.getPlayerID(), match.getMatchID()))
 
+        Bookkeeping.tableWritten("goals")
+        Bookkeeping.scorersChanged([player.getPlayerID()])
         return ReturnValue.OK
 
     except DatabaseException.CHECK_VIOLATION as e:
@@ -457,19 +1129,68 @@ def playerScoredInMatch(match: Match, player: Player, amount: int) -> ReturnValu
         conn.close()
 
 
-def playerDidntScoreInMatch(match: Match, player: Player) -> ReturnValue:
+# batched goal ingestion for live feeds - every (match, player, amount) event adds amount goals to the player's
+# record of the match (creating it when needed), all the events are applied by a single statement and commit.
+# returns per event: OK, BAD_PARAMS for a missing/negative amount or missing IDs, NOT_EXISTS for an unknown
+# match/player, ERROR when the batch could not be applied
+def playersScoredInMatches(events: List[Tuple[Match, Player, int]]) -> List[ReturnValue]:
+    results = [ReturnValue.OK] * len(events)
+    deltas = {}  # (player_id, match_id) -> summed amount, a row can be updated only once per statement
+    for index, (match, player, amount) in enumerate(events):
+        key = (player.getPlayerID(), match.getMatchID())
+        if amount is None or amount < 0 or key[0] is None or key[1] is None:
+            results[index] = ReturnValue.BAD_PARAMS
+        else:
+            deltas[key] = deltas.get(key, 0) + amount
+    if len(deltas) == 0:
+        return results
+
     conn = None
     try:
         conn = Connector.DBConnector()
         query = sql.SQL("""
-                        DELETE FROM Goals
-                        WHERE player_id={player} AND match_id={match}
-                        """).format(player=sql.Literal(player.getPlayerID()), match=sql.Literal(match.getMatchID()))
-        rows_affected, _ = conn.execute(query)
+                        INSERT INTO goals (num_goals, player_id, match_id)
+                        SELECT v.num_goals, v.player_id, v.match_id
+                        FROM (VALUES %s) AS v(num_goals, player_id, match_id)
+                            INNER JOIN players p USING (player_id)
+                            INNER JOIN matches m USING (match_id)
+                        ON CONFLICT (player_id, match_id)
+                        DO UPDATE SET num_goals = COALESCE(goals.num_goals, 0) + EXCLUDED.num_goals
+                        RETURNING player_id, match_id
+                        """)
+        rows = [(amount, playerID, matchID) for (playerID, matchID), amount in deltas.items()]
+        _, applied = conn.executeValues(query, rows, pageSize=len(rows), fetch=True)
+        applied = set(applied.rows)
+        for index, (match, player, amount) in enumerate(events):
+            if results[index] == ReturnValue.OK and (player.getPlayerID(), match.getMatchID()) not in applied:
+                results[index] = ReturnValue.NOT_EXISTS
+        Bookkeeping.tableWritten("goals", count=len(applied))
+        if applied:
+            Bookkeeping.scorersChanged(sorted({playerID for playerID, matchID in applied}))
+        return results
+
+    except Exception as e:
+        return [ReturnValue.ERROR if result == ReturnValue.OK else result for result in results]
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+_PLAYER_DIDNT_SCORE = Connector.prepared("player_didnt_score", ["integer", "integer"],
+                                         "DELETE FROM Goals WHERE player_id = $1 AND match_id = $2")
+
+
+def playerDidntScoreInMatch(match: Match, player: Player) -> ReturnValue:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_affected, _ = conn.executePrepared(_PLAYER_DIDNT_SCORE, (player.getPlayerID(), match.getMatchID()))
 
         if rows_affected == 0:
             return ReturnValue.NOT_EXISTS
         else:
+            Bookkeeping.tableWritten("goals")
+            Bookkeeping.scorersChanged([player.getPlayerID()])
             return ReturnValue.OK
 
 
@@ -480,16 +1201,17 @@ def playerDidntScoreInMatch(match: Match, player: Player) -> ReturnValue:
 
 
 
+_MATCH_IN_STADIUM = Connector.prepared("match_in_stadium", ["integer", "integer", "integer"],
+                                       "INSERT INTO Spectators VALUES($1, $2, $3)")
+
+
 def matchInStadium(match: Match, stadium: Stadium, attendance: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("""
-                        INSERT INTO Spectators
-                        VALUES({attendance}, {match}, {stadium})
-                        """).format(attendance=sql.Literal(attendance), match=sql.Literal(match.getMatchID()), stadium=sql.Literal(stadium.getStadiumID()))
-        conn.execute(query)
+        conn.executePrepared(_MATCH_IN_STADIUM, (attendance, match.getMatchID(), stadium.getStadiumID()))
 
+        Bookkeeping.tableWritten("spectators")
         return ReturnValue.OK
 
 
@@ -505,19 +1227,20 @@ def matchInStadium(match: Match, stadium: Stadium, attendance: int) -> ReturnVal
         conn.close()
 
 
+_MATCH_NOT_IN_STADIUM = Connector.prepared("match_not_in_stadium", ["integer", "integer"],
+                                           "DELETE FROM Spectators WHERE match_id = $1 AND stadium_id = $2")
+
+
 def matchNotInStadium(match: Match, stadium: Stadium) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("""
-                        DELETE FROM Spectators
-                        WHERE match_id={match} AND stadium_id={stadium}
-                        """).format(match=sql.Literal(match.getMatchID()), stadium=sql.Literal(stadium.getStadiumID()))
-        rows_affected, _ = conn.execute(query)
+        rows_affected, _ = conn.executePrepared(_MATCH_NOT_IN_STADIUM, (match.getMatchID(), stadium.getStadiumID()))
 
         if rows_affected == 0:
             return ReturnValue.NOT_EXISTS
         else:
+            Bookkeeping.tableWritten("spectators")
             return ReturnValue.OK
 
     except Exception as e:
@@ -526,16 +1249,18 @@ def matchNotInStadium(match: Match, stadium: Stadium) -> ReturnValue:
         conn.close()
 
 
+_AVERAGE_ATTENDANCE = Connector.prepared("average_attendance", ["integer"], """
+                        SELECT AVG(num_attendances) FROM Spectators
+                        WHERE stadium_id = $1
+                        GROUP BY stadium_id
+                        """)
+
+
 def averageAttendanceInStadium(stadiumID: int) -> float:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("""
-                        SELECT AVG(num_attendances) FROM Spectators
-                        WHERE stadium_id={stadium}
-                        GROUP BY stadium_id
-                        """).format(stadium=sql.Literal(stadiumID))
-        rows_affected, output = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        rows_affected, output = conn.executePrepared(_AVERAGE_ATTENDANCE, (stadiumID,))
 
         if rows_affected == 0:
             return 0
@@ -549,15 +1274,17 @@ def averageAttendanceInStadium(stadiumID: int) -> float:
         conn.close()
 
 
+_STADIUM_TOTAL_GOALS = Connector.prepared("stadium_total_goals", ["integer"],
+                                          "SELECT total_goals " +
+                                          "FROM stadium_goals " +
+                                          "WHERE stadium_id = $1 AND stadium_id != 0 ")
+
+
 def stadiumTotalGoals(stadiumID: int) -> int:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT COALESCE(SUM(num_goals),0) " +
-                        "FROM goals_stadium_view " +
-                        "WHERE stadium_id = {stadiumID} " +
-                        "GROUP BY stadium_id ").format(stadiumID=sql.Literal(stadiumID))
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        rows_effected, _selected_rows = conn.executePrepared(_STADIUM_TOTAL_GOALS, (stadiumID,))
 
         if len(_selected_rows.rows) == 0:
             return 0
@@ -570,14 +1297,18 @@ def stadiumTotalGoals(stadiumID: int) -> int:
         conn.close()
 
 
+_PLAYER_IS_WINNER = Connector.prepared("player_is_winner", ["integer", "integer"],
+                                       "SELECT g.player_id " +
+                                       "FROM goals g INNER JOIN match_goals tg USING(match_id) " +
+                                       "WHERE g.player_id = $1 AND g.match_id = $2 AND tg.scored_rows > 0 " +
+                                       "AND g.num_goals >= (0.5*tg.sum_goals) ")
+
+
 def playerIsWinner(playerID: int, matchID: int) -> bool:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT g.player_id " +
-                        "FROM goals g INNER JOIN total_goals_view tg USING(match_id)" +
-                        "WHERE g.player_id = {playerID} AND g.match_id = {matchID} AND g.num_goals >= (0.5*tg.sum_goals) ").format(matchID=sql.Literal(matchID), playerID=sql.Literal(playerID))
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        rows_effected, _selected_rows = conn.executePrepared(_PLAYER_IS_WINNER, (playerID, matchID))
 
         if len(_selected_rows.rows) == 0:
             return False
@@ -590,15 +1321,26 @@ def playerIsWinner(playerID: int, matchID: int) -> bool:
         conn.close()
 
 
+_ACTIVE_TALL_TEAMS = Connector.prepared("active_tall_teams", [],
+                                        "SELECT team_id " +
+                                        "FROM active_tall_teams_view  " +
+                                        "ORDER BY team_id desc " +
+                                        "LIMIT 5 ")
+
+
+_ACTIVE_TALL_TEAMS_MATERIALIZED = Connector.prepared("active_tall_teams_materialized", [],
+                                                     "SELECT team_id " +
+                                                     "FROM active_tall_teams_mview " +
+                                                     "ORDER BY team_id desc " +
+                                                     "LIMIT 5 ")
+
+
 def getActiveTallTeams() -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT team_id " +
-                        "FROM active_tall_teams_view  " +
-                        "ORDER BY team_id desc " +
-                        "LIMIT 5 ")
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        statement = _ACTIVE_TALL_TEAMS_MATERIALIZED if Bookkeeping.teamViews.enabled else _ACTIVE_TALL_TEAMS
+        rows_effected, _selected_rows = conn.executePrepared(statement)
         return [row[0] for row in _selected_rows.rows] # based on https://piazza.com/class/kqz4dh15z2p1m1?cid=97
 
 
@@ -608,15 +1350,26 @@ def getActiveTallTeams() -> List[int]:
         conn.close()
 
 
+_ACTIVE_TALL_RICH_TEAMS = Connector.prepared("active_tall_rich_teams", [],
+                                             "SELECT DISTINCT a.team_id " +
+                                             "FROM active_tall_teams_view a INNER JOIN rich_teams_view r USING (team_id) " +
+                                             "ORDER BY a.team_id asc " +
+                                             "LIMIT 5  ")
+
+
+_ACTIVE_TALL_RICH_TEAMS_MATERIALIZED = Connector.prepared("active_tall_rich_teams_materialized", [],
+                                                          "SELECT team_id " +
+                                                          "FROM active_tall_rich_teams_mview " +
+                                                          "ORDER BY team_id asc " +
+                                                          "LIMIT 5 ")
+
+
 def getActiveTallRichTeams() -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT DISTINCT a.team_id " +
-                        "FROM active_tall_teams_view a INNER JOIN rich_teams_view r USING (team_id) " +
-                        "ORDER BY a.team_id asc " +
-                        "LIMIT 5  ")
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        statement = _ACTIVE_TALL_RICH_TEAMS_MATERIALIZED if Bookkeeping.teamViews.enabled else _ACTIVE_TALL_RICH_TEAMS
+        rows_effected, _selected_rows = conn.executePrepared(statement)
         return [row[0] for row in _selected_rows.rows]  # should return a list
 
     except Exception as e:
@@ -625,11 +1378,7 @@ def getActiveTallRichTeams() -> List[int]:
         conn.close()
 
 
-def popularTeams() -> List[int]:
-    conn = None
-    try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("""
+_POPULAR_TEAMS = Connector.prepared("popular_teams", [], """
                         SELECT m.home_team_id
                         FROM matches m
                         WHERE m.home_team_id IN (SELECT home_team_id FROM popular_matches_view) AND
@@ -637,7 +1386,21 @@ def popularTeams() -> List[int]:
                         ORDER BY m.home_team_id desc 
                         LIMIT 10        
                         """)
-        rows_effected, _selected_rows = conn.execute(query)
+
+
+_POPULAR_TEAMS_MATERIALIZED = Connector.prepared("popular_teams_materialized", [],
+                                                 "SELECT home_team_id " +
+                                                 "FROM popular_teams_mview " +
+                                                 "ORDER BY home_team_id desc " +
+                                                 "LIMIT 10 ")
+
+
+def popularTeams() -> List[int]:
+    conn = None
+    try:
+        conn = Connector.DBConnector(readOnly=True)
+        statement = _POPULAR_TEAMS_MATERIALIZED if Bookkeeping.teamViews.enabled else _POPULAR_TEAMS
+        rows_effected, _selected_rows = conn.executePrepared(statement)
         return [row[0] for row in _selected_rows.rows]  # should return a list
 
     except Exception as e:
@@ -645,69 +1408,178 @@ def popularTeams() -> List[int]:
     finally:
         conn.close()
 
+# Materialized team classifications - getActiveTallTeams, getActiveTallRichTeams and popularTeams read the
+# materialized views while enabled. they are as fresh as the last refresh, see teamViewsStaleness
+def useMaterializedTeamViews(enabled: bool = True, policy: RefreshPolicy = RefreshPolicy.ON_DEMAND,
+                             interval: float = 60.0, writes: int = 100) -> ReturnValue:
+    return ReturnValue.OK if Bookkeeping.teamViews.configure(enabled, policy, interval, writes) else ReturnValue.ERROR
+
+
+def refreshTeamViews(concurrently: bool = False) -> ReturnValue:
+    return ReturnValue.OK if Bookkeeping.teamViews.refresh(concurrently) else ReturnValue.ERROR
+
+
+# {"materialized", "policy", "stale", "writes_since_refresh", "seconds_since_refresh"}
+def teamViewsStaleness() -> dict:
+    return Bookkeeping.teamViews.staleness()
+
+
+# Result cache of the advanced API (getMostAttractiveStadiums, mostGoalsForTeam, getClosePlayers)
+def configureResultCache(maxSize: int = 1024):
+    Bookkeeping.resultCache.resize(maxSize)  # 0 disables caching
+
+
+def clearResultCache():
+    Bookkeeping.resultCache.clear()
+
+
+# {"hits", "misses", "size", "maxSize"}
+def resultCacheStats() -> dict:
+    return Bookkeeping.resultCache.stats()
+
+
+_planCapture = None
+
+
+# opt-in: the queries of the Solution calls slower than thresholdMs are re-run under EXPLAIN (ANALYZE, BUFFERS)
+# and their plans kept (and appended to path if given), see Utility/PlanCapture.py. returns the PlanCapture to
+# read the plans from, thresholdMs=None turns the capture off
+def captureSlowPlans(thresholdMs: float = 100.0, sampleRate: float = 1.0, path: str = None,
+                     background: bool = True):
+    global _planCapture
+    from Utility import Instrumentation
+    from Utility.PlanCapture import PlanCapture
+    if _planCapture is not None:
+        Instrumentation.removeSink(_planCapture)
+        _planCapture.flush()
+        _planCapture = None
+    if thresholdMs is not None:
+        _planCapture = Instrumentation.addSink(PlanCapture(thresholdMs, sampleRate=sampleRate, path=path,
+                                                           background=background))
+    return _planCapture
+
+
+# groups Solution calls into one transaction with a single commit at the end of the with block (a rollback if it
+# raises), e.g. ingesting a match:
+#   with session():
+#       addMatch(match)
+#       matchInStadium(match, stadium, attendance)
+#       playerScoredInMatch(match, player, 2)
+# every call still returns its own ReturnValue, a failed call undoes only its own statements. the reads inside
+# a session see its uncommitted writes and bypass the caches
+def session():
+    return Connector.session()
+
+
+# opt-in: per-team scorer leaderboards kept in this process (see Utility/Leaderboard.py), seeded from the database
+# now and updated by every Solution write that changes a player's goals. mostGoalsForTeam is then answered from
+# them without a query (outside sessions). returns the Leaderboard to subscribe to the pushed top `size` changes,
+# enabled=False drops it
+def useLeaderboards(enabled: bool = True, size: int = 5):
+    from Utility.Leaderboard import Leaderboard
+    Bookkeeping.setLeaderboard(None)
+    if enabled:
+        board = Leaderboard(size)
+        board.refresh()
+        Bookkeeping.setLeaderboard(board)
+    return Bookkeeping.leaderboard()
+
+
 # 3.4 Advanced API - done
 
+@_cachedRead(["goals", "spectators", "matches"], onError=[])
 def getMostAttractiveStadiums() -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT stadium_id " +
-                        "FROM attractive_stadiums_view " +
-                        "ORDER BY attractiveness desc, stadium_id asc ")
-        rows_effected, _selected_rows = conn.execute(query)
-        return [row[0] for row in _selected_rows.rows]
+        conn = Connector.DBConnector(readOnly=True)
+        query = sql.SQL("SELECT NULLIF(stadium_id, 0) " +
+                        "FROM stadium_goals " +
+                        "ORDER BY total_goals desc, NULLIF(stadium_id, 0) asc ")
+        return [row[0] for row in conn.stream(query)]  # one stadium set can be large, stream it
 
-    except Exception as e:
-        return []
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+
+_MOST_GOALS_FOR_TEAM = Connector.prepared("most_goals_for_team", ["integer"],
+                                          "SELECT player_id " +
+                                          "FROM player_goals " +
+                                          "WHERE team_id = $1 " +
+                                          "ORDER BY num_goals desc, player_id desc " +
+                                          "LIMIT 5 ")
 
 
 def mostGoalsForTeam(teamID: int) -> List[int]:
+    top = Bookkeeping.leaderboardTop(teamID)
+    return _mostGoalsForTeam(teamID) if top is None else top
+
+
+@_cachedRead(["goals", "players"], onError=[])
+def _mostGoalsForTeam(teamID: int) -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT player_id " +
-                        "FROM top_players_view " +
-                        "WHERE team_id = {teamID} " +
-                        "ORDER BY num_goals desc, player_id desc " +
-                        "LIMIT 5 ").format(teamID=sql.Literal(teamID))
-        rows_effected, _selected_rows = conn.execute(query)
+        conn = Connector.DBConnector(readOnly=True)
+        rows_effected, _selected_rows = conn.executePrepared(_MOST_GOALS_FOR_TEAM, (teamID,))
         return [row[0] for row in _selected_rows.rows]
 
-    except Exception as e:
-        return []
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
 
 
-def getClosePlayers(playerID: int) -> List[int]:
-    conn = None
-    try:
-        conn = Connector.DBConnector()
-
-        query = sql.SQL("""
+_CLOSE_PLAYERS = Connector.prepared("close_players", ["integer"], """
                         SELECT player_id
                         FROM
                             (
                                 SELECT g2.player_id, COALESCE (COUNT(*),0) AS match_scored
-                                FROM (SELECT player_id, match_id FROM goals WHERE player_id={playerID}) g1 INNER JOIN goals g2 USING (match_id)
+                                FROM (SELECT player_id, match_id FROM goals WHERE player_id=$1) g1 INNER JOIN goals g2 USING (match_id)
                                 WHERE g1.player_id != g2.player_id
                                 GROUP BY g2.player_id
                             ) p1
                             RIGHT OUTER JOIN
                             (
-                                SELECT player_id FROM players WHERE player_id != {playerID}
+                                SELECT player_id FROM players WHERE player_id != $1
                             ) p2
                             USING (player_id)
-                        WHERE COALESCE (match_scored,0) >= 0.5*(SELECT COUNT(*) FROM goals WHERE player_id={playerID})
+                        WHERE COALESCE (match_scored,0) >= 0.5*(SELECT COUNT(*) FROM goals WHERE player_id=$1)
                         ORDER BY p2.player_id
                         LIMIT 10
-                        """).format(playerID=sql.Literal(playerID))
-        rows_effected, _selected_rows = conn.execute(query)
+                        """)
+
+
+@_cachedRead(["goals", "players"], onError=[])
+def getClosePlayers(playerID: int) -> List[int]:
+    conn = None
+    try:
+        conn = Connector.DBConnector(readOnly=True)
+
+        rows_effected, _selected_rows = conn.executePrepared(_CLOSE_PLAYERS, (playerID,))
         return [row[0] for row in _selected_rows.rows]
 
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# the close players of every player, from one read of the scoring incidence instead of a query per player.
+# same rule, ordering and top-10 cut as getClosePlayers, returns {player: close players}
+def getAllClosePlayers() -> Dict[int, List[int]]:
+    from Utility.CoScoring import closePlayers  # numpy/scipy are only needed here
+    conn = None
+    try:
+        conn = Connector.DBConnector(readOnly=True)
+
+        # a player that never scored comes with a NULL match
+        rows_effected, _selected_rows = conn.execute(
+            "SELECT p.player_id, g.match_id FROM players p LEFT OUTER JOIN goals g USING (player_id)")
+        players = [row[0] for row in _selected_rows.rows]
+        goals = [row for row in _selected_rows.rows if row[1] is not None]
+        return closePlayers(players, [row[0] for row in goals], [row[1] for row in goals])
+
     except Exception as e:
-        return []
+        return {}
+
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
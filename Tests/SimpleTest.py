@@ -1,7 +1,19 @@
 import unittest
+import collections.abc
+import os
+import asyncio
+import random
+import time
+import tempfile
 import Solution
+import AsyncSolution
+import Utility.DBConnector as Connector
+from Utility.Snapshot import ColumnarSnapshot
+from Utility.Dataset import Dataset, generate
+from Utility import Instrumentation
 from Utility.ReturnValue import ReturnValue
-from Tests.abstractTest import AbstractTest
+from Utility.Exceptions import DatabaseException
+from Tests.abstractTest import AbstractTest, isolation
 from Business.Match import Match
 from Business.Stadium import Stadium
 from Business.Player import Player
@@ -44,6 +56,631 @@ class Test(AbstractTest):
         self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addStadium(Stadium(1, 5000, 1)), "ID 1 already exists")
         self.assertEqual(ReturnValue.BAD_PARAMS, Solution.addStadium(Stadium(2, 5000, 3)), "teamID 3 not exists")
 
+    def test_BulkInsert(self) -> None:
+        self.assertEqual([ReturnValue.OK, ReturnValue.OK, ReturnValue.ALREADY_EXISTS, ReturnValue.BAD_PARAMS],
+                         Solution.addTeams([1, 2, 1, 0]), "Duplicate and illegal IDs are reported per row")
+        self.assertEqual([ReturnValue.OK, ReturnValue.BAD_PARAMS, ReturnValue.ALREADY_EXISTS],
+                         Solution.addPlayers([Player(1, 1, 20, 185, "Left"), Player(2, 3, 20, 185, "Left"),
+                                              Player(1, 2, 20, 185, "Right")]), "teamID 3 not exists")
+        self.assertEqual([ReturnValue.OK, ReturnValue.BAD_PARAMS],
+                         Solution.addMatches([Match(1, "Domestic", 1, 2), Match(2, "Domestic", 1, 1)]),
+                         "A team can't play itself")
+        self.assertEqual([ReturnValue.OK, ReturnValue.ALREADY_EXISTS],
+                         Solution.addStadiums([Stadium(1, 55000, 1), Stadium(1, 5000, 2)]), "ID 1 already exists")
+        self.assertEqual(1, Solution.getPlayerProfile(1).getTeamID(), "Rows next to a failing row are kept")
+
+    def test_GoalEvents(self) -> None:
+        Solution.addTeams([1, 2])
+        Solution.addPlayers([Player(1, 1, 20, 185, "Left"), Player(2, 2, 20, 185, "Left")])
+        Solution.addMatches([Match(1, "Domestic", 1, 2), Match(2, "Domestic", 2, 1)])
+        events = [(Match(1), Player(1), 1), (Match(1), Player(1), 2), (Match(1), Player(2), 1),
+                  (Match(3), Player(1), 1), (Match(2), Player(2), -1)]
+        self.assertEqual([ReturnValue.OK, ReturnValue.OK, ReturnValue.OK, ReturnValue.NOT_EXISTS,
+                          ReturnValue.BAD_PARAMS], Solution.playersScoredInMatches(events), "Per event status")
+        self.assertEqual([ReturnValue.OK], Solution.playersScoredInMatches([(Match(1), Player(2), 1)]),
+                         "A second goal is added to the existing record")
+        self.assertEqual(True, Solution.playerIsWinner(1, 1), "3 out of 5 goals")
+        self.assertEqual(False, Solution.playerIsWinner(2, 1), "2 out of 5 goals")
+
+    def test_GoalTotals(self) -> None:
+        Solution.addTeams([1, 2])
+        Solution.addPlayers([Player(1, 1, 20, 185, "Left"), Player(2, 2, 20, 185, "Left")])
+        Solution.addMatches([Match(1, "Domestic", 1, 2), Match(2, "Domestic", 2, 1)])
+        Solution.addStadiums([Stadium(1, 55000, 1), Stadium(2, 50000, 2)])
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(1), Player(1), 3), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.matchInStadium(Match(1), Stadium(1), 100), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.matchInStadium(Match(2), Stadium(2), 100), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(2), Player(2), 1), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(1), Player(2), 1), "Should work")
+        self.assertEqual(4, Solution.stadiumTotalGoals(1), "Goals before and after the match got a stadium")
+        self.assertEqual([1, 2], Solution.getMostAttractiveStadiums(), "4 goals vs 1 goal")
+        self.assertEqual([2, 1], Solution.mostGoalsForTeam(2) + Solution.mostGoalsForTeam(1), "One player each")
+        self.assertEqual(ReturnValue.OK, Solution.deleteMatch(Match(1)), "Should work")
+        self.assertEqual(0, Solution.stadiumTotalGoals(1), "Match 1 and its goals are gone")
+        self.assertEqual([2], Solution.getMostAttractiveStadiums(), "Stadium 1 hosts no match anymore")
+        self.assertEqual(True, Solution.playerIsWinner(2, 2), "The only scorer of match 2")
+        Solution.addMatch(Match(3, "Domestic", 2, 1))
+        Solution.matchInStadium(Match(3), Stadium(2), 100)
+        Solution.playerScoredInMatch(Match(3), Player(1), 5)
+        self.assertEqual(ReturnValue.OK, Solution.deleteMatch(Match(3)), "Should work")
+        self.assertEqual(1, Solution.stadiumTotalGoals(2), "The goals of match 3 left stadium 2 with it")
+
+    def test_ResultCache(self) -> None:
+        Solution.addTeams([1, 2])
+        Solution.addPlayers([Player(1, 1, 20, 185, "Left"), Player(2, 1, 20, 185, "Left")])
+        Solution.addMatch(Match(1, "Domestic", 1, 2))
+        self.assertEqual([2, 1], Solution.mostGoalsForTeam(1), "No goals, ordered by ID")
+        hits = Solution.resultCacheStats()["hits"]
+        self.assertEqual([2, 1], Solution.mostGoalsForTeam(1), "Same result from the cache")
+        self.assertEqual(hits + 1, Solution.resultCacheStats()["hits"], "Second call is a hit")
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(1), Player(1), 2), "Should work")
+        self.assertEqual([1, 2], Solution.mostGoalsForTeam(1), "The goal invalidated the cached result")
+
+    def test_BatchProfiles(self) -> None:
+        Solution.addTeams([1, 2])
+        Solution.addPlayers([Player(1, 1, 20, 185, "Left"), Player(2, 2, 21, 190, "Right")])
+        profiles = Solution.getPlayerProfiles([1, 2, 3])
+        self.assertEqual([1, 2, 3], sorted(profiles.keys()), "Every requested ID is in the result")
+        self.assertEqual(2, profiles[2].getTeamID(), "Should work")
+        self.assertEqual(None, profiles[3].getPlayerID(), "ID 3 not exists")
+        self.assertEqual(None, Solution.getStadiumProfiles([1])[1].getStadiumID(), "No stadiums")
+
+    def test_ProfileCache(self) -> None:
+        Solution.addTeams([1, 2, 3])
+        self.assertEqual(None, Solution.getPlayerProfile(1).getPlayerID(), "Not yet, cached as bad")
+        self.assertEqual(ReturnValue.OK, Solution.addPlayer(Player(1, 1, 20, 185, "Left")), "Should work")
+        self.assertEqual(1, Solution.getPlayerProfile(1).getTeamID(), "The insert dropped the bad profile")
+        hits = Solution.profileCacheStats()["hits"]
+        self.assertEqual(1, Solution.getPlayerProfile(1).getTeamID(), "Same profile from the cache")
+        self.assertEqual(hits + 1, Solution.profileCacheStats()["hits"], "Second call is a hit")
+        profile = Solution.getPlayerProfile(1)
+        profile.setTeamID(2)
+        self.assertEqual(1, Solution.getPlayerProfile(1).getTeamID(), "Callers can't modify the cached profile")
+
+        # no update API, a profile changes by deleting and adding it again
+        self.assertEqual(ReturnValue.OK, Solution.deletePlayer(Player(1)), "Should work")
+        self.assertEqual(None, Solution.getPlayerProfile(1).getPlayerID(), "Deleted")
+        self.assertEqual(ReturnValue.OK, Solution.addPlayer(Player(1, 2, 21, 190, "Right")), "Should work")
+        profile = Solution.getPlayerProfile(1)
+        self.assertEqual((2, 21, "Right"), (profile.getTeamID(), profile.getAge(), profile.getFoot()), "Updated")
+
+        # deleteTeam cascades to the team's players, stadiums and matches (home and away)
+        Solution.addPlayer(Player(2, 3, 20, 185, "Left"))
+        Solution.addStadiums([Stadium(1, 50000, 2), Stadium(2, 50000, 3)])
+        Solution.addMatches([Match(1, "Domestic", 2, 3), Match(2, "Domestic", 3, 2), Match(3, "Domestic", 1, 3)])
+        self.assertEqual([1, 1, 1, 2, 2, 3], [Solution.getPlayerProfile(1).getPlayerID(),
+                                              Solution.getStadiumProfile(1).getStadiumID(),
+                                              Solution.getMatchProfile(1).getMatchID(),
+                                              Solution.getMatchProfile(2).getMatchID(),
+                                              Solution.getPlayerProfile(2).getPlayerID(),
+                                              Solution.getMatchProfile(3).getMatchID()], "Cached")
+        self.assertEqual(ReturnValue.OK, Solution.deleteTeam(2), "Should work")
+        self.assertEqual([None] * 4, [Solution.getPlayerProfile(1).getPlayerID(),
+                                      Solution.getStadiumProfile(1).getStadiumID(),
+                                      Solution.getMatchProfile(1).getMatchID(),
+                                      Solution.getMatchProfile(2).getMatchID()], "Deleted with team 2")
+        self.assertEqual((2, 3), (Solution.getPlayerProfile(2).getPlayerID(), Solution.getMatchProfile(3).getMatchID()),
+                         "Other teams keep their cached profiles")
+
+        # a bad profile is cached for badProfileTTL seconds, rows written behind the API's back show up after it
+        Solution.configureProfileCache(badProfileTTL=0.2)
+        try:
+            self.assertEqual(None, Solution.getStadiumProfile(3).getStadiumID(), "Not yet")
+            conn = Connector.DBConnector()
+            try:
+                conn.execute("INSERT INTO stadiums VALUES (3, 60000, NULL)")
+            finally:
+                conn.close()
+            self.assertEqual(None, Solution.getStadiumProfile(3).getStadiumID(), "The bad profile is still cached")
+            time.sleep(0.3)
+            self.assertEqual(60000, Solution.getStadiumProfile(3).getCapacity(), "Read again once expired")
+        finally:
+            Solution.configureProfileCache()
+
+    def test_AllClosePlayers(self) -> None:
+        Solution.addTeams([1, 2])
+        Solution.addPlayers([Player(p, p % 2 + 1, 20, 180, "Left") for p in range(1, 15)])
+        Solution.addMatches([Match(m, "Domestic", 1, 2) for m in range(1, 5)])
+        Solution.playersScoredInMatches([(Match(1), Player(1), 1), (Match(2), Player(1), 2), (Match(1), Player(2), 1),
+                                         (Match(3), Player(3), 1), (Match(2), Player(3), 1), (Match(4), Player(4), 1)])
+        close = Solution.getAllClosePlayers()
+        self.assertEqual(list(range(1, 15)), sorted(close.keys()), "Every player is in the result")
+        for playerID in range(1, 15):
+            self.assertEqual(Solution.getClosePlayers(playerID), close[playerID], "Same as getClosePlayers")
+
+    def assertSnapshotMatches(self, snapshot: ColumnarSnapshot) -> None:
+        self.assertEqual(Solution.getMostAttractiveStadiums(), snapshot.getMostAttractiveStadiums(), "Stadiums")
+        self.assertEqual(Solution.getActiveTallTeams(), snapshot.getActiveTallTeams(), "Active tall teams")
+        self.assertEqual(Solution.getActiveTallRichTeams(), snapshot.getActiveTallRichTeams(), "Active tall rich")
+        self.assertEqual(Solution.popularTeams(), snapshot.popularTeams(), "Popular teams")
+        for ID in [None, -1] + list(range(1, 14)):
+            self.assertEqual(Solution.mostGoalsForTeam(ID), snapshot.mostGoalsForTeam(ID), "Team " + str(ID))
+            self.assertEqual(Solution.stadiumTotalGoals(ID), snapshot.stadiumTotalGoals(ID), "Stadium " + str(ID))
+            self.assertEqual(str(Solution.averageAttendanceInStadium(ID)), str(snapshot.averageAttendanceInStadium(ID)),
+                             "Attendance " + str(ID))
+
+    def test_Snapshot(self) -> None:
+        rnd = random.Random(14)
+        Solution.addTeams(list(range(1, 13)))
+        Solution.addStadiums([Stadium(s, rnd.choice([40000, 55000, 55001, 70000]), s if s < 12 else None)
+                              for s in range(1, 13)])
+        Solution.addPlayers([Player(p, p % 12 + 1, 25, rnd.choice([185, 189.5, 190, 195]), "Left")
+                             for p in range(1, 61)])
+        matches = [Match(m, "Domestic", *rnd.sample(range(1, 12), 2)) for m in range(1, 41)]
+        Solution.addMatches(matches)
+        for m in matches[:30]:
+            Solution.matchInStadium(m, Stadium(rnd.randint(1, 12)), rnd.choice([0, 1, 7, 40000, 40001, 60000]))
+        Solution.playersScoredInMatches([(m, Player(rnd.randint(1, 60)), rnd.randint(0, 4)) for m in matches * 3])
+        # NULLs the API can't write: matches without a stadium, unknown attendances and goals
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("INSERT INTO spectators VALUES (50000, 31, NULL), (NULL, 32, NULL), (NULL, 33, 3), (9, 34, NULL)")
+            conn.execute("INSERT INTO goals VALUES (NULL, 1, 31), (NULL, 2, 33), (2, 3, 34)")
+        finally:
+            conn.close()
+        Solution.clearResultCache()
+
+        snapshot = ColumnarSnapshot()
+        snapshot.refresh()
+        self.assertSnapshotMatches(snapshot)
+
+        # the same writes applied to the database and to the snapshot
+        self.assertEqual(ReturnValue.OK, Solution.deleteMatch(matches[0]), "Should work")
+        snapshot.delete("matches", [1])
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(matches[5], Player(59), 9), "Should work")
+        snapshot.upsert("goals", [(9, 59, 6)])
+        Solution.addTeam(13)
+        Solution.addStadium(Stadium(13, 60000, 13))
+        Solution.addPlayers([Player(61, 13, 20, 200, "Right"), Player(62, 13, 20, 190, "Right")])
+        Solution.addMatch(Match(41, "Domestic", 13, 1))
+        Solution.matchInStadium(Match(41), Stadium(1), 45000)
+        snapshot.upsert("teams", [(13,)])
+        snapshot.upsert("stadiums", [(13, 60000, 13)])
+        snapshot.upsert("players", [(61, 13, 20, 200, "Right"), (62, 13, 20, 190, "Right")])
+        snapshot.upsert("matches", [(41, "Domestic", 13, 1)])
+        snapshot.upsert("spectators", [(45000, 41, 1)])
+        self.assertSnapshotMatches(snapshot)
+        self.assertEqual(ReturnValue.OK, Solution.deleteTeam(13), "Should work")
+        snapshot.delete("teams", [13])
+        self.assertSnapshotMatches(snapshot)
+
+    @isolation("clone")  # needs a write committed by another connection in the middle of the refresh
+    def test_SnapshotIsConsistent(self) -> None:
+        Solution.addTeams([1, 2])
+        Solution.addPlayer(Player(1, 1, 20, 185, "Left"))
+        written = []
+
+        class WriteAfterTeams:
+            def record(self, event):
+                if event.query.startswith("SELECT team_id FROM teams") and not written:
+                    written.append(Solution.addPlayer(Player(2, 1, 20, 185, "Left")))
+
+        snapshot = ColumnarSnapshot()
+        Instrumentation.addSink(WriteAfterTeams())
+        try:
+            snapshot.refresh()
+        finally:
+            Instrumentation.clearSinks()
+        self.assertEqual([ReturnValue.OK], written, "Committed between the reads of teams and players")
+        self.assertEqual([1], snapshot.mostGoalsForTeam(1), "All the tables are read from one snapshot")
+        snapshot.refresh()
+        self.assertEqual([2, 1], snapshot.mostGoalsForTeam(1), "Seen by the next refresh")
+
+    @isolation("clone")  # the asynchronous connections can't join the test transaction
+    def test_AsyncAPI(self) -> None:
+        async def run():
+            added = await asyncio.gather(*[AsyncSolution.addTeam(t) for t in [1, 2, 2, 0]])
+            self.assertEqual([ReturnValue.OK, ReturnValue.OK, ReturnValue.ALREADY_EXISTS, ReturnValue.BAD_PARAMS],
+                             sorted(added, key=lambda r: r.value), "Should work")
+            added = await asyncio.gather(*[AsyncSolution.addPlayer(Player(p, p % 2 + 1, 20, 190, "Left"))
+                                           for p in range(1, 201)])
+            self.assertEqual([ReturnValue.OK] * 200, added, "200 concurrent inserts")
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.addMatch(Match(1, "Domestic", 1, 2)), "Should work")
+            self.assertEqual(ReturnValue.NOT_EXISTS, await AsyncSolution.playerScoredInMatch(Match(2), Player(1), 1),
+                             "Match 2 not exists")
+            scored = await asyncio.gather(*[AsyncSolution.playerScoredInMatch(Match(1), Player(p), p)
+                                            for p in range(1, 11)])
+            self.assertEqual([ReturnValue.OK] * 10, scored, "Should work")
+            profile = await AsyncSolution.getPlayerProfile(3)
+            self.assertEqual(2, profile.getTeamID(), "Should work")
+            return await asyncio.gather(AsyncSolution.mostGoalsForTeam(1), AsyncSolution.getActiveTallTeams(),
+                                        AsyncSolution.getClosePlayers(1))
+
+        goals, tall, close = asyncio.run(run())
+        self.assertEqual(Solution.mostGoalsForTeam(1), goals, "Same as Solution")
+        self.assertEqual([2, 1], tall, "Both teams played")
+        self.assertEqual(Solution.getClosePlayers(1), close, "Same as Solution")
+
+    def test_Dataset(self) -> None:
+        dataset = generate(teams=8, playersPerTeam=6, matchesPerTeam=10, seed=7)
+        self.assertEqual(dataset, generate(teams=8, playersPerTeam=6, matchesPerTeam=10, seed=7), "Same seed")
+        self.assertEqual(ReturnValue.OK, Solution.loadDataset(dataset), "Should work")
+        self.assertEqual(dataset, Solution.dumpDataset(), "The tables hold exactly the dataset")
+        hosted = [home for _, _, home, _ in dataset.rows("matches")]
+        self.assertEqual([5] * 8, [hosted.count(team) for team in range(1, 9)], "Half of the matches at home")
+
+        # the rebuilt summaries agree with the views, and the triggers keep them current afterwards
+        conn = Connector.DBConnector()
+        try:
+            _, rows = conn.execute("SELECT stadium_id, attractiveness FROM attractive_stadiums_view "
+                                   "WHERE stadium_id IS NOT NULL")
+        finally:
+            conn.close()
+        for stadiumID, attractiveness in rows.rows:
+            self.assertEqual(attractiveness, Solution.stadiumTotalGoals(stadiumID), "Same as the view")
+        _, match, stadiumID = next(row for row in dataset.rows("spectators") if row[2] is not None)
+        scorers = {player for _, player, m in dataset.rows("goals") if m == match}
+        _, _, home, _ = dataset.rows("matches")[match - 1]
+        player = next(p for p in range((home - 1) * 6 + 1, home * 6 + 1) if p not in scorers)
+        before = Solution.stadiumTotalGoals(stadiumID)
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(match), Player(player), 2), "Should work")
+        self.assertEqual(before + 2, Solution.stadiumTotalGoals(stadiumID), "The triggers are back on")
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(8), "Loaded")
+
+        bare = generate(teams=4, playersPerTeam=3, matchesPerTeam=4, stadiumRate=0, venues=0)
+        self.assertEqual((0, [None]), (bare.rowCount("stadiums"), sorted({row[2] for row in bare.rows("spectators")})),
+                         "No stadium to play at")
+
+        path = os.path.join(tempfile.mkdtemp(), "league.dataset")
+        Solution.dumpDataset().save(path)
+        Solution.clearTables()
+        self.assertEqual(ReturnValue.OK, Solution.loadDataset(Dataset.load(path)), "Should work")
+        self.assertEqual(Solution.dumpDataset(), Dataset.load(path), "Restored from the file")
+        os.remove(path)
+
+    def test_SchemaBootstrap(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addTeam(1), "Should work")
+        Solution.createTables()  # the schema is current, nothing to do
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(1), "The data is kept")
+        conn = Connector.DBConnector()
+        try:
+            self.assertEqual([(Solution.SCHEMA_VERSION,)], conn.execute("SELECT version FROM schema_version")[1].rows,
+                             "Should work")
+        finally:
+            conn.close()
+
+    def test_SchemaUpgrade(self) -> None:
+        # a database created before the schema was versioned: the tables and views only, no version marker
+        Solution.dropTables()
+        conn = Connector.DBConnector()
+        try:
+            for statement in Solution._layoutStatements(0, 0):
+                conn.execute(statement)
+            conn.execute("INSERT INTO teams VALUES (1), (2)")
+            conn.execute("INSERT INTO players VALUES (1, 1, 20, 190, 'Left'), (2, 1, 20, 195, 'Left'), "
+                         "(3, 2, 20, 190, 'Right')")
+            conn.execute("INSERT INTO stadiums VALUES (1, 60000, 1)")
+            conn.execute("INSERT INTO matches VALUES (1, 'Domestic', 1, 2), (2, 'Domestic', 2, 1)")
+            conn.execute("INSERT INTO spectators VALUES (45000, 1, 1)")
+            conn.execute("INSERT INTO goals VALUES (2, 1, 1), (1, 2, 1), (3, 3, 2)")
+        finally:
+            conn.close()
+
+        Solution.createTables()
+        self.assertEqual(3, Solution.stadiumTotalGoals(1), "The summary tables were filled from the goals")
+        self.assertEqual([1, 2], Solution.mostGoalsForTeam(1), "Should work")
+        self.assertEqual([1], Solution.getMostAttractiveStadiums(), "Should work")
+        self.assertEqual([1], Solution.getActiveTallRichTeams(), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(2), Player(2), 4), "Should work")
+        self.assertEqual([2, 1], Solution.mostGoalsForTeam(1), "Kept current by the triggers")
+
+    def test_PartitionedLayout(self) -> None:
+        dataset = generate(teams=4, seed=3)
+
+        def scenario() -> list:
+            self.assertEqual(ReturnValue.OK, Solution.loadDataset(dataset), "Should work")
+            results = [Solution.dumpDataset() == dataset, Solution.getMostAttractiveStadiums(),
+                       [Solution.mostGoalsForTeam(team) for team in range(1, 5)],
+                       [Solution.playerIsWinner(player, match) for _, player, match in dataset.rows("goals")[:20]]]
+            match = dataset.rows("matches")[0][0]
+            results.append(Solution.deleteMatch(Match(match, "Domestic", 1, 2)))
+            results.append([Solution.stadiumTotalGoals(stadium) for stadium in range(1, 5)])
+            return results
+
+        Solution.dropTables()
+        Solution.createTables(partitions=4)
+        conn = Connector.DBConnector()
+        try:
+            self.assertEqual([("goals", "p"), ("spectators", "p")], conn.execute(
+                "SELECT relname::text, relkind::text FROM pg_class WHERE relname IN ('goals', 'spectators') "
+                "ORDER BY relname")[1].rows, "Partitioned")
+        finally:
+            conn.close()
+        partitioned = scenario()
+        Solution.dropTables()
+        Solution.createTables()
+        self.assertEqual(scenario(), partitioned, "Same API on both layouts")
+        self.assertEqual(True, partitioned[0], "Should work")
+
+    def test_Session(self) -> None:
+        self.assertEqual(Player.badPlayer().getPlayerID(), Solution.getPlayerProfile(1).getPlayerID(), "Not yet")
+        with Solution.session():
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(1), "Should work")
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(1), "Undoes only its own statements")
+            self.assertEqual(ReturnValue.OK, Solution.addPlayer(Player(1, 1, 20, 185, "Left")), "Should work")
+            self.assertEqual(1, Solution.getPlayerProfile(1).getPlayerID(), "Sees the uncommitted player")
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(2), "Should work")
+        self.assertEqual(1, Solution.getPlayerProfile(1).getPlayerID(), "Committed")
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(2), "Committed")
+
+        with self.assertRaises(ValueError):
+            with Solution.session():
+                self.assertEqual(ReturnValue.OK, Solution.addTeam(3), "Should work")
+                self.assertEqual(ReturnValue.OK, Solution.deleteTeam(1), "Should work")
+                raise ValueError()
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.deleteTeam(3), "Rolled back")
+        self.assertEqual(1, Solution.getPlayerProfile(1).getPlayerID(), "Rolled back")
+
+        writes = Solution.teamViewsStaleness()["writes_since_refresh"]
+        with Solution.session():
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(4), "Should work")
+        with self.assertRaises(ValueError):
+            with Solution.session():
+                self.assertEqual(ReturnValue.OK, Solution.addTeam(5), "Should work")
+                raise ValueError()
+        self.assertEqual(writes + 1, Solution.teamViewsStaleness()["writes_since_refresh"],
+                         "Counted once when committed, not when rolled back")
+
+    def teamClassifications(self) -> list:
+        return [Solution.getActiveTallTeams(), Solution.getActiveTallRichTeams(), Solution.popularTeams()]
+
+    def test_MaterializedTeamViews(self) -> None:
+        Solution.addTeams([1, 2, 3])
+        Solution.addPlayers([Player(p, (p - 1) // 2 + 1, 20, 195, "Left") for p in range(1, 7)])
+        Solution.addStadiums([Stadium(1, 60000, 1), Stadium(2, 50000, 2), Stadium(3, 60000, 3)])
+        Solution.addMatches([Match(1, "Domestic", 1, 2), Match(2, "Domestic", 2, 1)])
+        Solution.matchInStadium(Match(1), Stadium(1), 45000)
+        Solution.matchInStadium(Match(2), Stadium(2), 100)
+        live = self.teamClassifications()
+        self.assertEqual([[2, 1], [1], [1]], live[:2] + [live[2][:1]], "Should work")
+        try:
+            self.assertEqual(ReturnValue.OK, Solution.useMaterializedTeamViews(True), "Should work")
+            self.assertEqual(live, self.teamClassifications(), "Same as the views")
+            self.assertEqual(ReturnValue.OK, Solution.addMatch(Match(3, "Domestic", 3, 1)), "Should work")
+            self.assertEqual(ReturnValue.OK, Solution.matchInStadium(Match(3), Stadium(3), 50000), "Should work")
+            staleness = Solution.teamViewsStaleness()
+            self.assertEqual((True, True, 2), (staleness["materialized"], staleness["stale"],
+                                               staleness["writes_since_refresh"]), "Two writes pending")
+            self.assertEqual(live, self.teamClassifications(), "Not refreshed yet")
+            self.assertEqual(ReturnValue.OK, Solution.refreshTeamViews(), "Should work")
+            self.assertEqual(0, Solution.teamViewsStaleness()["writes_since_refresh"], "Refreshed")
+            refreshed = self.teamClassifications()
+
+            self.assertEqual(ReturnValue.OK, Solution.useMaterializedTeamViews(
+                True, Solution.RefreshPolicy.AFTER_WRITES, writes=2), "Should work")
+            self.assertEqual(ReturnValue.OK, Solution.addPlayer(Player(7, 2, 20, 170, "Left")), "Should work")
+            self.assertEqual(1, Solution.teamViewsStaleness()["writes_since_refresh"], "Below the threshold")
+            self.assertEqual(ReturnValue.OK, Solution.deletePlayer(Player(1)), "Should work")
+            deadline = time.monotonic() + 10
+            while Solution.teamViewsStaleness()["writes_since_refresh"] and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(0, Solution.teamViewsStaleness()["writes_since_refresh"], "Refreshed in the background")
+            materialized = self.teamClassifications()
+        finally:
+            Solution.useMaterializedTeamViews(False)
+        self.assertEqual([[3, 2, 1], [1, 3]], refreshed[:2], "Team 3 played")
+        self.assertEqual(materialized, self.teamClassifications(), "Same as the views after the refresh")
+        self.assertEqual([3, 2], materialized[0], "Player 1 left team 1")
+
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("DROP MATERIALIZED VIEW popular_teams_mview")
+        finally:
+            conn.close()
+        try:
+            self.assertEqual(ReturnValue.ERROR, Solution.useMaterializedTeamViews(True), "Can't be refreshed")
+            self.assertEqual(False, Solution.teamViewsStaleness()["materialized"], "Still reading the views")
+            self.assertEqual(materialized, self.teamClassifications(), "Should work")
+        finally:
+            Solution.useMaterializedTeamViews(False)
+
+    def test_Leaderboards(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addTeam(1), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.addTeam(2), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.addMatch(Match(1, "Domestic", 1, 2)), "Should work")
+        self.assertEqual(ReturnValue.OK, Solution.addPlayer(Player(1, 1, 20, 185, "Left")), "Should work")
+        board = Solution.useLeaderboards()
+        pushed = []
+        board.subscribe(lambda teamID, standings: pushed.append((teamID, standings)))
+        try:
+            self.assertEqual([ReturnValue.OK] * 2, Solution.addPlayers([Player(2, 1, 20, 185, "Left"),
+                                                                        Player(3, 2, 20, 185, "Left")]), "Should work")
+            self.assertEqual(ReturnValue.OK, Solution.playerScoredInMatch(Match(1, "", 1, 2), Player(1, 1, 0, 0, ""), 2),
+                             "Should work")
+            self.assertEqual([(1, [(1, 2), (2, 0)])], pushed[-1:], "Pushed on the goal")
+            self.assertEqual([1, 2], Solution.mostGoalsForTeam(1), "From the leaderboard")
+            self.assertEqual([ReturnValue.OK], Solution.playersScoredInMatches([(Match(1, "", 1, 2),
+                                                                                 Player(2, 1, 0, 0, ""), 3)]), "Should work")
+            self.assertEqual([(2, 3), (1, 2)], board.standings(1), "Overtaken")
+
+            with self.assertRaises(ValueError):
+                with Solution.session():
+                    Solution.playerScoredInMatch(Match(1, "", 1, 2), Player(3, 2, 0, 0, ""), 5)
+                    raise ValueError()
+            self.assertEqual([(3, 0)], board.standings(2), "Rolled back, nothing pushed")
+            with Solution.session():
+                Solution.playerScoredInMatch(Match(1, "", 1, 2), Player(3, 2, 0, 0, ""), 1)
+                self.assertEqual([(3, 0)], board.standings(2), "Not yet committed")
+            self.assertEqual((2, [(3, 1)]), pushed[-1], "Pushed on the commit")
+            self.assertEqual(ReturnValue.OK, Solution.playerDidntScoreInMatch(Match(1, "", 1, 2), Player(2, 1, 0, 0, "")),
+                             "Should work")
+            self.assertEqual(ReturnValue.OK, Solution.deletePlayer(Player(2, 1, 0, 0, "")), "Should work")
+            self.assertEqual((1, [(1, 2)]), pushed[-1], "Left the team")
+            self.assertEqual(ReturnValue.OK, Solution.deleteMatch(Match(1, "", 1, 2)), "Should work")
+            self.assertEqual([(1, 0)], board.standings(1), "Re-seeded")
+            topByBoard = [Solution.mostGoalsForTeam(teamID) for teamID in (1, 2, 3)]
+        finally:
+            Solution.useLeaderboards(False)
+        self.assertEqual(topByBoard, [Solution.mostGoalsForTeam(teamID) for teamID in (1, 2, 3)], "Same as the query")
+
+    @isolation("clone")  # another connection must not see what the stream's transaction wrote before it ended
+    def test_Stream(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            for count in (0, 3, 8, 10):  # none, less than a batch, a multiple of the batch size, and not
+                self.assertEqual([(n,) for n in range(1, count + 1)],
+                                 list(conn.stream("SELECT generate_series(1, %d)" % count, batchSize=4)),
+                                 str(count) + " rows")
+
+            conn.execute("INSERT INTO teams VALUES (1)", commit=False)
+            rows = conn.stream("SELECT generate_series(1, 10)", batchSize=4)
+            self.assertEqual([(1,), (2,), (3,), (4,), (5,)], [next(rows) for _ in range(5)], "Should work")
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(2), "Another connection")
+            self.assertEqual(ReturnValue.OK, Solution.deleteTeam(2), "Should work")
+            self.assertEqual(ReturnValue.NOT_EXISTS, Solution.deleteTeam(1), "Not committed while streaming")
+            self.assertEqual([(n,) for n in range(6, 11)], list(rows), "The rest of the stream")
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(1), "Committed once exhausted")
+
+            conn.execute("INSERT INTO teams VALUES (3)", commit=False)
+            rows = conn.stream("SELECT generate_series(1, 10)", batchSize=4)
+            self.assertEqual((1,), next(rows), "Should work")
+            rows.close()  # the consumer stopped early
+            self.assertEqual([], conn.execute("SELECT name FROM pg_cursors", commit=False)[1].rows, "Cursor closed")
+        finally:
+            conn.close()
+        self.assertEqual(ReturnValue.OK, Solution.addTeam(3), "Rolled back when the connection was closed")
+
+        self.assertEqual(ReturnValue.OK, Solution.loadDataset(generate(teams=8, seed=11)), "Should work")
+        conn = Connector.DBConnector()
+        try:
+            _, view = conn.execute("SELECT stadium_id FROM attractive_stadiums_view "
+                                   "ORDER BY attractiveness desc, stadium_id asc")
+        finally:
+            conn.close()
+        self.assertEqual([row[0] for row in view.rows], Solution.getMostAttractiveStadiums(), "Same order as the view")
+
+    # kill the connection of another session and wait until it is gone
+    def terminateBackend(self, backend: int) -> None:
+        killer = Connector.DBConnector(pooled=False, readOnly=True)
+        try:
+            killer.execute("SELECT pg_terminate_backend(%s)", params=(backend,))
+            deadline = time.monotonic() + 10
+            while killer.execute("SELECT 1 FROM pg_stat_activity WHERE pid = %s", params=(backend,))[0] and \
+                    time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            killer.close()
+
+    @isolation("clone")  # the connectors must borrow from the pool, not join the pinned transaction
+    def test_ConnectionPool(self) -> None:
+        Connector.configurePool(maxSize=1, timeout=0.2)
+        try:
+            pool = Connector.getPool()
+            conn = Connector.DBConnector()
+            connection = conn.connection
+            backend = conn.execute("SELECT pg_backend_pid()")[1].rows[0][0]
+            with self.assertRaises(DatabaseException.ConnectionInvalid):
+                Connector.DBConnector()  # the only connection is checked out, times out
+            conn.close()
+            conn = Connector.DBConnector()
+            self.assertIs(connection, conn.connection, "Checked in and reused")
+            conn.close()
+            self.assertEqual((1, 1), (pool.size(), pool.idleCount()), "Should work")
+
+            # killed while idle, inside the ping interval: handed out unchecked, then discarded
+            self.terminateBackend(backend)
+            self.assertEqual(ReturnValue.ERROR, Solution.addTeam(1), "The first statement fails")
+            self.assertEqual(0, pool.size(), "The broken connection was discarded")
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(1), "On a new connection")
+
+            # pinged on every checkout: the dead connection is replaced before it is handed out
+            Connector.configurePool(maxSize=1, timeout=0.2, pingInterval=0)
+            conn = Connector.DBConnector()
+            backend = conn.execute("SELECT pg_backend_pid()")[1].rows[0][0]
+            conn.close()
+            self.terminateBackend(backend)
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(2), "Should work")
+        finally:
+            Connector.configurePool()
+
+    def test_Instrumentation(self) -> None:
+        stats = Instrumentation.addSink(Instrumentation.StatsSink())
+        slow = Instrumentation.addSink(Instrumentation.SlowQueryLog(thresholdMs=0))
+        try:
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(1), "Should work")
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(2), "Should work")
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(1), "ID 1 already exists")
+            for playerID in range(1, 4):
+                Solution.getPlayerProfile(playerID)
+            self.assertEqual(ReturnValue.OK, Solution.addStadium(Stadium(1, 55000, 1)), "Should work")
+            Solution.clearResultCache()
+            self.assertEqual([], Solution.getMostAttractiveStadiums(), "Streamed, no matches yet")
+        finally:
+            Instrumentation.clearSinks()
+        Solution.addTeam(3)  # no sinks, not recorded
+
+        addTeam = stats.stats()['EXECUTE "add_team" (?)']
+        self.assertEqual((3, 1, 2), (addTeam["count"], addTeam["errors"], addTeam["rows"]), "One fingerprint")
+        self.assertEqual(3, stats.stats()['EXECUTE "get_player_profile" (?)']["count"], "Should work")
+        streamed = [event for event in slow.entries if "FROM stadium_goals" in event.query]
+        self.assertEqual([0], [event.rows for event in streamed], "The stream is reported once, when exhausted")
+        self.assertEqual(8, len(slow.entries), "Every query is above 0ms")
+        self.assertEqual("SELECT * FROM goals WHERE match_id IN (?, ...) AND num_goals > ?",
+                         Instrumentation.fingerprint("SELECT *  FROM goals WHERE match_id IN (1,2, 3) "
+                                                     "AND num_goals > 3"), "Literals stripped")
+
+    def test_SlowPlans(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.addTeam(1), "Should work")
+        self.assertEqual([ReturnValue.OK] * 3, Solution.addPlayers([Player(p, 1, 20, 185, "Left") for p in range(1, 4)]),
+                         "Should work")
+        capture = Solution.captureSlowPlans(0, background=False)
+        try:
+            self.assertEqual(ReturnValue.OK, Solution.addTeam(2), "Should work")
+            self.assertEqual([2, 3], Solution.getClosePlayers(1), "Should work")
+        finally:
+            Solution.captureSlowPlans(None)
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.addTeam(2), "The captured write was not repeated")
+        self.assertEqual(ReturnValue.OK, Solution.addTeam(3), "The captured write was not repeated")
+
+        offenders = {offender["fingerprint"]: offender for offender in capture.offenders()}
+        read = offenders['EXECUTE "close_players" (?)']["plans"][0]
+        self.assertEqual((True, None, [1]), (read["analyzed"], read["error"], read["params"]), "Re-run and analyzed")
+        self.assertIn("Execution Time", read["plan"], "Should work")
+        write = offenders['EXECUTE "add_team" (?)']["plans"][0]
+        self.assertEqual((False, None), (write["analyzed"], write["error"]), "Writes only get their estimated plan")
+        self.assertIn('EXECUTE "close_players" (?)', capture.report(), "Should work")
+        self.assertEqual(Connector.getPrepared("add_team").statement,
+                         Connector.preparedStatementText('EXECUTE "add_team" (2)'), "The statement it executes")
+        self.assertEqual("SELECT 1", Connector.preparedStatementText("SELECT 1"), "Not an EXECUTE")
+
+
+
+# ResultSet rows, no database needed
+class ResultSetTest(unittest.TestCase):
+    def resultSet(self) -> Connector.ResultSet:
+        Column = collections.namedtuple("Column", ["name"])
+        return Connector.ResultSet([Column("player_id"), Column("Team_ID"), Column("height")],
+                                   [(1, 10, 185), (2, 20, 190)])
+
+    def test_RowAccess(self) -> None:
+        rs = self.resultSet()
+        self.assertEqual((2, 20, 190), (rs[1]["player_id"], rs[1]["team_id"], rs[1]["height"]), "By name")
+        self.assertEqual((2, 20, 190), (rs[1][0], rs[1][1], rs[1][-1]), "By index")
+        self.assertEqual((20, 20), (rs[1]["TEAM_ID"], rs[1]["Team_ID"]), "Case insensitive")
+        self.assertEqual(None, rs[1][3], "Index out of range, like the dict rows")
+        with self.assertRaises(KeyError):
+            rs[1]["age"]
+        self.assertEqual((None, 0), (rs[1].get("age"), rs[1].get(3, 0)), "Should work")
+        self.assertEqual((True, True, False, False), ("height" in rs[0], "HEIGHT" in rs[0], "age" in rs[0], 0 in rs[0]),
+                         "Should work")
+
+    def test_RowIteration(self) -> None:
+        rs = self.resultSet()
+        self.assertEqual([185, 190], [row["height"] for row in rs], "Iterates the rows")
+        self.assertEqual(["player_id", "Team_ID", "height"], list(rs[0]), "Iterates the column names")
+        self.assertEqual({"player_id": 1, "Team_ID": 10, "height": 185}, dict(rs[0]), "Should work")
+        self.assertEqual(rs[0], {"player_id": 1, "Team_ID": 10, "height": 185}, "Equals the dict row")
+        self.assertEqual((3, (1, 10, 185)), (len(rs[0]), tuple(rs[0].values())), "Should work")
+        self.assertEqual(True, isinstance(rs[0], collections.abc.Mapping), "Should work")
+
+    def test_InvalidRow(self) -> None:
+        rs = self.resultSet()
+        row = rs[2]
+        self.assertEqual((0, [], None, None), (len(row), list(row), row[0], row.get("height")), "An empty row")
+        with self.assertRaises(KeyError):
+            row["height"]
+        empty = Connector.ResultSet()
+        self.assertEqual((True, [], None), (empty.isEmpty(), list(empty), empty[0][0]), "Should work")
 
 # *** DO NOT RUN EACH TEST MANUALLY ***
 if __name__ == '__main__':
@@ -1,12 +1,105 @@
+import os
+import atexit
 import unittest
 import Solution
+import Utility.DBConnector as Connector
+import Utility.AsyncDBConnector as AsyncConnector
+
+# how every test starts from empty tables, TEST_ISOLATION picks the mode of the tests that don't pick their own:
+#   transaction - the schema is created once per run and every test runs in one transaction that is rolled back at
+#                 the end. all the (synchronous) connections of the test share it, so the test can't use
+#                 AsyncSolution or expect another session to see its commits
+#   clone       - every test gets a database of its own, copied from a template database created once per run
+#   schema      - the schema is created before every test and dropped after it
+ISOLATION_MODES = ("transaction", "clone", "schema")
+DEFAULT_ISOLATION = os.environ.get("TEST_ISOLATION", "transaction")
+
+_run = {"schema": False, "template": None}  # what this run created so far
+
+
+# the isolation mode of one test method, e.g. @isolation("clone") for a test that needs real commits
+def isolation(mode: str):
+    if mode not in ISOLATION_MODES:
+        raise ValueError("Unknown isolation mode " + mode + ", one of " + ", ".join(ISOLATION_MODES))
+
+    def decorator(test):
+        test.isolation = mode
+        return test
+    return decorator
+
+
+def _sharedSchema():
+    if not _run["schema"]:
+        Solution.dropTables()
+        Solution.createTables()
+        _run["schema"] = True
+
+
+def _dropSharedSchema():
+    if _run["schema"]:
+        Solution.dropTables()
+        _run["schema"] = False
+
+
+def _templateDatabase() -> str:
+    if _run["template"] is None:
+        template = Connector.DBConnector.config()["database"] + "_test_template"
+        Connector.dropDatabase(template)
+        Connector.createDatabase(template)
+        Connector.useDatabase(template)
+        try:
+            Solution.createTables()
+        finally:
+            Connector.useDatabase(None)  # nobody may be connected to a template that is copied
+        _run["template"] = template
+    return _run["template"]
+
+
+@atexit.register
+def _cleanUp():
+    try:
+        _dropSharedSchema()
+        if _run["template"] is not None:
+            Connector.dropDatabase(_run["template"])
+    except Exception:
+        pass
 
 
 class AbstractTest(unittest.TestCase):
+    isolation = None  # a test class may pick its mode, DEFAULT_ISOLATION otherwise
+
+    def isolationMode(self) -> str:
+        mode = getattr(getattr(self, self._testMethodName), "isolation", None) or self.isolation or DEFAULT_ISOLATION
+        if mode not in ISOLATION_MODES:
+            raise ValueError("Unknown isolation mode " + mode + ", one of " + ", ".join(ISOLATION_MODES))
+        return mode
+
     # before each test, setUp is executed
     def setUp(self) -> None:
-        Solution.createTables()
+        self.mode = self.isolationMode()
+        if self.mode == "transaction":
+            _sharedSchema()
+            Connector.pinTransaction()
+        elif self.mode == "clone":
+            template = _templateDatabase()
+            self.database = template[:-len("_template")] + "_" + str(os.getpid())
+            Connector.dropDatabase(self.database)  # left behind by a crashed run
+            Connector.createDatabase(self.database, template)
+            Connector.useDatabase(self.database)
+        else:
+            _dropSharedSchema()
+            Solution.createTables()
+        # nothing cached before this test describes its tables
+        Solution.clearProfileCache()
+        Solution.clearResultCache()
 
     # after each test, tearDown is executed
     def tearDown(self) -> None:
-        Solution.dropTables()
+        if self.mode == "transaction":
+            Connector.unpinTransaction()
+        elif self.mode == "clone":
+            Connector.useDatabase(None)
+            AsyncConnector.closePool()
+            Connector.dropDatabase(self.database)
+        else:
+            Solution.dropTables()
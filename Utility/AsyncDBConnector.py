@@ -0,0 +1,233 @@
+import asyncio
+import collections
+import psycopg2
+from psycopg2 import extensions, sql
+from typing import Union
+from Utility.Exceptions import DatabaseException
+import Utility.DBConnector as Connector
+from Utility.DBConnector import ResultSet, PreparedStatement, PreparingConnection, translateErrors
+
+
+# asyncio counterpart of DBConnector, on psycopg2's asynchronous connections: a query is sent and the coroutine
+# waits for the socket through the event loop instead of blocking it, so one process can have thousands of Solution
+# calls in flight over a few connections.
+# asynchronous connections are always in autocommit mode - every statement is its own transaction
+
+
+# drive connection.poll() until the pending operation (connect or query) completed, raises its error
+async def _wait(connection):
+    loop = asyncio.get_event_loop()
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            watch, unwatch = loop.add_reader, loop.remove_reader
+        elif state == extensions.POLL_WRITE:
+            watch, unwatch = loop.add_writer, loop.remove_writer
+        else:
+            raise psycopg2.OperationalError("poll() returned " + str(state))
+        ready = loop.create_future()
+        fd = connection.fileno()
+        watch(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            unwatch(fd)
+
+
+class AsyncConnectionPool:
+    # pool of open asynchronous connections of one event loop, created lazily up to maxSize. while all of them
+    # are busy the callers wait (in FIFO order) for one to be returned
+    def __init__(self, params: dict, maxSize: int = 20, timeout: float = None):
+        if maxSize < 1:
+            raise ValueError("Invalid pool size (max=" + str(maxSize) + ")")
+        self.params = params
+        self.maxSize = maxSize
+        self.timeout = timeout  # seconds to wait for a free connection, None waits forever
+        self.__idle = collections.deque()
+        self.__opened = 0  # idle + checked out connections (+ the ones being connected)
+        self.__waiters = collections.deque()  # futures of the callers waiting, see __handOver
+        self.__closed = False
+
+    async def __connect(self):
+        connection = psycopg2.connect(connection_factory=PreparingConnection, async_=True, **self.params)
+        try:
+            await _wait(connection)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    # borrow a connection, waits while all maxSize connections are checked out
+    async def checkout(self):
+        if self.__closed:
+            raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+        while self.__idle:
+            connection = self.__idle.pop()
+            if not connection.closed:
+                return connection
+            self.__opened -= 1
+        if self.__opened >= self.maxSize:
+            waiter = asyncio.get_event_loop().create_future()
+            self.__waiters.append(waiter)
+            try:
+                connection = await asyncio.wait_for(waiter, self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    self.__handOver(waiter.result())  # handed over while timing out, pass it on
+                if isinstance(e, asyncio.TimeoutError):
+                    raise DatabaseException.ConnectionInvalid("Timed out waiting for a pooled connection")
+                raise
+            if connection is not None:
+                return connection
+            # None - a connection was closed and its slot handed over, connect in it
+        else:
+            self.__opened += 1
+        try:
+            return await self.__connect()
+        except BaseException:
+            self.__handOver(None)
+            raise
+
+    # return a borrowed connection. one that is closed, or still running a query because its caller was cancelled,
+    # is dropped
+    def checkin(self, connection, discard: bool = False):
+        if discard or self.__closed or connection.closed or connection.isexecuting():
+            try:
+                connection.close()
+            except Exception:
+                pass
+            self.__handOver(None)
+        else:
+            self.__handOver(connection)
+
+    # give a connection (or with None, the slot of a dropped one) to the first caller still waiting,
+    # keep it when no one is
+    def __handOver(self, connection):
+        while self.__waiters:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return
+        if connection is None:
+            self.__opened -= 1
+        else:
+            self.__idle.append(connection)
+
+    # close all idle connections, checked out connections are closed when they are returned
+    def closeAll(self):
+        self.__closed = True
+        idle, self.__idle = self.__idle, collections.deque()
+        self.__opened -= len(idle)
+        for connection in idle:
+            connection.close()
+        waiters, self.__waiters = self.__waiters, collections.deque()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_exception(DatabaseException.ConnectionInvalid("Connection pool is closed"))
+
+    def size(self) -> int:
+        return self.__opened
+
+    def idleCount(self) -> int:
+        return len(self.__idle)
+
+
+_pool = None
+_poolLoop = None  # the event loop _pool belongs to
+_poolSettings = {"maxSize": 20, "timeout": None}
+
+
+# change the pool settings, the current pool (if any) is closed and a new one is created on the next checkout
+def configurePool(maxSize: int = 20, timeout: float = None):
+    _poolSettings.update({"maxSize": maxSize, "timeout": timeout})
+    closePool()
+
+
+# the pool of the running event loop
+def getPool() -> AsyncConnectionPool:
+    global _pool, _poolLoop
+    loop = asyncio.get_event_loop()
+    if _pool is None or _poolLoop is not loop:
+        closePool()  # connections of a finished loop can't be waited on from this one
+        _pool = AsyncConnectionPool(Connector.DBConnector.config(), _poolSettings["maxSize"],
+                                    _poolSettings["timeout"])
+        _poolLoop = loop
+    return _pool
+
+
+def closePool():
+    global _pool, _poolLoop
+    old, _pool, _poolLoop = _pool, None, None
+    if old is not None:
+        old.closeAll()
+
+
+# borrow a pooled connection: conn = await connect() ... conn.close(), or async with await connect() as conn
+async def connect() -> "AsyncDBConnector":
+    pool = getPool()
+    try:
+        connection = await pool.checkout()
+    except DatabaseException.ConnectionInvalid:
+        raise
+    except Exception as e:
+        raise DatabaseException.ConnectionInvalid("Could not connect to database")
+    return AsyncDBConnector(connection, pool)
+
+
+class AsyncDBConnector:
+    def __init__(self, connection, pool: AsyncConnectionPool):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.__pool = pool
+
+    # return the connection to the pool
+    def close(self):
+        if self.connection is not None:
+            self.cursor.close()
+            self.__pool.checkin(self.connection)
+            self.connection = None
+            self.cursor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    # executes the query, returns the number of rows effected and a ResultSet (for SELECT) like DBConnector.execute
+    async def execute(self, query: Union[str, sql.Composed], printSchema=False,
+                      params: Union[tuple, list] = None) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        with translateErrors():
+            self.cursor.execute(query, params)
+            await _wait(self.connection)
+        row_effected = max(self.cursor.rowcount, 0)
+
+        if self.cursor.description is not None:
+            entries = ResultSet(self.cursor.description, self.cursor.fetchall())
+        else:
+            entries = ResultSet()
+        if printSchema:
+            print(entries)
+        return row_effected, entries
+
+    # executes a registered prepared statement, PREPAREs it first if this connection didn't yet
+    async def executePrepared(self, statement: PreparedStatement, params: Union[tuple, list] = (),
+                              printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        connection = self.connection
+        if connection.preparedGeneration != Connector._preparedGeneration:
+            if connection.prepared:
+                await self.execute("DEALLOCATE ALL")
+                connection.prepared.clear()
+            connection.preparedGeneration = Connector._preparedGeneration
+        if statement.name not in connection.prepared:
+            await self.execute(statement.prepareQuery())
+            connection.prepared.add(statement.name)
+        return await self.execute(statement.executeQuery(), printSchema=printSchema, params=tuple(params))
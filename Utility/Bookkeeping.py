@@ -0,0 +1,114 @@
+import functools
+import collections
+from typing import List
+import Utility.DBConnector as Connector
+from Utility.MaterializedViews import MaterializedViewSet
+from Utility.Cache import LRUCache, TableGenerations
+
+# The caches and the write bookkeeping shared by Solution and AsyncSolution: the write functions of both report
+# their (committed) writes here, and the reads of both are cached and invalidated in the same place
+
+# materialized copies of the team classifications (getActiveTallTeams, getActiveTallRichTeams, popularTeams),
+# read instead of the plain view chain once enabled with Solution.useMaterializedTeamViews
+teamViews = MaterializedViewSet(["active_tall_teams_mview", "active_tall_rich_teams_mview", "popular_teams_mview"])
+TEAM_VIEWS_TABLES = {"teams", "players", "matches", "stadiums", "spectators"}
+
+
+# result cache of the advanced read API, keyed by function, arguments and the generations of the tables read
+resultCache = LRUCache(maxSize=1024)
+tableGenerations = TableGenerations()
+
+
+# read-through cache of the profile getters, holds the row tuples (None for a missing ID, kept for a short TTL)
+profileCache = LRUCache(maxSize=10000)
+PROFILE_KINDS = {"players": "player", "matches": "match", "stadiums": "stadium"}
+_profileSettings = {"badProfileTTL": 1.0}
+
+
+def configureProfileCache(maxSize: int = 10000, badProfileTTL: float = 1.0):
+    profileCache.resize(maxSize)  # 0 disables caching
+    _profileSettings["badProfileTTL"] = badProfileTTL
+
+
+# cache the row a profile getter read (None for a missing ID), token is profileCache.token() from before the read
+def cacheProfile(key: tuple, row, token):
+    profileCache.put(key, row, ttl=_profileSettings["badProfileTTL"] if row is None else None, token=token)
+
+
+# drop the cached profiles of players/stadiums/matches removed with their team
+def teamProfilesDeleted(teamID: int):
+    def belongsToTeam(key, row):
+        if row is None:
+            return False
+        if key[0] == "player":
+            return row[1] == teamID
+        if key[0] == "stadium":
+            return row[2] == teamID
+        return row[2] == teamID or row[3] == teamID
+    profileCache.invalidateWhere(belongsToTeam)
+
+
+# called by the write functions after a successful (committed) write to the tables
+def tableWritten(*tables: str, count: int = 1):
+    if count <= 0:
+        return
+    current = Connector.currentSession()
+    if current is not None:
+        # written in a session, not yet committed (the reads inside it bypass the caches). the write is noted
+        # once the session committed, and never if it rolled back
+        written = current.state.get("written")
+        if written is None:
+            written = current.state["written"] = collections.Counter()
+            current.afterCommit(functools.partial(_sessionCommitted, written))
+        written[tables] += count
+        return
+    tableGenerations.bump(*tables)
+    if TEAM_VIEWS_TABLES.intersection(tables):
+        teamViews.noteWrite(count)
+
+
+def _sessionCommitted(written: collections.Counter):
+    kinds = set()
+    for tables, count in written.items():
+        tableWritten(*tables, count=count)
+        kinds.update(PROFILE_KINDS[table] for table in tables if table in PROFILE_KINDS)
+    if kinds:
+        profileCache.invalidateWhere(lambda key, row: key[0] in kinds)
+
+
+# in-process scorer leaderboards (Utility/Leaderboard.py) while enabled with Solution.useLeaderboards
+_leaderboard = None
+
+
+def setLeaderboard(board):
+    global _leaderboard
+    _leaderboard = board
+
+
+def leaderboard():
+    return _leaderboard
+
+
+# called by the write functions after a write changed the goal totals of these players, None - of any player
+def scorersChanged(playerIDs: List[int] = None):
+    board = _leaderboard
+    if board is None:
+        return
+    current = Connector.currentSession()
+    if current is None:
+        board.refresh() if playerIDs is None else board.playersChanged(playerIDs)
+        return
+    # the board reads the totals on a connection of its own, it can only see the session's writes once committed
+    changed = current.state.get("scorers")
+    if changed is None:
+        changed = current.state["scorers"] = set()
+        current.afterCommit(lambda: board.refresh() if None in changed else board.playersChanged(sorted(changed)))
+    changed.update([None] if playerIDs is None else playerIDs)
+
+
+# the team's top 5 scorers from the leaderboards, None if they can't answer
+def leaderboardTop(teamID: int) -> List[int]:
+    board = _leaderboard
+    if board is None or board.size < 5 or board.stale or Connector.currentSession() is not None:
+        return None
+    return board.top(teamID, 5)
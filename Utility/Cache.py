@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# thread-safe LRU cache with an optional time-to-live per entry
+class LRUCache:
+    def __init__(self, maxSize: int = 1024, ttl: float = None):
+        self.maxSize = maxSize
+        self.ttl = ttl  # default seconds an entry lives, None for no expiry
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()  # key -> (value, expires at or None)
+        self.__invalidations = 0  # bumped by every invalidate/clear, see token()
+        self.__lock = threading.Lock()
+
+    # returns (True, value) on a hit, (False, None) on a miss
+    def get(self, key):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[0]
+            if entry is not None:
+                del self.__entries[key]  # expired
+            self.misses += 1
+            return False, None
+
+    # take a token before reading the value to cache, put(..., token=token) then drops the value if anything was
+    # invalidated meanwhile (it may have been read before a write that invalidated it)
+    def token(self) -> int:
+        with self.__lock:
+            return self.__invalidations
+
+    def put(self, key, value, ttl: float = None, token: int = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self.__lock:
+            if self.maxSize <= 0 or (token is not None and token != self.__invalidations):
+                return
+            self.__entries[key] = (value, expires)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxSize:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.__lock:
+            self.__invalidations += 1
+            self.__entries.pop(key, None)
+
+    # drop every entry for which predicate(key, value) is true
+    def invalidateWhere(self, predicate):
+        with self.__lock:
+            self.__invalidations += 1
+            for key in [key for key, (value, _) in self.__entries.items() if predicate(key, value)]:
+                del self.__entries[key]
+
+    def clear(self):
+        with self.__lock:
+            self.__invalidations += 1
+            self.__entries.clear()
+
+    def resize(self, maxSize: int):
+        with self.__lock:
+            self.maxSize = maxSize
+            while len(self.__entries) > max(maxSize, 0):
+                self.__entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.__entries), "maxSize": self.maxSize}
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+# a counter per table, bumped after every committed write to it. a cached result keyed by the generations of the
+# tables it read can't be returned after one of them changed
+class TableGenerations:
+    def __init__(self):
+        self.__generations = {}
+        self.__epoch = 0  # bumped for all the tables at once (e.g. the schema was recreated)
+        self.__lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        with self.__lock:
+            for table in tables:
+                self.__generations[table] = self.__generations.get(table, 0) + 1
+
+    def bumpAll(self):
+        with self.__lock:
+            self.__epoch += 1
+
+    def snapshot(self, tables) -> tuple:
+        with self.__lock:
+            return (self.__epoch,) + tuple(self.__generations.get(table, 0) for table in tables)
@@ -0,0 +1,46 @@
+import numpy as np
+from scipy import sparse
+from typing import Dict, List
+
+
+# close players of every player at once (the getClosePlayers rule): q is close to p if q scored in at least half of
+# the matches p scored in. with A the player x match scoring incidence, C = A * A^T holds in C[p, q] the number
+# of matches both p and q scored in and in C[p, p] the number of matches p scored in.
+# playerIDs are all the players, (scorerIDs[i], matchIDs[i]) the distinct (player, match) pairs of goals.
+# returns {player: up to `limit` close players, ordered by ID}
+def closePlayers(playerIDs, scorerIDs, matchIDs, limit: int = 10) -> Dict[int, List[int]]:
+    players = np.unique(np.asarray(playerIDs, dtype=np.int64))
+    scorers = np.asarray(scorerIDs, dtype=np.int64)
+    matches = np.asarray(matchIDs, dtype=np.int64)
+    known = np.isin(scorers, players)
+    scorers, matches = scorers[known], matches[known]
+
+    rows = np.searchsorted(players, scorers)
+    _, columns = np.unique(matches, return_inverse=True)
+    incidence = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                                  shape=(len(players), int(columns.max()) + 1 if len(columns) else 0))
+    incidence.data[:] = 1  # (player, match) pairs are unique, but don't let duplicates count twice
+    co = (incidence @ incidence.T).tocsr()
+    co.sort_indices()
+    scored = co.diagonal()
+
+    # keep the pairs over the 50% threshold, the column order is the player ID order
+    row_of = np.repeat(np.arange(len(players)), np.diff(co.indptr))
+    keep = (co.data >= 0.5 * scored[row_of]) & (co.indices != row_of)
+    row_of, column_of = row_of[keep], co.indices[keep]
+    # rank of every kept pair inside its row, only the first `limit` of a row are returned
+    rank = np.arange(len(row_of)) - np.searchsorted(row_of, row_of, side="left")
+    top = rank < limit
+    row_of, column_of = row_of[top], column_of[top]
+    bounds = np.searchsorted(row_of, np.arange(len(players) + 1), side="left")
+
+    # a player that never scored has every other player as a close player (0 >= 0)
+    first = players[:limit + 1].tolist()
+    close_ids = players[column_of].tolist()
+    result = {}
+    for index, player in enumerate(players.tolist()):
+        if scored[index] == 0:
+            result[player] = [other for other in first if other != player][:limit]
+        else:
+            result[player] = close_ids[bounds[index]:bounds[index + 1]]
+    return result
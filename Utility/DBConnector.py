@@ -1,8 +1,17 @@
 import psycopg2
 from psycopg2 import errors, sql
+from psycopg2 import extensions, extras
+from contextlib import contextmanager
 from configparser import ConfigParser
 from Utility.Exceptions import DatabaseException
+from Utility import Instrumentation
 import os
+import collections.abc
+import re
+import json
+import itertools
+import threading
+import time
 from typing import Union
 
 
@@ -13,17 +22,102 @@ class ResultSetDict(dict):
         return super().__getitem__(item.lower())
 
 
+# the column names of a ResultSet and their positions, computed once and shared by all of its rows. the index
+# also maps the positions (0..n-1 and -n..-1) to themselves, so a row lookup by name or by index is one dict get
+class ResultSetColumns:
+    __slots__ = ('names', 'index')
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.index = {}
+        for position in range(len(self.names)):
+            self.index[position] = position
+            self.index[position - len(self.names)] = position
+        for position, name in enumerate(self.names):  # a repeated name maps to its last column
+            self.index[name.lower()] = position
+            self.index[name] = position
+
+
+_NO_COLUMNS = ResultSetColumns(())
+
+
+# a lightweight read-only view over one row tuple, columns are accessed by (case insensitive) name or by index.
+# otherwise it behaves like the dict rows used to: iterating gives the column names, a missing name raises KeyError
+# and any other key (e.g. an index out of range, or any index of the empty row of an invalid row number) gives None
+class ResultSetRow:
+    __slots__ = ('row', 'columns')
+
+    def __init__(self, row: tuple, columns: ResultSetColumns):
+        self.row = row
+        self.columns = columns
+
+    def __getitem__(self, item):
+        position = self.columns.index.get(item)
+        if position is None:
+            if type(item) is not str:
+                return None
+            position = self.columns.index.get(item.lower())
+            if position is None:
+                raise KeyError(item)
+        return self.row[position]
+
+    def get(self, item, default=None):
+        position = self.columns.index.get(item)
+        if position is None and type(item) is str:
+            position = self.columns.index.get(item.lower())
+        return default if position is None else self.row[position]
+
+    def __contains__(self, item):
+        return type(item) is str and (item in self.columns.index or item.lower() in self.columns.index)
+
+    def __iter__(self):
+        return iter(self.columns.names)
+
+    def __len__(self):
+        return len(self.row)
+
+    def keys(self):
+        return self.columns.names
+
+    def values(self):
+        return self.row
+
+    def items(self):
+        return zip(self.columns.names, self.row)
+
+    def __eq__(self, other):
+        if isinstance(other, ResultSetRow):
+            other = dict(other.items())
+        return dict(self.items()) == other
+
+    __hash__ = None
+
+    def __str__(self):
+        return str(dict(self.items()))
+
+
+collections.abc.Mapping.register(ResultSetRow)
+
+
 class ResultSet:
     # constructor
     def __init__(self, description=None, results=None):
         self.rows = []
         self.cols_header = []
         self.cols = ResultSetDict()
+        self.columns = _NO_COLUMNS
         self.__fromQuery(description, results)
 
     def __getitem__(self, row):
         return self.__getRow(row)
 
+    # iterate the rows as ResultSetRow views
+    def __iter__(self):
+        return map(ResultSetRow, self.rows, itertools.repeat(self.columns))
+
+    def __len__(self):
+        return len(self.rows)
+
     # so you can use print(ResultSet)
     def __str__(self):
         string = ""
@@ -47,47 +141,545 @@ class ResultSet:
     def __getRow(self, row: int):
         if len(self.rows) <= row:
             print('Invalid row ' + str(row))
-            return ResultSetDict()
-        row_to_return = ResultSetDict()
-        for val, col in zip(self.rows[row], self.cols_header):
-            row_to_return[col] = val
-        return row_to_return
+            return ResultSetRow((), _NO_COLUMNS)
+        return ResultSetRow(self.rows[row], self.columns)
 
     def __fromQuery(self, description, results: list):
         if results is None or len(results) == 0:  # no results
             self.cols = ResultSetDict()
         else:
-            self.rows = results.copy()
+            self.rows = results  # the list is owned by the ResultSet, no need to copy it
             self.cols_header = [d.name for d in description]
+            self.columns = ResultSetColumns(self.cols_header)
             self.cols = ResultSetDict()
             for col, index in zip(self.cols_header, range(len(results[0]))):
                 self.cols[col] = index
 
 
+# translates the constraint violations raised inside the block to the matching DatabaseException
+@contextmanager
+def translateErrors():
+    try:
+        yield
+    except errors.lookup("23502"):
+        raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
+    except errors.lookup("23503"):
+        raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
+    except errors.lookup("23505"):
+        raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
+    except errors.lookup("23514"):
+        raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
+
+
+# a connection that remembers which statements were already PREPAREd on its session
+class PreparingConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.preparedGeneration = _preparedGeneration
+        self.pendingRelease = ""  # see DBConnector.commit
+
+
+# a named statement with $1, $2, ... placeholders, PREPAREd once per connection and then EXECUTEd with bound
+# parameters, so the server parses and plans it once instead of on every call
+class PreparedStatement:
+    def __init__(self, name: str, argTypes: list, statement: str):
+        self.name = name
+        self.argTypes = list(argTypes)
+        self.statement = statement
+
+    def prepareQuery(self) -> sql.Composed:
+        if len(self.argTypes) == 0:
+            return sql.SQL("PREPARE {name} AS {statement}").format(name=sql.Identifier(self.name),
+                                                                  statement=sql.SQL(self.statement))
+        return sql.SQL("PREPARE {name} ({types}) AS {statement}").format(
+            name=sql.Identifier(self.name),
+            types=sql.SQL(", ").join(sql.SQL(t) for t in self.argTypes),
+            statement=sql.SQL(self.statement))
+
+    def executeQuery(self) -> sql.Composed:
+        if len(self.argTypes) == 0:
+            return sql.SQL("EXECUTE {name}").format(name=sql.Identifier(self.name))
+        return sql.SQL("EXECUTE {name} ({params})").format(
+            name=sql.Identifier(self.name),
+            params=sql.SQL(", ").join(sql.Placeholder() for _ in self.argTypes))
+
+
+_preparedStatements = {}
+_preparedGeneration = 0
+_EXECUTE_STATEMENT = re.compile(r'\s*EXECUTE\s+"?(\w+)"?', re.IGNORECASE)
+
+
+# register a statement to be prepared on the connections that execute it
+def prepared(name: str, argTypes: list, statement: str) -> PreparedStatement:
+    global _preparedGeneration
+    registered = _preparedStatements.get(name)
+    if registered is not None and (registered.argTypes, registered.statement) != (list(argTypes), statement):
+        _preparedGeneration += 1  # redefined, connections must drop the old definition
+    _preparedStatements[name] = PreparedStatement(name, argTypes, statement)
+    return _preparedStatements[name]
+
+
+def getPrepared(name: str) -> PreparedStatement:
+    return _preparedStatements[name]
+
+
+# the registered statement an "EXECUTE name ..." query runs, None for any other query
+def executedStatement(query: str) -> PreparedStatement:
+    executed = _EXECUTE_STATEMENT.match(query)
+    return None if executed is None else _preparedStatements.get(executed.group(1))
+
+
+# the text of the statement an "EXECUTE name ..." query runs, any other query as is
+def preparedStatementText(query: str) -> str:
+    statement = executedStatement(query)
+    return query if statement is None else statement.statement
+
+
+# forget the statements prepared so far (e.g. after the schema was dropped), every connection deallocates them
+# the next time it executes a prepared statement
+def invalidatePrepared():
+    global _preparedGeneration
+    _preparedGeneration += 1
+
+
+class ConnectionPool:
+    # thread-safe pool of open connections, connections are created lazily up to maxSize and kept open
+    # between checkouts, so a Solution call pays for the connect/auth handshake only once per connection.
+    # a connection idle for less than pingInterval seconds is handed out unchecked: if it died meanwhile (server
+    # restart, pg_terminate_backend) the borrower's first statement fails, its Solution call returns ERROR, and
+    # the connection is discarded when it is checked in. pingInterval=0 pings on every checkout instead
+    def __init__(self, params: dict, minSize: int = 1, maxSize: int = 10, pingInterval: float = 30.0,
+                 timeout: float = None):
+        if minSize < 0 or maxSize < 1 or minSize > maxSize:
+            raise ValueError("Invalid pool size (min=" + str(minSize) + ", max=" + str(maxSize) + ")")
+        self.params = params
+        self.minSize = minSize
+        self.maxSize = maxSize
+        self.pingInterval = pingInterval  # idle seconds after which a connection is pinged on checkout
+        self.timeout = timeout  # seconds to wait for a free connection, None waits forever
+        self.__idle = []  # (connection, time it was returned to the pool)
+        self.__opened = 0  # idle + checked out connections
+        self.__closed = False
+        self.__cond = threading.Condition()
+        for _ in range(minSize):
+            self.__idle.append((self.__connect(), time.monotonic()))
+            self.__opened += 1
+
+    def __connect(self):
+        connection = psycopg2.connect(connection_factory=PreparingConnection, **self.params)
+        connection.autocommit = False
+        return connection
+
+    @staticmethod
+    def __discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    # a connection is alive if it is open and, when it has been idle for a while, answers a trivial query
+    def __isAlive(self, connection, idleSince: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - idleSince < self.pingInterval:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    # borrow a connection, blocks while all maxSize connections are checked out
+    def checkout(self):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            with self.__cond:
+                while not self.__idle and self.__opened >= self.maxSize and not self.__closed:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise DatabaseException.ConnectionInvalid("Timed out waiting for a pooled connection")
+                    self.__cond.wait(remaining)
+                if self.__closed:
+                    raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+                if self.__idle:
+                    connection, idleSince = self.__idle.pop()
+                else:
+                    connection, idleSince = None, None
+                    self.__opened += 1  # reserve the slot before connecting outside of the lock
+
+            if connection is None:
+                try:
+                    return self.__connect()
+                except Exception:
+                    self.__release()
+                    raise
+            if self.__isAlive(connection, idleSince):
+                return connection
+            # dead connection, drop it and try again
+            self.__discard(connection)
+            self.__release()
+
+    # return a borrowed connection, anything left uncommitted is rolled back
+    def checkin(self, connection, discard: bool = False):
+        if not discard and not connection.closed:
+            try:
+                status = connection.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        with self.__cond:
+            if discard or self.__closed:
+                self.__discard(connection)
+                self.__opened -= 1
+            else:
+                self.__idle.append((connection, time.monotonic()))
+            self.__cond.notify()
+
+    def __release(self):
+        with self.__cond:
+            self.__opened -= 1
+            self.__cond.notify()
+
+    # close all idle connections, checked out connections are closed when they are returned
+    def closeAll(self):
+        with self.__cond:
+            self.__closed = True
+            idle, self.__idle = self.__idle, []
+            self.__opened -= len(idle)
+            self.__cond.notify_all()
+        for connection, _ in idle:
+            self.__discard(connection)
+
+    def size(self) -> int:
+        return self.__opened
+
+    def idleCount(self) -> int:
+        return len(self.__idle)
+
+
+_pool = None
+_poolSettings = {"enabled": True, "minSize": 1, "maxSize": 10, "pingInterval": 30.0, "timeout": None}
+_poolLock = threading.Lock()
+_configCache = {}
+_database = None  # see useDatabase
+_streamIds = itertools.count()
+
+
+# change the pool settings, the current pool (if any) is closed and a new one is created on the next checkout
+def configurePool(enabled: bool = True, minSize: int = 1, maxSize: int = 10, pingInterval: float = 30.0,
+                  timeout: float = None):
+    global _pool
+    with _poolLock:
+        _poolSettings.update(enabled=enabled, minSize=minSize, maxSize=maxSize, pingInterval=pingInterval,
+                              timeout=timeout)
+        old, _pool = _pool, None
+    if old is not None:
+        old.closeAll()
+
+
+def isPoolingEnabled() -> bool:
+    return _poolSettings["enabled"]
+
+
+def getPool() -> ConnectionPool:
+    global _pool
+    with _poolLock:
+        if _pool is None:
+            _pool = ConnectionPool(DBConnector.config(), _poolSettings["minSize"], _poolSettings["maxSize"],
+                                    _poolSettings["pingInterval"], _poolSettings["timeout"])
+        return _pool
+
+
+def closePool():
+    global _pool
+    with _poolLock:
+        old, _pool = _pool, None
+    if old is not None:
+        old.closeAll()
+
+
+# test isolation (Tests/abstractTest.py). while a transaction is pinned every DBConnector runs on its connection, in
+# a savepoint of its own: commit() releases the savepoint, close() rolls back what wasn't committed, and
+# unpinTransaction() rolls back everything. the connectors of different threads take turns
+_pinned = None
+_pinnedSpare = None  # the connection of the last pinned transaction, reused by the next one
+_pinnedLock = threading.RLock()
+_savepointIds = itertools.count()
+
+
+def pinTransaction():
+    global _pinned, _pinnedSpare
+    with _pinnedLock:
+        if _pinned is not None:
+            raise DatabaseException.ConnectionInvalid("A transaction is already pinned")
+        connection, _pinnedSpare = _pinnedSpare, None
+        if connection is None or connection.closed:
+            connection = psycopg2.connect(connection_factory=PreparingConnection, **DBConnector.config())
+            connection.autocommit = False
+        _pinned = connection
+
+
+# roll back the pinned transaction, DBConnectors use the pool again
+def unpinTransaction():
+    global _pinned, _pinnedSpare
+    with _pinnedLock:
+        connection, _pinned = _pinned, None
+        if connection is None:
+            return
+        try:
+            connection.rollback()
+            _pinnedSpare = connection
+        except Exception:
+            connection.close()
+
+
+def isTransactionPinned() -> bool:
+    return _pinned is not None
+
+
+# connect to another database than the one of database.ini (None goes back to it), the pooled connections to the
+# previous one are closed
+def useDatabase(name: str = None):
+    global _database
+    _database = name
+    closePool()
+
+
+# CREATE/DROP DATABASE can't run in a transaction, nor from a connection to the database they create/drop
+def _maintenance(query: sql.Composed):
+    params = DBConnector.config()
+    params["database"] = "postgres"  # the maintenance database every server has
+    connection = psycopg2.connect(**params)
+    try:
+        connection.autocommit = True
+        with translateErrors():
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+    finally:
+        connection.close()
+
+
+# a new database, a copy of template if given (nobody may be connected to the template while it is copied)
+def createDatabase(name: str, template: str = None):
+    query = sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name))
+    if template is not None:
+        query = sql.SQL("{} TEMPLATE {}").format(query, sql.Identifier(template))
+    _maintenance(query)
+
+
+# drops the database if it exists, disconnecting whoever is still connected to it
+def dropDatabase(name: str):
+    _maintenance(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(name)))
+
+
+# units of work: while a thread is inside `with session():` its DBConnectors all run on the session's connection,
+# each in a savepoint of its own (as in a pinned transaction), so a failing Solution call undoes only its own
+# statements. the session commits once when the block ends, or rolls back if it raised. sessions don't nest, an
+# inner session() joins the outer one
+_sessions = threading.local()
+
+
+class Session:
+    def __init__(self, connector: "DBConnector"):
+        self.connector = connector
+        self.committed = False
+        self.state = {}  # whatever the code running in the session keeps about it
+        self.__afterCommit = []
+
+    # callback() runs once the session committed, e.g. to invalidate what was cached from the uncommitted state
+    def afterCommit(self, callback):
+        self.__afterCommit.append(callback)
+
+    def _committed(self):
+        self.committed = True
+        for callback in self.__afterCommit:
+            callback()
+
+
+@contextmanager
+def session():
+    current = getattr(_sessions, "current", None)
+    if current is not None:
+        yield current
+        return
+    current = Session(DBConnector())
+    _sessions.current = current
+    try:
+        current.connector.begin()  # in a pinned transaction, the savepoint a failing session rolls back to
+        yield current
+        current.connector.commit()
+    except BaseException:
+        try:
+            current.connector.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        _sessions.current = None
+        current.connector.close()
+    current._committed()
+
+
+def currentSession() -> Session:
+    return getattr(_sessions, "current", None)
+
+
 class DBConnector:
-    # constructor
-    def __init__(self):
+    # constructor, borrows a connection from the pool unless pooling was disabled with configurePool
+    # (or uses the thread's session, see session(), or the pinned transaction, see pinTransaction).
+    # readOnly=True is for connectors that only read: their statements run in autocommit, each one is its own
+    # transaction, with no BEGIN/COMMIT round trips. they are a transaction again after repeatableRead,
+    # stream or explain
+    def __init__(self, pooled: bool = None, readOnly: bool = False):
+        self.connection = None
+        self.cursor = None
+        self.__pool = None
+        self.__savepoint = None
+        self.__savepointOpen = False
+        self.__pinned = False
+        current = getattr(_sessions, "current", None)
+        if current is not None and current.connector.connection is not None:
+            self.__join(current.connector.connection)
+            return
+        if _pinned is not None:
+            _pinnedLock.acquire()
+            if _pinned is not None:
+                self.__pinned = True
+                self.__join(_pinned)
+                return
+            _pinnedLock.release()
         try:
-            # Obtain the configuration parameters
-            params = DBConnector.__config()
-            self.connection = psycopg2.connect(**params)
-            self.connection.autocommit = False
+            if pooled is None:
+                pooled = isPoolingEnabled()
+            if pooled:
+                self.__pool = getPool()
+                self.connection = self.__pool.checkout()
+            else:
+                # Obtain the configuration parameters
+                params = DBConnector.config()
+                self.connection = psycopg2.connect(connection_factory=PreparingConnection, **params)
+            self.connection.autocommit = readOnly
+            self.cursor = self.connection.cursor()
+        except Exception as e:
+            if self.connection is not None:
+                self.__giveBack(discard=True)
+            self.connection = None
+            self.cursor = None
+            raise DatabaseException.ConnectionInvalid("Could not connect to database")
+
+    # run in a savepoint of the session's or the pinned transaction. a pinned one is joined holding _pinnedLock,
+    # which is held until close()
+    def __join(self, connection):
+        try:
+            self.connection = connection
             self.cursor = self.connection.cursor()
+            self.__savepoint = '"connector_' + str(next(_savepointIds)) + '"'
         except Exception as e:
             self.connection = None
             self.cursor = None
+            self.__savepoint = None
+            if self.__pinned:
+                self.__pinned = False
+                _pinnedLock.release()
             raise DatabaseException.ConnectionInvalid("Could not connect to database")
 
-    # close connection
+    # the savepoint commands a joined connector sends ahead of its next statement, in the same round trip: the
+    # releases deferred by commit() and, before its first statement (and the first one after a commit), its own
+    # savepoint. a connector that doesn't run anything costs no round trip
+    def __prefix(self, savepoint=True) -> str:
+        connection = self.connection
+        prefix = connection.pendingRelease
+        if prefix:
+            connection.pendingRelease = ""
+            if connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE:
+                prefix = ""  # the transaction ended since, and released them
+        if savepoint and not self.__savepointOpen:
+            prefix += "SAVEPOINT " + self.__savepoint + "; "
+            self.__savepointOpen = True
+        return prefix
+
+    # the prefix on its own, for the statements that can't carry it (PREPARE, COPY, server-side cursors, ...)
+    def __begin(self):
+        if self.__savepoint is not None:
+            prefix = self.__prefix()
+            if prefix:
+                with translateErrors():
+                    with self.connection.cursor() as cursor:
+                        cursor.execute(prefix)
+
+    # start the transaction now instead of with the first statement (a joined connector takes its savepoint)
+    def begin(self):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        self.__begin()
+
+    # a read-only connector is in autocommit mode, turn that off for the statements that need a transaction
+    def __transaction(self):
+        if self.connection.autocommit:
+            self.connection.autocommit = False
+
+    # on a cursor of its own, execute commits before the results are fetched from self.cursor
+    def __savepointCommand(self, command: str):
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.__prefix(savepoint=False) + command.format(self.__savepoint))
+
+    def __giveBack(self, discard=False):
+        if self.connection.autocommit and not self.connection.closed:
+            try:
+                self.connection.autocommit = False
+            except Exception:
+                discard = True
+        if self.__pool is not None:
+            self.__pool.checkin(self.connection, discard=discard)
+        else:
+            self.connection.close()
+
+    # close connection (a pooled connection is returned to the pool instead)
     def close(self):
+        if self.__savepoint is not None:
+            try:
+                self.cursor.close()
+                if self.__savepointOpen:
+                    self.__savepointCommand("ROLLBACK TO SAVEPOINT {0}; RELEASE SAVEPOINT {0}")
+            except Exception:
+                pass
+            self.__savepoint = None
+            self.__savepointOpen = False
+            self.cursor = None
+            self.connection = None
+            if self.__pinned:
+                self.__pinned = False
+                _pinnedLock.release()
+            return
         if self.cursor is not None:
-            self.cursor.close()
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
         if self.connection is not None:
-            self.connection.close()
+            self.__giveBack()
+            self.connection = None
 
     # commit connection's changes
     def commit(self):
-        if self.connection is not None:
+        if self.__savepoint is not None:
+            # the release waits for the next command on the connection (or the end of the transaction, which
+            # releases it anyway), so a commit costs no round trip
+            if self.__savepointOpen:
+                self.connection.pendingRelease += "RELEASE SAVEPOINT " + self.__savepoint + "; "
+                self.__savepointOpen = False
+        elif self.connection is not None:
             try:
                 self.connection.commit()
             except Exception:
@@ -95,31 +687,47 @@ class DBConnector:
 
     # rollback connection's changes
     def rollback(self):
-        if self.connection is not None:
+        if self.__savepoint is not None:
+            try:
+                if self.__savepointOpen:
+                    self.__savepointCommand("ROLLBACK TO SAVEPOINT {0}")
+            except Exception:
+                raise DatabaseException.ConnectionInvalid("Could not rollback changes")
+        elif self.connection is not None:
             try:
                 self.connection.rollback()
             except Exception:
                 raise DatabaseException.ConnectionInvalid("Could not rollback changes")
 
+    # make the transaction a REPEATABLE READ one, all of its queries then see the same snapshot of the database.
+    # must come before its first query. a pinned transaction already is one snapshot (no other session writes), a
+    # session's isolation level is set by its first statement
+    def repeatableRead(self, readOnly=False):
+        if self.__savepoint is None:
+            self.__transaction()
+            self.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ" + (" READ ONLY" if readOnly else ""),
+                         commit=False)
+
     # executes the query, if it is SELECT you may ask to print the results with printSchema
     # returns the number of rows effected and a ResultSet (for SELECT)
-    def execute(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
+    # commit=False leaves the statement in the open transaction (use commit/rollback to end it)
+    # params are bound to the %s placeholders of the query
+    def execute(self, query: Union[str, sql.Composed], printSchema=False, commit=True,
+                params: Union[tuple, list] = None) -> (int, ResultSet):
         if self.connection is None:
             raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        if Instrumentation.sinks:
+            return self.__executeInstrumented(query, printSchema, commit, params)
+        if self.__savepoint is not None:
+            prefix = self.__prefix()
+            query = sql.SQL(prefix) + query if isinstance(query, sql.Composable) else prefix + query
 
         # try execute the query
-        try:
-            self.cursor.execute(query)
+        with translateErrors():
+            self.cursor.execute(query, params)
             row_effected = max(self.cursor.rowcount, 0)
-            self.commit()
-        except errors.lookup("23502"):
-            raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
-        except errors.lookup("23503"):
-            raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
-        except errors.lookup("23505"):
-            raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
-        except errors.lookup("23514"):
-            raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
+            if commit:
+                self.commit()
 
         # get entries in case of SELECT
         if self.cursor.description is not None:
@@ -133,7 +741,256 @@ class DBConnector:
 
         return row_effected, entries
 
-    # grant credentials
+    # execute timing every phase for the instrumentation sinks, the query is composed client side first (what
+    # cursor.execute does internally) so that composing and the round trip are timed apart
+    def __executeInstrumented(self, query, printSchema, commit, params) -> (int, ResultSet):
+        clock = time.perf_counter
+        started = time.time()
+        times = [0.0, 0.0, 0.0, 0.0, 0.0]  # compose, execute, commit, fetch, resultSet
+        phase, last = 0, clock()
+        text, template, rows, error = None, None, 0, None
+        try:
+            text = query.as_string(self.cursor) if isinstance(query, sql.Composable) else query
+            if params is not None:
+                template = text
+                text = self.cursor.mogrify(text, params).decode(extensions.encodings[self.connection.encoding])
+            now = clock()
+            times[0], phase, last = now - last, 1, now
+
+            with translateErrors():
+                self.cursor.execute(text if self.__savepoint is None else self.__prefix() + text)
+                row_effected = rows = max(self.cursor.rowcount, 0)
+                now = clock()
+                times[1], phase, last = now - last, 2, now
+                if commit:
+                    self.commit()
+            now = clock()
+            times[2], phase, last = now - last, 3, now
+
+            if self.cursor.description is not None:
+                results = self.cursor.fetchall()
+                rows = len(results)
+                now = clock()
+                times[3], phase, last = now - last, 4, now
+                entries = ResultSet(self.cursor.description, results)
+            else:
+                entries = ResultSet()
+            times[4] = clock() - last
+        except Exception as e:
+            times[phase] = clock() - last
+            error = type(e).__name__
+            raise
+        finally:
+            Instrumentation.emit(Instrumentation.QueryEvent(text if text is not None else str(query), params, rows,
+                                                            *times, error=error, started=started,
+                                                            template=template))
+
+        if printSchema:
+            print(entries)
+        return row_effected, entries
+
+    # executes a query of several statements as one transaction in one round trip: outside of a session or pinned
+    # transaction it is sent in autocommit, where the statements of one query are a transaction of their own
+    # (no BEGIN/COMMIT round trips). returns like execute, with the ResultSet of the last statement
+    def executeScript(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        if self.__savepoint is not None or \
+                self.connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return self.execute(query, printSchema=printSchema)
+        autocommit = self.connection.autocommit
+        self.connection.autocommit = True
+        try:
+            return self.execute(query, printSchema=printSchema)
+        finally:
+            self.connection.autocommit = autocommit
+
+    # executes a registered prepared statement with the given parameters, PREPAREs it first if this connection
+    # didn't yet. returns like execute
+    def executePrepared(self, statement: PreparedStatement, params: Union[tuple, list] = (), printSchema=False,
+                        commit=True) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        self.__prepare(statement)
+        return self.execute(statement.executeQuery(), printSchema=printSchema, commit=commit, params=tuple(params))
+
+    # PREPARE the statement on this connection unless it already was
+    def __prepare(self, statement: PreparedStatement):
+        connection = self.connection
+        if connection.preparedGeneration != _preparedGeneration:
+            self.__begin()
+            if connection.prepared:
+                self.cursor.execute("DEALLOCATE ALL")
+                connection.prepared.clear()
+            connection.preparedGeneration = _preparedGeneration
+        if statement.name not in connection.prepared:
+            self.__begin()
+            with translateErrors():
+                self.cursor.execute(statement.prepareQuery())
+            connection.prepared.add(statement.name)
+
+    # the plan of a query (or of an EXECUTE of a registered prepared statement) as EXPLAIN's JSON. with analyze=True
+    # the query is run, under EXPLAIN (ANALYZE, BUFFERS), and rolled back afterwards. not instrumented
+    def explain(self, query: Union[str, sql.Composed], params: Union[tuple, list] = None, analyze=True,
+                timeoutMs: int = None) -> dict:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        text = query.as_string(self.cursor) if isinstance(query, sql.Composable) else query
+        self.__transaction()
+        self.__begin()
+        executed = executedStatement(text)
+        if executed is not None:
+            self.__prepare(executed)
+        try:
+            with translateErrors():
+                if timeoutMs is not None:
+                    self.cursor.execute("SET LOCAL statement_timeout = %s; SET LOCAL lock_timeout = %s",
+                                        (timeoutMs, timeoutMs))
+                self.cursor.execute("EXPLAIN (" + ("ANALYZE, BUFFERS, " if analyze else "") + "FORMAT JSON) " + text,
+                                    params)
+                plan = self.cursor.fetchone()[0]
+        finally:
+            self.rollback()  # an analyzed write is undone, and the SET LOCALs with it
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
+    # executes a "... VALUES %s ..." query for all the rows, sending pageSize rows per statement
+    # returns the number of rows sent and a ResultSet of the RETURNING rows (when fetch=True)
+    def executeValues(self, query: Union[str, sql.Composed], rows: list, template=None, pageSize=1000,
+                      fetch=False, commit=True) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        self.__begin()
+        if Instrumentation.sinks:
+            return self.__timed(query, lambda: self.__executeValues(query, rows, template, pageSize, fetch, commit),
+                                lambda result: result[0])
+        return self.__executeValues(query, rows, template, pageSize, fetch, commit)
+
+    def __executeValues(self, query, rows, template, pageSize, fetch, commit) -> (int, ResultSet):
+        with translateErrors():
+            returned = extras.execute_values(self.cursor, query, rows, template=template, page_size=pageSize,
+                                             fetch=fetch)
+            if commit:
+                self.commit()
+
+        if fetch and self.cursor.description is not None:
+            entries = ResultSet(self.cursor.description, returned)
+        else:
+            entries = ResultSet()
+        return len(rows), entries
+
+    # runs a "COPY ... FROM STDIN" query reading the data from file (any object with read()), the fastest way to
+    # load many rows. returns the number of rows copied
+    def copyIn(self, query: Union[str, sql.Composed], file, commit=True) -> int:
+        return self.__copy(query, file, commit)
+
+    # runs a "COPY ... TO STDOUT" query writing the data to file (any object with write()).
+    # returns the number of rows copied
+    def copyOut(self, query: Union[str, sql.Composed], file, commit=True) -> int:
+        return self.__copy(query, file, commit)
+
+    def __copy(self, query, file, commit) -> int:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        self.__begin()
+        if Instrumentation.sinks:
+            return self.__timed(query, lambda: self.__copyExpert(query, file, commit), lambda result: result)
+        return self.__copyExpert(query, file, commit)
+
+    def __copyExpert(self, query, file, commit) -> int:
+        with translateErrors():
+            self.cursor.copy_expert(query, file)
+            row_effected = max(self.cursor.rowcount, 0)
+            if commit:
+                self.commit()
+        return row_effected
+
+    # the instrumentation of the calls that send their data in pages/streams (executeValues, COPY), the whole call
+    # is timed as its execute phase. rowsOf gets the row count from the call's result
+    def __timed(self, query, call, rowsOf):
+        started = time.time()
+        clock = time.perf_counter
+        begin = clock()
+        rows, error = 0, None
+        try:
+            result = call()
+            rows = rowsOf(result)
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            text = query.as_string(self.connection) if isinstance(query, sql.Composable) else query
+            Instrumentation.emit(Instrumentation.QueryEvent(text, None, rows, 0.0, clock() - begin, 0.0, 0.0, 0.0,
+                                                            error=error, started=started))
+
+    # streams the rows of a SELECT through a server-side cursor, batchSize rows are fetched per round trip
+    # so memory stays constant however big the result is. the transaction is committed once all the rows were
+    # consumed (an abandoned stream is rolled back when the connection is closed). with instrumentation sinks, one
+    # QueryEvent is emitted when the stream is exhausted or closed: the time of the execute, fetches and commit
+    # (not the time the consumer spent between the rows) and the number of rows streamed
+    def stream(self, query: Union[str, sql.Composed], batchSize=1000, commit=True):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        self.__transaction()  # server-side cursors live in a transaction
+        self.__begin()
+        cursor = self.connection.cursor(name="stream_" + str(next(_streamIds)))
+        cursor.itersize = batchSize
+        instrumented = bool(Instrumentation.sinks)
+        clock = time.perf_counter
+        started = time.time()
+        times = [0.0, 0.0, 0.0, 0.0, 0.0]  # compose, execute, commit, fetch, resultSet - as in __executeInstrumented
+        streamed, error = 0, None
+        try:
+            with translateErrors():
+                last = clock()
+                cursor.execute(query)
+                times[1] = clock() - last
+                while True:
+                    last = clock()
+                    rows = cursor.fetchmany(batchSize)
+                    times[3] += clock() - last
+                    if not rows:
+                        break
+                    streamed += len(rows)
+                    for row in rows:
+                        yield row
+            cursor.close()
+            cursor = None
+            if commit:
+                last = clock()
+                self.commit()
+                times[2] = clock() - last
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if cursor is not None and not cursor.closed:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if instrumented:
+                text = query.as_string(self.connection) if isinstance(query, sql.Composable) else query
+                Instrumentation.emit(Instrumentation.QueryEvent(text, None, streamed, *times, error=error,
+                                                                started=started))
+
+    # grant credentials, the parsed file is cached so it is read only once per process
+    @staticmethod
+    def config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
+               section='postgresql'):
+        key = (filename, section)
+        if key not in _configCache:
+            _configCache[key] = DBConnector.__config(filename, section)
+        params = dict(_configCache[key])
+        if _database is not None:
+            params["database"] = _database
+        return params
+
     @staticmethod
     def __config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
                  section='postgresql'):
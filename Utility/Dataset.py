@@ -0,0 +1,196 @@
+import io
+import csv
+import gzip
+import json
+import math
+import random
+from typing import Dict, List
+
+# Realistic synthetic leagues for tests and benchmarks, generated deterministically from a seed and kept as the CSV
+# text COPY reads, so loading (Solution.loadDataset) streams it to the server without building a row object.
+# the distributions sit on the thresholds of the queries instead of being uniform:
+#   - a few star players score most of the goals (power-law scoring rates), the home side scores a bit more
+#   - every round each team plays once, home and away alternate so every team hosts half of its matches
+#   - stadium capacities around the 55000 rich threshold, heights around 190 (in whole cm, so 190 itself is common)
+#   - each team has its own crowd around the 40000 popularity threshold, some are always above it, most are not
+
+# the base tables in load order (the foreign keys), the summary tables are rebuilt from these
+TABLES = ["teams", "stadiums", "players", "matches", "goals", "spectators"]
+COLUMNS = {
+    "teams": ["team_id"],
+    "stadiums": ["stadium_id", "capacity", "belongs_to_team"],
+    "players": ["player_id", "team_id", "age", "height", "prefered_foot"],
+    "matches": ["match_id", "competition", "home_team_id", "away_team_id"],
+    "goals": ["num_goals", "player_id", "match_id"],
+    "spectators": ["num_attendances", "match_id", "stadium_id"],
+}
+# the order of the rows in a dump, the order generate() writes them in
+KEYS = {"teams": "team_id", "stadiums": "stadium_id", "players": "player_id", "matches": "match_id",
+        "goals": "match_id, player_id", "spectators": "match_id"}
+
+_FORMAT = "football-dataset"
+_VERSION = 1
+
+
+class Dataset:
+    # tables: table name -> the CSV text of its rows (COLUMNS order, an empty field is NULL)
+    def __init__(self, tables: Dict[str, str], meta: dict = None):
+        self.tables = {table: tables.get(table, "") for table in TABLES}
+        self.meta = dict(meta or {})
+
+    def rowCount(self, table: str) -> int:
+        return self.tables[table].count("\n")
+
+    def counts(self) -> Dict[str, int]:
+        return {table: self.rowCount(table) for table in TABLES}
+
+    # the rows of a table as tuples of int/str/None, for inspecting small datasets
+    def rows(self, table: str) -> List[tuple]:
+        return [tuple(_parseField(field) for field in row) for row in csv.reader(io.StringIO(self.tables[table]))]
+
+    # writes the dataset as one gzip file: a JSON header line with the byte length of every table, then the tables.
+    # the file only depends on the data, saving the same dataset twice gives the same bytes
+    def save(self, path: str):
+        data = {table: self.tables[table].encode("utf-8") for table in TABLES}
+        header = {"format": _FORMAT, "version": _VERSION, "meta": self.meta,
+                  "tables": {table: len(data[table]) for table in TABLES}}
+        with open(path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.write((json.dumps(header, sort_keys=True) + "\n").encode("utf-8"))
+                for table in TABLES:
+                    f.write(data[table])
+
+    @staticmethod
+    def load(path: str) -> "Dataset":
+        with gzip.open(path, "rb") as f:
+            header = json.loads(f.readline().decode("utf-8"))
+            if header.get("format") != _FORMAT or header.get("version") != _VERSION:
+                raise ValueError(path + " is not a dataset file of version " + str(_VERSION))
+            tables = {}
+            for table in TABLES:
+                tables[table] = f.read(header["tables"][table]).decode("utf-8")
+        return Dataset(tables, header["meta"])
+
+    def __eq__(self, other):
+        return isinstance(other, Dataset) and self.tables == other.tables
+
+    def __repr__(self):
+        return "Dataset(" + ", ".join(table + "=" + str(count) for table, count in self.counts().items()) + ")"
+
+
+def _parseField(field: str):
+    if field == "":
+        return None
+    try:
+        return int(field)
+    except ValueError:
+        return field
+
+
+def _csv(rows: list) -> str:
+    text = io.StringIO()
+    csv.writer(text, lineterminator="\n").writerows(rows)
+    return text.getvalue()
+
+
+def _clip(value: float, low: int, high: int) -> int:
+    return max(low, min(high, int(round(value))))
+
+
+# Knuth's, the rates here are small
+def _poisson(rnd: random.Random, rate: float) -> int:
+    limit = math.exp(-rate)
+    count, product = 0, rnd.random()
+    while product > limit:
+        count += 1
+        product *= rnd.random()
+    return count
+
+
+# pairs the teams for one round, the team that hosted less so far plays at home
+def _round(rnd: random.Random, teamIDs: List[int], hosted: Dict[int, int]) -> List[tuple]:
+    order = list(teamIDs)
+    rnd.shuffle(order)
+    pairs = []
+    for first, second in zip(order[0::2], order[1::2]):
+        if hosted[first] > hosted[second] or (hosted[first] == hosted[second] and rnd.random() < 0.5):
+            first, second = second, first
+        hosted[first] += 1
+        pairs.append((first, second))
+    return pairs
+
+
+# teams 1..teams each with playersPerTeam players (numbered by team), stadiums 1..teams owned by their team
+# (stadiumRate of them exist) plus `venues` neutral stadiums, matchesPerTeam rounds of matches, and the goals and
+# attendance of every match (spectatorRate of the matches have an attendance, nullStadiumRate of those without
+# a stadium). goalsPerMatch is the expected total of a match, split home/away by homeAdvantage
+def generate(teams: int = 20, playersPerTeam: int = 25, matchesPerTeam: int = 38, seed: int = 0,
+             stadiumRate: float = 0.9, venues: int = 2, goalsPerMatch: float = 2.7, homeAdvantage: float = 1.25,
+             scoringSkew: float = 1.16, spectatorRate: float = 0.95, nullStadiumRate: float = 0.01) -> Dataset:
+    if teams < 2:
+        raise ValueError("A league needs at least 2 teams")
+    rnd = random.Random(seed)
+    teamIDs = list(range(1, teams + 1))
+
+    capacities = {}
+    for team in teamIDs:
+        if rnd.random() < stadiumRate:
+            capacities[team] = _clip(rnd.gauss(55000, 15000) / 500, 16, 198) * 500  # whole 500s, 55000 itself occurs
+    stadiums = [(team, capacities[team], team) for team in teamIDs if team in capacities]
+    for venue in range(teams + 1, teams + venues + 1):
+        capacities[venue] = _clip(rnd.gauss(45000, 15000) / 500, 16, 198) * 500
+        stadiums.append((venue, capacities[venue], None))
+    venueIDs = [row[0] for row in stadiums]
+
+    players = []
+    squads = {}  # team -> (player IDs, cumulative scoring rates)
+    for team in teamIDs:
+        ids, rates = [], []
+        for k in range(playersPerTeam):
+            player = (team - 1) * playersPerTeam + k + 1
+            players.append((player, team, _clip(rnd.gauss(26, 4), 17, 40), _clip(rnd.gauss(190, 6), 160, 215),
+                            "Right" if rnd.random() < 0.75 else "Left"))
+            ids.append(player)
+            rates.append(rnd.paretovariate(scoringSkew))
+        total, cumulative = 0.0, []
+        for rate in rates:
+            total += rate
+            cumulative.append(total)
+        squads[team] = (ids, cumulative)
+
+    # the mean crowd of each team, attendance of a match is around its host's
+    crowds = {team: rnd.gauss(36000, 12000) for team in teamIDs}
+
+    matches, goals, spectators = [], [], []
+    hosted = {team: 0 for team in teamIDs}
+    homeRate = goalsPerMatch * homeAdvantage / (1 + homeAdvantage)
+    for _ in range(matchesPerTeam):
+        for home, away in _round(rnd, teamIDs, hosted):
+            match = len(matches) + 1
+            matches.append((match, "Domestic" if rnd.random() < 0.8 else "International", home, away))
+            scored = {}
+            for team, rate in ((home, homeRate), (away, goalsPerMatch - homeRate)):
+                ids, cumulative = squads[team]
+                for _ in range(_poisson(rnd, rate)):
+                    scorer = rnd.choices(ids, cum_weights=cumulative)[0]
+                    scored[scorer] = scored.get(scorer, 0) + 1
+            goals.extend((count, player, match) for player, count in sorted(scored.items()))
+            if rnd.random() < spectatorRate:
+                if rnd.random() < nullStadiumRate:
+                    stadium = None
+                elif home in capacities:
+                    stadium = home
+                elif venueIDs:
+                    stadium = rnd.choice(venueIDs)
+                else:
+                    stadium = None  # no stadium in the league (stadiumRate=0 and venues=0) to play at
+                capacity = capacities[stadium] if stadium is not None else 100000
+                spectators.append((_clip(rnd.gauss(crowds[home], 4000), 0, capacity), match, stadium))
+
+    meta = {"generator": {"teams": teams, "playersPerTeam": playersPerTeam, "matchesPerTeam": matchesPerTeam,
+                          "seed": seed, "stadiumRate": stadiumRate, "venues": venues, "goalsPerMatch": goalsPerMatch,
+                          "homeAdvantage": homeAdvantage, "scoringSkew": scoringSkew,
+                          "spectatorRate": spectatorRate, "nullStadiumRate": nullStadiumRate}}
+    return Dataset({"teams": _csv([(team,) for team in teamIDs]), "stadiums": _csv(stadiums),
+                    "players": _csv(players), "matches": _csv(matches), "goals": _csv(goals),
+                    "spectators": _csv(spectators)}, meta)
@@ -0,0 +1,248 @@
+import re
+import sys
+import json
+import time
+import random
+import functools
+import threading
+import collections
+from typing import List
+
+# Query-level instrumentation of DBConnector.execute. while at least one sink is installed every query is timed
+# phase by phase and handed to the sinks as a QueryEvent:
+#   compose    - turning the sql.Composed and its parameters into the query text
+#   execute    - sending it and waiting for the server (network + execution)
+#   commit     - the COMMIT, when execute was asked to commit
+#   fetch      - reading the result rows from the cursor
+#   resultSet  - building the ResultSet
+# with no sink installed execute only checks that `sinks` is empty.
+# a sink is any object with record(event), e.g. StatsSink, SlowQueryLog or JsonLinesSink below
+
+sinks = ()  # replaced, never changed in place, so execute can iterate it without a lock
+_sinksLock = threading.Lock()
+
+
+def addSink(sink):
+    global sinks
+    with _sinksLock:
+        sinks = sinks + (sink,)
+    return sink
+
+
+def removeSink(sink):
+    global sinks
+    with _sinksLock:
+        sinks = tuple(s for s in sinks if s is not sink)
+
+
+def clearSinks():
+    global sinks
+    with _sinksLock:
+        sinks = ()
+
+
+def emit(event: "QueryEvent"):
+    for sink in sinks:
+        try:
+            sink.record(event)
+        except Exception:
+            pass  # a broken sink must not break the query
+
+
+class QueryEvent:
+    __slots__ = ("query", "params", "fingerprint", "rows", "compose", "execute", "commit", "fetch", "resultSet",
+                 "total", "error", "started")
+
+    # template is the query before its params were bound, the same for every call of a statement
+    def __init__(self, query: str, params, rows: int, compose: float, execute: float, commit: float, fetch: float,
+                 resultSet: float, error: str = None, started: float = None, template: str = None):
+        self.query = query
+        self.params = params
+        self.fingerprint = fingerprint(query if template is None else template)
+        self.rows = rows
+        self.compose = compose  # seconds, see the phases above
+        self.execute = execute
+        self.commit = commit
+        self.fetch = fetch
+        self.resultSet = resultSet
+        self.total = compose + execute + commit + fetch + resultSet
+        self.error = error  # the exception type name of a failed query
+        self.started = time.time() if started is None else started
+
+    def phases(self) -> dict:
+        return {"compose": self.compose, "execute": self.execute, "commit": self.commit, "fetch": self.fetch,
+                "resultSet": self.resultSet}
+
+    def toDict(self) -> dict:
+        return {"started": self.started, "fingerprint": self.fingerprint, "query": self.query,
+                "params": None if self.params is None else list(self.params), "rows": self.rows,
+                "ms": {phase: seconds * 1000 for phase, seconds in dict(self.phases(), total=self.total).items()},
+                "error": self.error}
+
+
+_STRINGS = re.compile(r"[EeBbXx]?'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_SPACES = re.compile(r"\s+")
+_OPENING = re.compile(r"\( ")
+_CLOSING = re.compile(r" \)")
+_COMMAS = re.compile(r" ?, ?")
+_LISTS = re.compile(r"\(\?(?:, \?)+\)")
+_ROWS = re.compile(r"(\(\?(?:, \.\.\.)?\))(?:, \(\?(?:, \.\.\.)?\))+")
+
+
+# the query with its literals replaced by ?, so the calls of one Solution function (which inline their arguments
+# with sql.Literal) share a fingerprint. lists of literals collapse to (?, ...), multi-row VALUES to one row.
+# a statement with bound parameters is fingerprinted by its template, those repeat and hit the cache
+@functools.lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    query = _STRINGS.sub("?", query).replace("%s", "?")
+    query = _NUMBERS.sub("?", query)
+    query = _SPACES.sub(" ", query).strip()
+    query = _COMMAS.sub(", ", _CLOSING.sub(")", _OPENING.sub("(", query)))
+    query = _LISTS.sub("(?, ...)", query)
+    return _ROWS.sub(r"\1, ...", query)
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+class _Aggregate:
+    __slots__ = ("count", "errors", "rows", "phases", "total", "max", "sample", "seen")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.phases = {"compose": 0.0, "execute": 0.0, "commit": 0.0, "fetch": 0.0, "resultSet": 0.0}
+        self.total = 0.0
+        self.max = 0.0
+        self.sample = []  # a uniform sample of the totals (reservoir), for the percentiles
+        self.seen = 0
+
+
+# in-memory statistics per fingerprint: counts, rows, time per phase and latency percentiles. the percentiles are
+# computed from a reservoir sample of sampleSize latencies per fingerprint, so memory stays bounded
+class StatsSink:
+    def __init__(self, sampleSize: int = 1024, seed: int = 0):
+        self.sampleSize = sampleSize
+        self.__aggregates = {}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+
+    def record(self, event: QueryEvent):
+        with self.__lock:
+            aggregate = self.__aggregates.get(event.fingerprint)
+            if aggregate is None:
+                aggregate = self.__aggregates[event.fingerprint] = _Aggregate()
+            aggregate.count += 1
+            aggregate.errors += event.error is not None
+            aggregate.rows += event.rows
+            for phase, seconds in event.phases().items():
+                aggregate.phases[phase] += seconds
+            aggregate.total += event.total
+            aggregate.max = max(aggregate.max, event.total)
+            aggregate.seen += 1
+            if len(aggregate.sample) < self.sampleSize:
+                aggregate.sample.append(event.total)
+            else:
+                slot = self.__random.randrange(aggregate.seen)
+                if slot < self.sampleSize:
+                    aggregate.sample[slot] = event.total
+
+    def reset(self):
+        with self.__lock:
+            self.__aggregates = {}
+
+    # fingerprint -> {"count", "errors", "rows", "total_ms", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms",
+    # "phases_ms": {phase: total ms}}, the most expensive (total time) first
+    def stats(self) -> dict:
+        with self.__lock:
+            aggregates = list(self.__aggregates.items())
+        result = {}
+        for query, aggregate in sorted(aggregates, key=lambda item: -item[1].total):
+            ordered = sorted(aggregate.sample)
+            result[query] = {"count": aggregate.count, "errors": aggregate.errors, "rows": aggregate.rows,
+                             "total_ms": aggregate.total * 1000, "mean_ms": aggregate.total / aggregate.count * 1000,
+                             "p50_ms": _percentile(ordered, 0.50) * 1000, "p90_ms": _percentile(ordered, 0.90) * 1000,
+                             "p99_ms": _percentile(ordered, 0.99) * 1000, "max_ms": aggregate.max * 1000,
+                             "phases_ms": {phase: seconds * 1000 for phase, seconds in aggregate.phases.items()}}
+        return result
+
+    # the top queries by total time as a table
+    def report(self, top: int = 10, width: int = 80) -> str:
+        lines = [f"{'calls':>7} {'total ms':>10} {'p50 ms':>8} {'p99 ms':>8} {'exec %':>6}  query"]
+        for query, entry in list(self.stats().items())[:top]:
+            share = entry["phases_ms"]["execute"] / entry["total_ms"] * 100 if entry["total_ms"] else 0.0
+            lines.append(f"{entry['count']:>7} {entry['total_ms']:>10.1f} {entry['p50_ms']:>8.2f} "
+                         f"{entry['p99_ms']:>8.2f} {share:>6.1f}  {query[:width]}")
+        return "\n".join(lines)
+
+
+# keeps the last maxEntries queries slower than thresholdMs, and writes a line for each to stream (if given)
+class SlowQueryLog:
+    def __init__(self, thresholdMs: float = 100.0, maxEntries: int = 1000, stream=None):
+        self.thresholdMs = thresholdMs
+        self.stream = stream
+        self.entries = collections.deque(maxlen=maxEntries)
+
+    def record(self, event: QueryEvent):
+        if event.total * 1000 < self.thresholdMs:
+            return
+        self.entries.append(event)
+        if self.stream is not None:
+            self.stream.write(f"slow query {event.total * 1000:.1f} ms ({event.rows} rows"
+                              f"{', ' + event.error if event.error else ''}): {event.fingerprint}\n")
+
+    # the slowest first
+    def slowest(self, top: int = 10) -> List[QueryEvent]:
+        return sorted(list(self.entries), key=lambda event: -event.total)[:top]
+
+
+# appends every event as one JSON object per line, e.g. to analyze a benchmark run offline
+class JsonLinesSink:
+    def __init__(self, path: str, includeQuery: bool = True):
+        self.path = path
+        self.includeQuery = includeQuery  # False leaves out the query text and parameters, only the fingerprint
+        self.__file = open(path, "a")
+        self.__lock = threading.Lock()
+
+    def record(self, event: QueryEvent):
+        entry = event.toDict()
+        if not self.includeQuery:
+            del entry["query"], entry["params"]
+        line = json.dumps(entry, default=str) + "\n"
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.write(line)
+
+    def flush(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+
+# installs a StatsSink (and a SlowQueryLog on stderr when slowMs is given) for the duration of a with block:
+#   with Profiler() as stats: ...
+#   print(stats.report())
+class Profiler:
+    def __init__(self, slowMs: float = None):
+        self.stats = StatsSink()
+        self.slow = SlowQueryLog(slowMs, stream=sys.stderr) if slowMs is not None else None
+
+    def __enter__(self) -> StatsSink:
+        addSink(self.stats)
+        if self.slow is not None:
+            addSink(self.slow)
+        return self.stats
+
+    def __exit__(self, *exc):
+        removeSink(self.stats)
+        if self.slow is not None:
+            removeSink(self.slow)
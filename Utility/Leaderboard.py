@@ -0,0 +1,114 @@
+import bisect
+import threading
+from typing import List, Tuple
+import Utility.DBConnector as Connector
+
+# In-process scorer leaderboards: every team's players ordered like mostGoalsForTeam orders them (goals desc,
+# player_id desc), seeded from player_goals and kept current by the Solution writes that change a player's total
+# (see Solution.useLeaderboards). a change of a team's top `size` is pushed to the subscribers as
+# callback(teamID, [(player_id, goals), ...]).
+# the totals of the changed players are re-read from player_goals once their write committed, under the board's
+# lock, so concurrent writers (or a concurrent refresh) can't leave a stale total behind. the writes of other
+# processes are only seen by the next refresh()
+
+_PLAYERS = Connector.prepared("leaderboard_players", ["integer[]"],
+                              "SELECT team_id, player_id, num_goals FROM player_goals WHERE player_id = ANY($1)")
+_ALL_PLAYERS = Connector.prepared("leaderboard_all_players", [], "SELECT team_id, player_id, num_goals FROM player_goals")
+
+
+class Leaderboard:
+    def __init__(self, size: int = 5):
+        self.size = size
+        self.stale = True  # not seeded, or a re-read failed - the readers go to the database until the next refresh
+        self.__teams = {}  # team_id -> [(-goals, -player_id)], sorted
+        self.__players = {}  # player_id -> (team_id, goals)
+        self.__subscribers = ()
+        self.__lock = threading.RLock()
+
+    # callbacks run in the writing thread holding the board's lock, they should only hand the change over
+    def subscribe(self, callback):
+        with self.__lock:
+            self.__subscribers = self.__subscribers + (callback,)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.__lock:
+            self.__subscribers = tuple(s for s in self.__subscribers if s is not callback)
+
+    # the IDs of the team's n (default size) top scorers
+    def top(self, teamID: int, n: int = None) -> List[int]:
+        with self.__lock:
+            return [-player for _, player in self.__teams.get(teamID, [])[:self.size if n is None else n]]
+
+    # the team's n (default size) top scorers with their goals
+    def standings(self, teamID: int, n: int = None) -> List[Tuple[int, int]]:
+        with self.__lock:
+            return [(-player, -goals) for goals, player in self.__teams.get(teamID, [])[:self.size if n is None else n]]
+
+    # re-seed every team from the database, returns False if it couldn't be read
+    def refresh(self) -> bool:
+        with self.__lock:
+            before = {team: self.standings(team) for team in self.__teams}
+            rows = self.__read(_ALL_PLAYERS, ())
+            self.__teams = {}
+            self.__players = {}
+            if rows is None:
+                self.stale = True
+                return False
+            for team, player, goals in rows:
+                self.__players[player] = (team, goals)
+                self.__teams.setdefault(team, []).append((-goals, -player))
+            for entries in self.__teams.values():
+                entries.sort()
+            self.stale = False
+            self.__push(before, set(before).union(self.__teams))
+            return True
+
+    # re-read the totals of these players (the ones that no longer exist leave their team)
+    def playersChanged(self, playerIDs: List[int]) -> bool:
+        with self.__lock:
+            if self.stale:
+                return self.refresh()
+            rows = self.__read(_PLAYERS, (list(playerIDs),))
+            if rows is None:
+                self.stale = True
+                return False
+            current = {player: (team, goals) for team, player, goals in rows}
+            teams = {self.__players[player][0] for player in playerIDs if player in self.__players}
+            teams.update(team for team, _ in current.values())
+            before = {team: self.standings(team) for team in teams}
+            for player in playerIDs:
+                old = self.__players.pop(player, None)
+                if old is not None:
+                    entries = self.__teams[old[0]]
+                    del entries[bisect.bisect_left(entries, (-old[1], -player))]
+                    if not entries:
+                        del self.__teams[old[0]]
+                if player in current:
+                    team, goals = self.__players[player] = current[player]
+                    bisect.insort(self.__teams.setdefault(team, []), (-goals, -player))
+            self.__push(before, teams)
+            return True
+
+    @staticmethod
+    def __read(statement: Connector.PreparedStatement, params: tuple):
+        conn = None
+        try:
+            conn = Connector.DBConnector(readOnly=True)
+            _, rows = conn.executePrepared(statement, params)
+            return rows.rows
+        except Exception:
+            return None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def __push(self, before: dict, teams: set):
+        for team in teams:
+            after = self.standings(team)
+            if after != before.get(team, []):
+                for subscriber in self.__subscribers:
+                    try:
+                        subscriber(team, after)
+                    except Exception:
+                        pass  # a broken subscriber must not break the write
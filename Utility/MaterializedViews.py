@@ -0,0 +1,104 @@
+import threading
+import time
+from enum import Enum
+from typing import List
+import Utility.DBConnector as Connector
+
+
+# when a set of materialized views is refreshed
+class RefreshPolicy(Enum):
+    ON_DEMAND = 0  # only when refresh() is called
+    PERIODIC = 1  # every `interval` seconds, from a background thread
+    AFTER_WRITES = 2  # concurrently (in the background) once `writes` writes were noted since the last refresh
+
+
+# a group of materialized views that are refreshed together, plus the bookkeeping callers need to know how stale
+# they are. while disabled, callers are expected to read the plain views instead
+class MaterializedViewSet:
+    def __init__(self, views: List[str]):
+        self.views = list(views)
+        self.enabled = False
+        self.policy = RefreshPolicy.ON_DEMAND
+        self.interval = 60.0
+        self.writes = 100
+        self.__lock = threading.Lock()
+        self.__refreshing = threading.Lock()
+        self.__pendingWrites = 0
+        self.__lastRefresh = None  # time.time() of the snapshot the views hold, None if unknown
+        self.__stop = None  # threading.Event of the periodic refresher
+
+    # switch the materialized mode on/off and pick the refresh policy, enabling refreshes the views right away and
+    # only switches to them once that refresh succeeded. returns False (and stays disabled) if it failed
+    def configure(self, enabled: bool, policy: RefreshPolicy = RefreshPolicy.ON_DEMAND, interval: float = 60.0,
+                  writes: int = 100) -> bool:
+        self.__stopPeriodic()
+        self.enabled = False
+        self.policy = policy
+        self.interval = interval
+        self.writes = writes
+        if not enabled:
+            return True
+        if not self.refresh():
+            return False
+        self.enabled = True
+        if policy == RefreshPolicy.PERIODIC:
+            self.__stop = threading.Event()
+            threading.Thread(target=self.__periodic, args=(self.__stop,), daemon=True).start()
+        return True
+
+    # the views were (re)created with fresh data
+    def reset(self):
+        with self.__lock:
+            self.__pendingWrites = 0
+            self.__lastRefresh = time.time()
+
+    # refresh all the views in one transaction, concurrently=True doesn't block the readers while refreshing
+    # returns False if the refresh failed
+    def refresh(self, concurrently: bool = False) -> bool:
+        with self.__refreshing:
+            with self.__lock:
+                writes = self.__pendingWrites
+            started = time.time()
+            conn = None
+            try:
+                conn = Connector.DBConnector()
+                for view in self.views:
+                    conn.execute("REFRESH MATERIALIZED VIEW " + ("CONCURRENTLY " if concurrently else "") + view,
+                                 commit=False)
+                conn.commit()
+            except Exception as e:
+                return False
+            finally:
+                if conn is not None:
+                    conn.close()
+            with self.__lock:
+                self.__pendingWrites -= writes  # writes that happened while refreshing still count
+                self.__lastRefresh = started
+            return True
+
+    # called after a write to one of the tables the views depend on
+    def noteWrite(self, count: int = 1):
+        with self.__lock:
+            self.__pendingWrites += count
+            due = self.enabled and self.policy == RefreshPolicy.AFTER_WRITES and self.__pendingWrites >= self.writes
+        if due and not self.__refreshing.locked():
+            threading.Thread(target=self.refresh, args=(True,), daemon=True).start()
+
+    # how far behind the tables the views may be
+    def staleness(self) -> dict:
+        with self.__lock:
+            last = self.__lastRefresh
+            return {"materialized": self.enabled,
+                    "policy": self.policy.name,
+                    "stale": self.enabled and self.__pendingWrites > 0,
+                    "writes_since_refresh": self.__pendingWrites,
+                    "seconds_since_refresh": None if last is None else time.time() - last}
+
+    def __periodic(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            self.refresh(concurrently=True)
+
+    def __stopPeriodic(self):
+        if self.__stop is not None:
+            self.__stop.set()
+            self.__stop = None
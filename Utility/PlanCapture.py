@@ -0,0 +1,189 @@
+import re
+import json
+import time
+import queue
+import random
+import threading
+import collections
+from typing import List
+import Utility.DBConnector as Connector
+from Utility import Instrumentation
+
+# Automatic EXPLAIN capture: an instrumentation sink that, when a query took longer than thresholdMs, runs it
+# again under EXPLAIN (ANALYZE, BUFFERS) on a connection of its own and keeps the plan with the fingerprint,
+# query text and parameters of the slow call. install it with Instrumentation.addSink(PlanCapture(...)).
+#   - reads are re-run for real, writes only get their estimated plan (analyzeWrites=True re-runs them as well,
+#     rolled back, but they may then wait on the locks of the slow call's own transaction)
+#   - sampleRate of the slow calls are captured, and a fingerprint at most once per `interval` seconds; the rest
+#     only count towards its totals
+#   - captures run on a background thread by default, the slow call doesn't wait for its plan
+
+_READS = re.compile(r"\s*(SELECT|WITH|VALUES|TABLE)\b", re.IGNORECASE)
+
+
+# does the statement (or the prepared statement it EXECUTEs) only read
+def isRead(query: str) -> bool:
+    return _READS.match(Connector.preparedStatementText(query)) is not None
+
+
+class PlanCapture:
+    def __init__(self, thresholdMs: float = 100.0, sampleRate: float = 1.0, interval: float = 60.0,
+                 plansPerQuery: int = 3, analyzeWrites: bool = False, timeoutMs: int = 30000,
+                 background: bool = True, path: str = None, seed: int = None):
+        self.thresholdMs = thresholdMs
+        self.sampleRate = sampleRate
+        self.interval = interval
+        self.plansPerQuery = plansPerQuery
+        self.analyzeWrites = analyzeWrites
+        self.timeoutMs = timeoutMs  # statement/lock timeout of a capture
+        self.path = path  # every captured plan is also appended to this JSON-lines file (see Benchmarks/slowPlans)
+        self.__offenders = {}  # fingerprint -> {"count", "total_ms", "worst_ms", "plans": deque, "last_capture"}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__queue = None
+        if background:
+            self.__queue = queue.Queue(maxsize=100)  # full - the capture is skipped, never the caller delayed
+            threading.Thread(target=self.__work, daemon=True).start()
+
+    def record(self, event: Instrumentation.QueryEvent):
+        elapsed = event.total * 1000
+        if event.error is not None or elapsed < self.thresholdMs:
+            return
+        now = time.monotonic()
+        with self.__lock:
+            offender = self.__offenders.get(event.fingerprint)
+            if offender is None:
+                offender = self.__offenders[event.fingerprint] = {
+                    "count": 0, "total_ms": 0.0, "worst_ms": 0.0,
+                    "plans": collections.deque(maxlen=self.plansPerQuery), "last_capture": None}
+            offender["count"] += 1
+            offender["total_ms"] += elapsed
+            offender["worst_ms"] = max(offender["worst_ms"], elapsed)
+            due = offender["last_capture"] is None or now - offender["last_capture"] >= self.interval
+            if not due or self.__random.random() >= self.sampleRate:
+                return
+            offender["last_capture"] = now
+        if self.__queue is None:
+            self.__capture(event)
+        else:
+            try:
+                self.__queue.put_nowait(event)
+            except queue.Full:
+                pass
+
+    # wait until the queued captures were taken
+    def flush(self):
+        if self.__queue is not None:
+            self.__queue.join()
+
+    def __work(self):
+        while True:
+            event = self.__queue.get()
+            try:
+                self.__capture(event)
+            finally:
+                self.__queue.task_done()
+
+    def __capture(self, event: Instrumentation.QueryEvent):
+        analyze = self.analyzeWrites or isRead(event.query)
+        entry = {"fingerprint": event.fingerprint, "query": event.query,
+                 "params": None if event.params is None else list(event.params), "elapsed_ms": event.total * 1000,
+                 "rows": event.rows, "started": event.started, "analyzed": analyze, "plan": None, "error": None}
+        conn = None
+        try:
+            conn = Connector.DBConnector()
+            entry["plan"] = conn.explain(event.query, analyze=analyze, timeoutMs=self.timeoutMs)
+        except Exception as e:
+            entry["error"] = type(e).__name__ + ": " + str(e).strip()
+        finally:
+            if conn is not None:
+                conn.close()
+        with self.__lock:
+            self.__offenders[event.fingerprint]["plans"].append(entry)
+            if self.path is not None:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+
+    # the slow fingerprints, the most total slow time first: {"fingerprint", "count", "total_ms", "worst_ms",
+    # "plans": [captured plans, the latest last]}
+    def offenders(self, top: int = None) -> List[dict]:
+        with self.__lock:
+            result = [{"fingerprint": fingerprint, "count": offender["count"], "total_ms": offender["total_ms"],
+                       "worst_ms": offender["worst_ms"], "plans": list(offender["plans"])}
+                      for fingerprint, offender in self.__offenders.items()]
+        result.sort(key=lambda offender: -offender["total_ms"])
+        return result if top is None else result[:top]
+
+    def reset(self):
+        with self.__lock:
+            self.__offenders = {}
+
+    def report(self, top: int = 5) -> str:
+        return formatReport(self.offenders(top))
+
+
+# the worst offenders, read back from the JSON-lines file of a PlanCapture
+def loadOffenders(path: str) -> List[dict]:
+    offenders = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            offender = offenders.setdefault(entry["fingerprint"], {
+                "fingerprint": entry["fingerprint"], "count": 0, "total_ms": 0.0, "worst_ms": 0.0, "plans": []})
+            offender["count"] += 1
+            offender["total_ms"] += entry["elapsed_ms"]
+            offender["worst_ms"] = max(offender["worst_ms"], entry["elapsed_ms"])
+            offender["plans"].append(entry)
+    return sorted(offenders.values(), key=lambda offender: -offender["total_ms"])
+
+
+def formatReport(offenders: List[dict]) -> str:
+    lines = []
+    for rank, offender in enumerate(offenders, 1):
+        lines.append(f"#{rank} {offender['count']} slow call(s), {offender['total_ms']:.1f} ms in total, "
+                     f"worst {offender['worst_ms']:.1f} ms")
+        lines.append("   " + offender["fingerprint"])
+        worst = max(offender["plans"], key=lambda entry: entry["elapsed_ms"], default=None)
+        if worst is None:
+            lines.append("   (no plan captured)")
+        elif worst["error"] is not None:
+            lines.append("   plan failed: " + worst["error"])
+        else:
+            lines.append(f"   plan of the {worst['elapsed_ms']:.1f} ms call: {worst['query'][:200]}")
+            lines.extend("   " + line for line in formatPlan(worst["plan"]).splitlines())
+        lines.append("")
+    return "\n".join(lines)
+
+
+# EXPLAIN's JSON as an indented tree, with the actual times, rows and buffers when it was analyzed
+def formatPlan(plan: dict) -> str:
+    lines = []
+    _formatNode(plan["Plan"], 0, lines)
+    if "Planning Time" in plan:
+        lines.append(f"Planning Time: {plan['Planning Time']:.3f} ms")
+    if "Execution Time" in plan:
+        lines.append(f"Execution Time: {plan['Execution Time']:.3f} ms")
+    return "\n".join(lines)
+
+
+def _formatNode(node: dict, depth: int, lines: list):
+    title = node["Node Type"]
+    if "Relation Name" in node:
+        title += " on " + node["Relation Name"]
+    if "Index Name" in node:
+        title += " using " + node["Index Name"]
+    details = f"cost={node.get('Startup Cost', 0):.2f}..{node.get('Total Cost', 0):.2f} rows={node.get('Plan Rows')}"
+    if "Actual Total Time" in node:
+        details += (f" | actual time={node['Actual Startup Time']:.3f}..{node['Actual Total Time']:.3f} "
+                    f"rows={node['Actual Rows']} loops={node['Actual Loops']}")
+    if node.get("Shared Hit Blocks") or node.get("Shared Read Blocks"):
+        details += f" | buffers hit={node.get('Shared Hit Blocks', 0)} read={node.get('Shared Read Blocks', 0)}"
+    lines.append(("  " * depth) + ("-> " if depth else "") + title + "  (" + details + ")")
+    for key in ("Filter", "Index Cond", "Hash Cond", "Join Filter", "Sort Key"):
+        if key in node:
+            value = node[key]
+            lines.append("  " * depth + "     " + key + ": " + (", ".join(value) if isinstance(value, list) else value))
+    for child in node.get("Plans", []):
+        _formatNode(child, depth + 1, lines)
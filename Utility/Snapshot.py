@@ -0,0 +1,271 @@
+import threading
+from decimal import Decimal
+from typing import Dict, List
+import numpy as np
+import Utility.DBConnector as Connector
+
+# NULL in an integer column. every nullable integer column is CHECKed to be >= 0, so -1 is never a real value
+NULL = -1
+
+# the columns kept per table, in the tables' column order. heights only matter as height >= 190
+_COLUMNS = {
+    "teams": ["team_id"],
+    "players": ["player_id", "team_id", "tall"],
+    "stadiums": ["stadium_id", "capacity", "belongs_to_team"],
+    "matches": ["match_id", "home_team_id", "away_team_id"],
+    "goals": ["num_goals", "player_id", "match_id"],
+    "spectators": ["num_attendances", "match_id", "stadium_id"],
+}
+_SELECTS = {
+    "teams": "SELECT team_id FROM teams",
+    "players": "SELECT player_id, team_id, height >= 190 FROM players",
+    "stadiums": "SELECT stadium_id, capacity, belongs_to_team FROM stadiums",
+    "matches": "SELECT match_id, home_team_id, away_team_id FROM matches",
+    "goals": "SELECT num_goals, player_id, match_id FROM goals",
+    "spectators": "SELECT num_attendances, match_id, stadium_id FROM spectators",
+}
+_KEYS = {
+    "teams": ["team_id"],
+    "players": ["player_id"],
+    "stadiums": ["stadium_id"],
+    "matches": ["match_id"],
+    "goals": ["player_id", "match_id"],
+    "spectators": ["match_id"],
+}
+# the ON DELETE CASCADE foreign keys of the schema: table -> (referencing table, referencing column)
+_CASCADES = {
+    "teams": [("players", "team_id"), ("stadiums", "belongs_to_team"), ("matches", "home_team_id"),
+              ("matches", "away_team_id")],
+    "matches": [("goals", "match_id"), ("spectators", "match_id")],
+}
+
+
+# AVG of integers the way PostgreSQL computes it: numeric sum / count, rounded half up to the scale
+# numeric division picks (select_div_scale) - at least 16 significant digits, in base 10000 digit steps
+def _pgAverage(total: int, count: int) -> Decimal:
+    def leading(n: int):  # (weight, first digit) of n in base 10000
+        weight = 0
+        while n >= 10000:
+            n //= 10000
+            weight += 1
+        return weight, n
+
+    weight1, first1 = leading(total)
+    weight2, first2 = leading(count)
+    weight = weight1 - weight2 - (1 if first1 <= first2 else 0)
+    scale = min(max(16 - weight * 4, 0), 1000)
+    return Decimal((2 * total * 10 ** scale + count) // (2 * count)).scaleb(-scale)
+
+
+# the tables the advanced API reads, loaded once into NumPy columns. answers the same questions as the SQL versions
+# in Solution.py with vectorized group-bys and no database round trip.
+# the data is as fresh as the last refresh(), writes made since can be applied with upsert()/delete()
+class ColumnarSnapshot:
+    def __init__(self):
+        # {"tables": {table: {column: array}}, "derived": {name: cached group-by}}, replaced (never changed
+        # in place) by refresh/upsert/delete so readers never see a half applied change
+        self.__state = {"tables": {table: _toColumns(table, []) for table in _COLUMNS}, "derived": {}}
+        self.__lock = threading.Lock()
+
+    # (re)load the given tables (all of them by default) from one consistent database snapshot
+    def refresh(self, tables: List[str] = None):
+        tables = list(_COLUMNS) if tables is None else tables
+        loaded = {}
+        conn = Connector.DBConnector()
+        try:
+            conn.repeatableRead(readOnly=True)
+            for table in tables:
+                _, rows = conn.execute(_SELECTS[table], commit=False)
+                loaded[table] = _toColumns(table, rows.rows)
+            conn.commit()
+        finally:
+            conn.close()
+        with self.__lock:
+            self.__replace(loaded)
+
+    # insert rows (in the table's column order, e.g. (num_goals, player_id, match_id) for goals), a row replaces
+    # the row with the same key - pass the row as it is after the write
+    def upsert(self, table: str, rows: list):
+        added = _toColumns(table, [_row(table, row) for row in rows])
+        with self.__lock:
+            current = self.__state["tables"][table]
+            kept = ~np.isin(_keys(table, current), _keys(table, added))
+            self.__replace({table: {column: np.concatenate([current[column][kept], added[column]])
+                                    for column in _COLUMNS[table]}})
+
+    # delete rows by key (an ID, or a (player_id, match_id) pair for goals) and whatever they cascade to
+    def delete(self, table: str, keys: list):
+        with self.__lock:
+            changed = {}
+            self.__cascade(table, _keys(table, _toKeyColumns(table, keys)), changed)
+            self.__replace(changed)
+
+    def getMostAttractiveStadiums(self) -> List[int]:
+        stadiums, totals, _ = self.__stadiumGoals()
+        # ORDER BY total_goals desc, stadium_id asc - NULL sorts last
+        order = np.lexsort((stadiums, stadiums == NULL, -totals))
+        return [None if stadium == NULL else stadium for stadium in stadiums[order].tolist()]
+
+    def mostGoalsForTeam(self, teamID: int) -> List[int]:
+        if teamID is None:
+            return []
+        players, teams, goals = self.__playerGoals()
+        mine = teams == teamID
+        players, goals = players[mine], goals[mine]
+        order = np.lexsort((-players, -goals))
+        return players[order][:5].tolist()
+
+    def getActiveTallTeams(self) -> List[int]:
+        return self.__activeTallTeams()[::-1][:5].tolist()
+
+    def getActiveTallRichTeams(self) -> List[int]:
+        stadiums = self.__state["tables"]["stadiums"]
+        rich = stadiums["belongs_to_team"][(stadiums["capacity"] > 55000) & (stadiums["belongs_to_team"] != NULL)]
+        return np.intersect1d(self.__activeTallTeams(), rich)[:5].tolist()
+
+    def popularTeams(self) -> List[int]:
+        tables = self.__state["tables"]
+        matches, spectators = tables["matches"], tables["spectators"]
+        home = _lookup(matches["match_id"], matches["home_team_id"], spectators["match_id"], NULL)
+        attendance, stadium = spectators["num_attendances"], spectators["stadium_id"]
+        known = attendance != NULL
+        # "num_attendances <= 40000 or stadium_id IS NULL" is NULL (not true) for a NULL attendance in a stadium
+        popular = home[known & (attendance > 40000) & (stadium != NULL)]
+        not_popular = home[(known & (attendance <= 40000)) | (stadium == NULL)]
+        teams = matches["home_team_id"]
+        # one result per home match, as the SQL version selects from matches
+        selected = teams[np.isin(teams, popular) & ~np.isin(teams, not_popular)]
+        return np.sort(selected)[::-1][:10].tolist()
+
+    def stadiumTotalGoals(self, stadiumID: int) -> int:
+        stadiums, totals, _ = self.__stadiumGoals()
+        found = np.flatnonzero(stadiums == stadiumID) if stadiumID not in (None, NULL) else []
+        return int(totals[found[0]]) if len(found) else 0
+
+    # a Decimal like AVG(num_attendances), None if every attendance in the stadium is NULL, 0 for no matches
+    def averageAttendanceInStadium(self, stadiumID: int):
+        if stadiumID in (None, NULL):
+            return 0
+        spectators = self.__state["tables"]["spectators"]
+        attendance = spectators["num_attendances"][spectators["stadium_id"] == stadiumID]
+        if len(attendance) == 0:
+            return 0
+        attendance = attendance[attendance != NULL]
+        if len(attendance) == 0:
+            return None
+        return _pgAverage(int(attendance.sum()), len(attendance))
+
+    def __len__(self):
+        return sum(len(columns[_COLUMNS[table][0]]) for table, columns in self.__state["tables"].items())
+
+    # new state with the given tables replaced, the derived group-bys start over. called with the lock held
+    def __replace(self, changed: Dict[str, dict]):
+        tables = dict(self.__state["tables"])
+        tables.update(changed)
+        self.__state = {"tables": tables, "derived": {}}
+
+    # drops the rows of table with the given keys into changed, then the rows referencing them (ON DELETE CASCADE)
+    def __cascade(self, table: str, keys: np.ndarray, changed: dict):
+        current = changed.get(table, self.__state["tables"][table])
+        gone = np.isin(_keys(table, current), keys)
+        if not gone.any():
+            return
+        changed[table] = {column: values[~gone] for column, values in current.items()}
+        for child, column in _CASCADES.get(table, []):
+            rows = changed.get(child, self.__state["tables"][child])
+            dropped = np.isin(rows[column], current[_KEYS[table][0]][gone])
+            if dropped.any():
+                self.__cascade(child, _keys(child, rows)[dropped], changed)
+
+    # cached group-by of the current state
+    def __derived(self, name: str, compute):
+        state = self.__state
+        if name not in state["derived"]:
+            state["derived"][name] = compute(state["tables"])
+        return state["derived"][name]
+
+    # (player ids, team ids, SUM(num_goals)) of every player, like top_players_view
+    def __playerGoals(self):
+        def compute(tables):
+            players, goals = tables["players"], tables["goals"]
+            scored = goals["num_goals"] != NULL
+            return (players["player_id"], players["team_id"],
+                    _sumBy(players["player_id"], goals["player_id"][scored], goals["num_goals"][scored]))
+        return self.__derived("player_goals", compute)
+
+    # (stadium ids with NULL for the matches without one, total goals, matches) of every stadium that hosted a
+    # match, like attractive_stadiums_view
+    def __stadiumGoals(self):
+        def compute(tables):
+            goals, spectators = tables["goals"], tables["spectators"]
+            scored = goals["num_goals"] != NULL
+            # spectators.match_id is unique, one total per spectators row
+            per_row = _sumBy(spectators["match_id"], goals["match_id"][scored], goals["num_goals"][scored])
+            stadiums, where = np.unique(spectators["stadium_id"], return_inverse=True)
+            totals = np.zeros(len(stadiums), dtype=np.int64)
+            np.add.at(totals, where, per_row)
+            return stadiums, totals, np.bincount(where, minlength=len(stadiums))
+        return self.__derived("stadium_goals", compute)
+
+    # ascending ids of the teams that played a match and have at least two players of 190 and up
+    def __activeTallTeams(self):
+        def compute(tables):
+            matches, players = tables["matches"], tables["players"]
+            active = np.union1d(matches["home_team_id"], matches["away_team_id"])
+            active = np.intersect1d(active, tables["teams"]["team_id"])
+            teams, count = np.unique(players["team_id"][players["tall"] == 1], return_counts=True)
+            return np.intersect1d(teams[count >= 2], active)
+        return self.__derived("active_tall_teams", compute)
+
+
+# a full table row to the kept columns
+def _row(table: str, row) -> tuple:
+    if table == "players":  # (player_id, team_id, age, height, prefered_foot)
+        return row[0], row[1], row[3] >= 190
+    if table == "matches":  # (match_id, competition, home_team_id, away_team_id)
+        return row[0], row[2], row[3]
+    return tuple(row)
+
+
+def _toColumns(table: str, rows: list) -> Dict[str, np.ndarray]:
+    columns = _COLUMNS[table]
+    values = np.array([[NULL if value is None else int(value) for value in row] for row in rows],
+                      dtype=np.int64).reshape(len(rows), len(columns))
+    return {column: values[:, index].copy() for index, column in enumerate(columns)}
+
+
+def _toKeyColumns(table: str, keys: list) -> Dict[str, np.ndarray]:
+    key_columns = _KEYS[table]
+    values = np.array([key if isinstance(key, (tuple, list)) else (key,) for key in keys],
+                      dtype=np.int64).reshape(len(keys), len(key_columns))
+    return {column: values[:, index] for index, column in enumerate(key_columns)}
+
+
+# one int64 per row for the key columns, (player_id, match_id) of goals are packed into one number
+def _keys(table: str, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    key_columns = _KEYS[table]
+    if len(key_columns) == 1:
+        return columns[key_columns[0]]
+    return (columns[key_columns[0]] << 32) | columns[key_columns[1]]
+
+
+# sums of values grouped by ids, for every id of the sorted unique `groups` (0 for an id without values)
+def _sumBy(groups: np.ndarray, ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    order = np.argsort(groups, kind="stable")
+    position = np.searchsorted(groups[order], ids)
+    found = position < len(groups)
+    found[found] = groups[order][position[found]] == ids[found]
+    sums = np.zeros(len(groups), dtype=np.int64)
+    np.add.at(sums, order[position[found]], values[found])
+    return sums
+
+
+# values[i] for the position i of every id in `ids`, missing where the id isn't in `keys`
+def _lookup(keys: np.ndarray, values: np.ndarray, ids: np.ndarray, missing) -> np.ndarray:
+    order = np.argsort(keys, kind="stable")
+    position = np.searchsorted(keys[order], ids)
+    found = position < len(keys)
+    found[found] = keys[order][position[found]] == ids[found]
+    result = np.full(len(ids), missing, dtype=np.int64)
+    result[found] = values[order][position[found]]
+    return result